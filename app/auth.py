@@ -1,32 +1,98 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import TYPE_CHECKING, Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .db.session import SessionLocal
+from .db.session import get_async_db
+from .metrics import time_password_job
 from .db.db_models.user import User
+from .principal_cache import UserSnapshot, principal_cache
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
 
 # Configuration
 SECRET_KEY = "your-secret-key-here-change-in-production"  # Change this in production!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-def get_db():
-    with SessionLocal() as db:
-        yield db
-
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", str(os.cpu_count() or 2)))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+
+_pwd_context: Optional["CryptContext"] = None
+
+def get_pwd_context() -> "CryptContext":
+    """The bcrypt CryptContext, built on first use rather than at import."""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        # Hashes below the configured cost are flagged by needs_update and rehashed on login
+        _pwd_context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=BCRYPT_ROUNDS,
+            bcrypt__min_rounds=BCRYPT_ROUNDS
+        )
+    return _pwd_context
+
+# bcrypt is ~100-300 ms of CPU per call and releases the GIL, so it runs on a
+# dedicated pool instead of the event loop (or the shared request threadpool)
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_CONCURRENCY,
+    thread_name_prefix="bcrypt"
+)
+_password_jobs_pending = 0
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many password hashes are already queued."""
+
+async def _run_password_job(func, *args):
+    """Run a bcrypt call on the password executor, failing fast when saturated."""
+    global _password_jobs_pending
+    if _password_jobs_pending >= PASSWORD_HASH_CONCURRENCY + PASSWORD_HASH_QUEUE_LIMIT:
+        raise PasswordHasherBusy()
+
+    _password_jobs_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        _password_jobs_pending -= 1
+
+async def warm_up_password_hasher():
+    """Build the crypt context and load the bcrypt backend before the first login."""
+    context = get_pwd_context()
+    loop = asyncio.get_running_loop()
+    # Loading the backend runs its self-test - a few low-cost hashes
+    await loop.run_in_executor(password_executor, context.handler("bcrypt").get_backend)
+
+# Timed for the password_hash_seconds metric, in whichever thread runs them
+_timed_verify = time_password_job("verify", lambda *args: get_pwd_context().verify(*args))
+_timed_verify_and_update = time_password_job("verify", lambda *args: get_pwd_context().verify_and_update(*args))
+_timed_hash = time_password_job("hash", lambda *args: get_pwd_context().hash(*args))
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _timed_verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Generate a password hash."""
-    return pwd_context.hash(password)
+    return _timed_hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password off the event loop; also returns a new hash if the stored one needs an update."""
+    return await _run_password_job(_timed_verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Generate a password hash off the event loop."""
+    return await _run_password_job(_timed_hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
@@ -39,27 +105,42 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[str]:
-    """Verify and decode a JWT token."""
+def decode_token(token: str) -> Optional[dict]:
+    """Verify a JWT token and return its claims."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
     except JWTError:
         return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+def verify_token(token: str) -> Optional[str]:
+    """Verify and decode a JWT token."""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return payload["sub"]
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    """Fetch a user by email."""
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """Authenticate a user with email and password."""
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
+    user = await get_user_by_email(db, email)
+    if not user or not user.password_hash:
         return None
-    if not verify_password(password, user.password_hash):
+    verified, new_hash = await verify_password_async(password, user.password_hash)
+    if not verified:
         return None
+    if new_hash:
+        # Cost factor changed - upgrade the stored hash, committed with the login
+        user.password_hash = new_hash
     return user
 
-def get_current_user_from_cookie(request: Request, db: Session = Depends(get_db)) -> User:
+async def get_current_user_from_cookie(request: Request, db: AsyncSession = Depends(get_async_db)) -> UserSnapshot:
     """Get the current authenticated user from cookie."""
     token = request.cookies.get("access_token")
     if not token:
@@ -68,23 +149,33 @@ def get_current_user_from_cookie(request: Request, db: Session = Depends(get_db)
             detail="Not authenticated",
         )
     
-    email = verify_token(token)
-    if email is None:
+    # Skip the JWT decode and the user lookup for a recently seen token
+    cached = principal_cache.get(token)
+    if cached is not None:
+        request.state.user_id = cached[1].id
+        return cached[1]
+    
+    claims = decode_token(token)
+    if claims is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         )
     
-    user = db.query(User).filter(User.email == email).first()
+    user = await get_user_by_email(db, claims["sub"])
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
     
-    return user
+    snapshot = UserSnapshot.from_user(user)
+    principal_cache.put(token, claims, snapshot)
+    # For the request log
+    request.state.user_id = snapshot.id
+    return snapshot
 
-def get_current_active_user(current_user: User = Depends(get_current_user_from_cookie)) -> User:
+async def get_current_active_user(current_user: UserSnapshot = Depends(get_current_user_from_cookie)) -> UserSnapshot:
     """Get the current active user."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
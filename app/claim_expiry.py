@@ -0,0 +1,175 @@
+# app/claim_expiry.py
+
+"""
+Releases claims when their expires_at passes.
+
+Each worker keeps the deadlines of all open claims in a min-heap, loaded
+from systems.current_expires_at at startup and after every listener
+resync, then kept current by the "claim" notifications (new claims carry
+their expires_at, releases drop out). The run() task sleeps until the
+earliest deadline or the next notification, whichever comes first, so
+nothing polls the database per claim, and a due claim is released within
+milliseconds of its deadline.
+
+Everything due at once is released as one batch (claims.expire_claims:
+one locking SELECT and two UPDATEs, up to CLAIM_EXPIRY_BATCH_SIZE claims).
+All workers race for the same deadlines; the batch skips claims another
+worker has already released, so the race costs a few no-op queries.
+
+Released heap entries are not removed, only forgotten (lazy deletion);
+the heap is rebuilt when stale entries outnumber live ones.
+"""
+
+import asyncio
+import heapq
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from .claims import expire_claims
+from .db.db_models import System
+from .events import EventBroadcaster
+from .request_log import request_log
+
+CLAIM_EXPIRY_BATCH_SIZE = int(os.getenv("CLAIM_EXPIRY_BATCH_SIZE", "500"))
+CLAIM_EXPIRY_RETRY_SECONDS = 1.0
+
+
+class ClaimExpiry:
+    """ Per-worker deadline heap of the open claims """
+
+    def __init__(self):
+        # (deadline as epoch seconds, claim id, system id)
+        self._heap: List[Tuple[float, uuid.UUID, uuid.UUID]] = []
+        # Live entries: claim id -> deadline. Heap entries that disagree are stale
+        self._deadlines: Dict[uuid.UUID, float] = {}
+        self.loaded = False
+        self.reloads = 0
+        self.batches = 0
+        self.released = 0
+        self.events_applied = 0
+
+    def schedule(self, claim_id: uuid.UUID, system_id: uuid.UUID, expires_at: datetime) -> None:
+        deadline = expires_at.timestamp()
+        self._deadlines[claim_id] = deadline
+        heapq.heappush(self._heap, (deadline, claim_id, system_id))
+
+    def forget(self, claim_id: uuid.UUID) -> None:
+        if self._deadlines.pop(claim_id, None) is not None and len(self._heap) > 2 * len(self._deadlines) + 1024:
+            self._heap = [entry for entry in self._heap if self._deadlines.get(entry[1]) == entry[0]]
+            heapq.heapify(self._heap)
+
+    def next_deadline(self) -> Optional[float]:
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: int = CLAIM_EXPIRY_BATCH_SIZE) -> Dict[uuid.UUID, uuid.UUID]:
+        """ Up to `limit` claims due by `now`, earliest first: claim id -> system id """
+
+        due = {}
+        while len(due) < limit:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > now:
+                break
+            _, claim_id, system_id = heapq.heappop(self._heap)
+            del self._deadlines[claim_id]
+            due[claim_id] = system_id
+        return due
+
+    def apply_event(self, event: dict) -> None:
+        """ Apply a "claim" notification (migrations 0003 / 0009) """
+
+        claim_id = uuid.UUID(event["claim_id"])
+        if event.get("released_at") is not None:
+            self.forget(claim_id)
+        elif event.get("expires_at") is not None:
+            self.schedule(claim_id, uuid.UUID(event["system_id"]), datetime.fromisoformat(event["expires_at"]))
+        self.events_applied += 1
+
+    async def load(self, session_factory: async_sessionmaker) -> None:
+        """ Rebuild from the systems' current-claim pointers """
+
+        async with session_factory() as db:
+            rows = (await db.execute(
+                select(System.current_expires_at, System.current_claim_id, System.id)
+                .where(System.current_expires_at.is_not(None))
+            )).all()
+
+        self._heap = [(expires_at.timestamp(), claim_id, system_id) for expires_at, claim_id, system_id in rows]
+        heapq.heapify(self._heap)
+        self._deadlines = {claim_id: deadline for deadline, claim_id, _ in self._heap}
+        self.loaded = True
+        self.reloads += 1
+
+    async def expire_due(self, session_factory: async_sessionmaker) -> int:
+        """ Release everything that is due; returns claims released """
+
+        released = 0
+        while True:
+            due = self.pop_due(time.time())
+            if not due:
+                return released
+            async with session_factory() as db:
+                expired, early = await expire_claims(db, due)
+            # The database clock is behind ours - try again at its deadline
+            for claim_id, (system_id, expires_at) in early.items():
+                deadline = max(expires_at.timestamp(), time.time() + CLAIM_EXPIRY_RETRY_SECONDS)
+                self._deadlines[claim_id] = deadline
+                heapq.heappush(self._heap, (deadline, claim_id, system_id))
+            self.batches += 1
+            self.released += len(expired)
+            released += len(expired)
+
+    async def run(self, session_factory: async_sessionmaker, broadcaster: EventBroadcaster) -> None:
+        """ Background task: load, then release claims as they fall due """
+
+        while True:
+            # Subscribe before loading, so no new claim slips in between
+            subscriber = broadcaster.subscribe()
+            try:
+                await self.load(session_factory)
+                while True:
+                    await self.expire_due(session_factory)
+                    deadline = self.next_deadline()
+                    try:
+                        event = await asyncio.wait_for(
+                            subscriber.queue.get(),
+                            None if deadline is None else max(0.0, deadline - time.time())
+                        )
+                    except asyncio.TimeoutError:
+                        continue
+                    if event.get("type") == "resync":
+                        await self.load(session_factory)
+                    elif event.get("type") == "claim":
+                        self.apply_event(event)
+                    # Fell behind and was dropped - resubscribe and reload
+                    if subscriber.dropped and subscriber.queue.empty():
+                        break
+            except (SQLAlchemyError, OSError) as e:
+                request_log.event("claim_expiry_failed", error=str(e))
+                await asyncio.sleep(CLAIM_EXPIRY_RETRY_SECONDS)
+            finally:
+                broadcaster.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        deadline = self.next_deadline()
+        return {
+            "loaded": self.loaded,
+            "scheduled": len(self._deadlines),
+            "heap_entries": len(self._heap),
+            "next_expiry_in_seconds": round(deadline - time.time(), 3) if deadline is not None else None,
+            "reloads": self.reloads,
+            "batches": self.batches,
+            "released": self.released,
+            "events_applied": self.events_applied
+        }
+
+
+claim_expiry = ClaimExpiry()
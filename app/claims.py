@@ -0,0 +1,552 @@
+# app/claims.py
+
+"""
+System claim / release service.
+
+A claim is exclusive: at most one open SystemClaim (released_at IS NULL)
+exists per system at any time. This holds under concurrency without any
+application-level lock:
+
+    - claiming flips systems.status FREE -> CLAIMED with a conditional
+      UPDATE. Postgres row-locks the system, so of N concurrent claimers
+      exactly one sees status = FREE; the rest match zero rows.
+    - the system row is locked before its claim row is inserted or
+      released, so claims and releases of one system are serialized.
+      Every write here touches systems before system_claims; keep that
+      order, the data_versions triggers (migration 0005) lock a counter
+      row per table and would otherwise deadlock.
+    - "any free system" claims pick a row with FOR UPDATE SKIP LOCKED, so
+      concurrent claimers spread over the free systems instead of queueing
+      on the same row.
+
+claimed_at / released_at are stamped with clock_timestamp() while the
+system row is locked, not now() (the transaction start time), so the
+recorded claim intervals of a system never overlap.
+
+The same UPDATE that flips the status also sets the system's current-holder
+pointer (current_claim_id / current_holder_id / current_claimed_at), so the
+pointer and the claim history change in one transaction. system_claims is
+partitioned by month on claimed_at, so releases find the open claim by
+(current_claim_id, current_claimed_at), which touches one partition only.
+check_current_claims / repair_current_claims reconcile the two if they ever
+drift (e.g. after manual SQL). Partitioning also dropped the unique index
+on open claims, so drift can leave a system with several; the newest one
+wins and the repair closes the rest.
+
+Claims expire: expires_at is claimed_at plus the requested duration
+(CLAIM_DEFAULT_HOURS if none, capped at CLAIM_MAX_HOURS) and is mirrored
+on the pointer as current_expires_at. expire_claims releases a batch of
+due claims in two statements; app/claim_expiry.py decides when.
+
+Reservations are enforced: a claim whose window [claimed_at, expires_at)
+overlaps another user's active reservation of the system is refused
+(SystemReserved), and "any free system" claims skip such systems. The
+check is part of the claim row's INSERT, which runs after the system row
+is locked; create_reservation (app/reservations.py) locks the same row
+and refuses windows overlapping another user's claim, so the two cannot
+slip past each other.
+"""
+
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, exists, func, insert, literal, or_, select, text, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .db.db_models import System, SystemClaim, SystemReservation
+from .db.db_models.system import SystemStatus
+
+CLAIM_DEFAULT_HOURS = float(os.getenv("CLAIM_DEFAULT_HOURS", "8"))  # 0: claims without a duration never expire
+CLAIM_MAX_HOURS = float(os.getenv("CLAIM_MAX_HOURS", "72"))
+
+
+class ClaimError(Exception):
+    """ Base class for claim/release failures """
+
+
+class SystemUnavailable(ClaimError):
+    """ The system does not exist, is not FREE, or was claimed concurrently """
+
+
+class SystemNotFound(SystemUnavailable):
+    """ No such system (in the caller's organization) """
+
+
+class SystemReserved(SystemUnavailable):
+    """ Another user has reserved the system during the claim's window """
+
+
+class ClaimNotFound(ClaimError):
+    """ No open claim (held by this user) exists for the system """
+
+
+class ClaimResult:
+    """ Outcome of a successful claim """
+
+    def __init__(
+        self,
+        claim_id: uuid.UUID,
+        system_id: uuid.UUID,
+        claimed_at: datetime,
+        expires_at: Optional[datetime] = None
+    ):
+        self.claim_id = claim_id
+        self.system_id = system_id
+        self.claimed_at = claimed_at
+        self.expires_at = expires_at
+
+    def as_dict(self) -> dict:
+        return {
+            "claim_id": str(self.claim_id),
+            "system_id": str(self.system_id),
+            "claimed_at": self.claimed_at.isoformat(),
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None
+        }
+
+
+def _status(value: SystemStatus):
+    """ A status literal typed as the enum column (needed inside CASE) """
+
+    return literal(value, System.status.type)
+
+
+def _expiry(duration: Optional[timedelta]):
+    """ SQL expiry time for a claim made now; None (no expiry) only without any default """
+
+    if duration is None:
+        if not CLAIM_DEFAULT_HOURS:
+            return None
+        duration = timedelta(hours=CLAIM_DEFAULT_HOURS)
+    duration = min(duration, timedelta(hours=CLAIM_MAX_HOURS))
+    return func.clock_timestamp() + duration
+
+
+def reserved_by_others(system_id, user_id, starts_at, ends_at):
+    """
+    EXISTS: an active reservation of another user overlaps [starts_at, ends_at)
+    of the system (ends_at None: open-ended). Arguments may be SQL expressions;
+    written like ex_system_reservations_overlap, so its GiST index answers it.
+    """
+
+    return exists().where(
+        SystemReservation.cancelled_at.is_(None),
+        SystemReservation.user_id != user_id,
+        func.uuidrange(SystemReservation.system_id, SystemReservation.system_id, text("'[]'"))
+        == func.uuidrange(system_id, system_id, text("'[]'")),
+        func.tstzrange(SystemReservation.starts_at, SystemReservation.ends_at)
+        .op("&&")(func.tstzrange(starts_at, ends_at))
+    )
+
+
+def unreserved_for(user_id, duration: Optional[timedelta] = None):
+    """ Condition on System: a claim by user_id made now would not overlap another user's reservation """
+
+    return ~reserved_by_others(System.id, user_id, func.clock_timestamp(), _expiry(duration))
+
+
+def _mark_claimed(claim_id: uuid.UUID, user_id: uuid.UUID, duration: Optional[timedelta]) -> dict:
+    """ Column values for a system that has just been claimed """
+
+    return {
+        "status": SystemStatus.CLAIMED,
+        "current_claim_id": claim_id,
+        "current_holder_id": user_id,
+        "current_claimed_at": func.clock_timestamp(),
+        "current_expires_at": _expiry(duration)
+    }
+
+
+async def _record_claim(
+    db: AsyncSession,
+    claim_id: uuid.UUID,
+    system_id: uuid.UUID,
+    organization_id: uuid.UUID,
+    user_id: uuid.UUID,
+    claimed_at: datetime,
+    expires_at: Optional[datetime],
+    notes: Optional[str],
+    commit: bool = True
+) -> ClaimResult:
+    """
+    Insert the claim row for a system already flipped to CLAIMED, then
+    commit - unless another user's reservation overlaps the claim, which
+    raises SystemReserved (rolled back only with commit=True).
+    """
+
+    # A statement of its own, so it sees reservations committed until the
+    # system row was locked; later ones wait for this transaction
+    values = {
+        "id": literal(claim_id, SystemClaim.id.type),
+        "system_id": literal(system_id, SystemClaim.system_id.type),
+        "organization_id": literal(organization_id, SystemClaim.organization_id.type),
+        "claimed_by_user_id": literal(user_id, SystemClaim.claimed_by_user_id.type),
+        "notes": literal(notes, SystemClaim.notes.type),
+        "claimed_at": literal(claimed_at, SystemClaim.claimed_at.type),
+        "expires_at": literal(expires_at, SystemClaim.expires_at.type)
+    }
+    inserted = (await db.execute(
+        insert(SystemClaim)
+        .from_select(
+            list(values),
+            select(*values.values()).where(~reserved_by_others(
+                values["system_id"], values["claimed_by_user_id"], values["claimed_at"], values["expires_at"]
+            ))
+        )
+        .returning(SystemClaim.id)
+    )).first()
+    if inserted is None:
+        if commit:
+            await db.rollback()
+        raise SystemReserved(system_id)
+
+    if commit:
+        await db.commit()
+
+    return ClaimResult(claim_id, system_id, claimed_at, expires_at)
+
+
+async def claim_system(
+    db: AsyncSession,
+    system_id: uuid.UUID,
+    user_id: uuid.UUID,
+    notes: Optional[str] = None,
+    commit: bool = True,
+    duration: Optional[timedelta] = None,
+    organization_id: Optional[uuid.UUID] = None
+) -> ClaimResult:
+    """
+    Claim a specific system, or raise SystemUnavailable (SystemNotFound if
+    it does not exist, or is outside organization_id when one is given;
+    SystemReserved if another user has reserved it meanwhile). With
+    commit=False the claim is left in the caller's transaction (which is
+    not rolled back on failure either).
+    """
+
+    claim_id = uuid.uuid4()
+    claimable = update(System).where(System.id == system_id, System.status == SystemStatus.FREE)
+    if organization_id is not None:
+        claimable = claimable.where(System.organization_id == organization_id)
+    result = await db.execute(
+        claimable
+        .values(**_mark_claimed(claim_id, user_id, duration))
+        .returning(System.organization_id, System.current_claimed_at, System.current_expires_at)
+    )
+    row = result.first()
+    if row is None:
+        # Only on failure: tell "not free" from "no such system"
+        exists = select(System.id).where(System.id == system_id)
+        if organization_id is not None:
+            exists = exists.where(System.organization_id == organization_id)
+        missing = (await db.execute(exists)).first() is None
+        if commit:
+            await db.rollback()
+        raise (SystemNotFound if missing else SystemUnavailable)(system_id)
+
+    organization_id, claimed_at, expires_at = row
+    return await _record_claim(
+        db, claim_id, system_id, organization_id, user_id, claimed_at, expires_at, notes, commit
+    )
+
+
+async def claim_any_system(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    department_id: Optional[uuid.UUID] = None,
+    organization_id: Optional[uuid.UUID] = None,
+    notes: Optional[str] = None,
+    duration: Optional[timedelta] = None
+) -> ClaimResult:
+    """
+    Claim any FREE system (optionally within a department/organization)
+    that no other user has reserved during the claim's window
+    """
+
+    candidate = (
+        select(System.id, System.organization_id)
+        .where(
+            System.status == SystemStatus.FREE,
+            unreserved_for(user_id, duration)
+        )
+        .order_by(System.name)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    if department_id is not None:
+        candidate = candidate.where(System.department_id == department_id)
+    if organization_id is not None:
+        candidate = candidate.where(System.organization_id == organization_id)
+
+    row = (await db.execute(candidate)).first()
+    if row is None:
+        await db.rollback()
+        raise SystemUnavailable(None)
+
+    system_id, system_organization_id = row
+    claim_id = uuid.uuid4()
+    result = await db.execute(
+        update(System)
+        .where(System.id == system_id)
+        .values(**_mark_claimed(claim_id, user_id, duration))
+        .returning(System.current_claimed_at, System.current_expires_at)
+    )
+    claimed_at, expires_at = result.one()
+
+    return await _record_claim(
+        db, claim_id, system_id, system_organization_id, user_id, claimed_at, expires_at, notes
+    )
+
+
+async def release_system(
+    db: AsyncSession,
+    system_id: uuid.UUID,
+    user_id: Optional[uuid.UUID] = None,
+    organization_id: Optional[uuid.UUID] = None
+) -> uuid.UUID:
+    """
+    Release the open claim on a system and mark it FREE again.
+
+    With a user_id only that user's claim is released; pass None to release
+    whoever holds it (admin override). With an organization_id, systems of
+    other organizations are treated as not found. Returns the released
+    claim's id (the newest, if drift had left several open).
+    """
+
+    # Lock the system and read its pointer before touching system_claims
+    locked = (
+        select(System.current_claim_id, System.current_claimed_at, System.current_holder_id)
+        .where(System.id == system_id)
+        .with_for_update()
+    )
+    if organization_id is not None:
+        locked = locked.where(System.organization_id == organization_id)
+    pointer = (await db.execute(locked)).first()
+    if pointer is None or (
+        user_id is not None and pointer.current_claim_id is not None and pointer.current_holder_id != user_id
+    ):
+        await db.rollback()
+        raise ClaimNotFound(system_id)
+
+    await db.execute(
+        update(System)
+        .where(System.id == system_id)
+        .values(
+            status=case(
+                (System.status == SystemStatus.CLAIMED, _status(SystemStatus.FREE)),
+                else_=System.status
+            ),
+            current_claim_id=None,
+            current_holder_id=None,
+            current_claimed_at=None,
+            current_expires_at=None
+        )
+    )
+
+    release = (
+        update(SystemClaim)
+        .where(SystemClaim.system_id == system_id, SystemClaim.released_at.is_(None))
+        .values(released_at=func.clock_timestamp())
+        .returning(SystemClaim.id, SystemClaim.claimed_at)
+    )
+    if pointer.current_claim_id is not None:
+        # (id, claimed_at) prunes to the claim's own partition; without a
+        # pointer (drift) every partition's open-claim index is searched,
+        # and every open claim found is released
+        release = release.where(
+            SystemClaim.id == pointer.current_claim_id,
+            SystemClaim.claimed_at == pointer.current_claimed_at
+        )
+    if user_id is not None:
+        release = release.where(SystemClaim.claimed_by_user_id == user_id)
+
+    released = (await db.execute(release)).all()
+    if not released:
+        await db.rollback()
+        raise ClaimNotFound(system_id)
+
+    await db.commit()
+
+    return max(released, key=lambda claim: claim.claimed_at).id
+
+
+async def expire_claims(
+    db: AsyncSession,
+    claims: Dict[uuid.UUID, uuid.UUID]
+) -> Tuple[List[uuid.UUID], Dict[uuid.UUID, Tuple[uuid.UUID, datetime]]]:
+    """
+    Release a batch of claims (claim id -> system id) that have expired.
+
+    Claims no longer current on their system (released meanwhile, or by a
+    concurrent expiry) are skipped. Returns the claim ids released and the
+    claims found not yet due by the database clock (claim id -> (system id,
+    expires_at)), to be retried.
+    """
+
+    # Lock in id order, so concurrent batches (other workers) cannot deadlock
+    locked = (await db.execute(
+        select(
+            System.id,
+            System.current_claim_id,
+            System.current_claimed_at,
+            System.current_expires_at,
+            (System.current_expires_at <= func.clock_timestamp()).label("due")
+        )
+        .where(tuple_(System.id, System.current_claim_id).in_(
+            [(system_id, claim_id) for claim_id, system_id in claims.items()]
+        ))
+        .order_by(System.id)
+        .with_for_update()
+    )).all()
+
+    due = [row for row in locked if row.due]
+    early = {row.current_claim_id: (row.id, row.current_expires_at) for row in locked if not row.due}
+    if not due:
+        await db.rollback()
+        return [], early
+
+    await db.execute(
+        update(System)
+        .where(System.id.in_([row.id for row in due]))
+        .values(
+            status=case(
+                (System.status == SystemStatus.CLAIMED, _status(SystemStatus.FREE)),
+                else_=System.status
+            ),
+            current_claim_id=None,
+            current_holder_id=None,
+            current_claimed_at=None,
+            current_expires_at=None
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(SystemClaim)
+        .where(
+            tuple_(SystemClaim.id, SystemClaim.claimed_at).in_(
+                [(row.current_claim_id, row.current_claimed_at) for row in due]
+            ),
+            SystemClaim.released_at.is_(None)
+        )
+        .values(released_at=func.clock_timestamp())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+    return [row.current_claim_id for row in due], early
+
+
+# Consistency - the current-holder pointer on systems vs. open claims
+
+def _open_claims():
+    """ Open claims, each with its system's open-claim count and its rank (1 = newest) """
+
+    return (
+        select(
+            SystemClaim.id,
+            SystemClaim.system_id,
+            SystemClaim.claimed_by_user_id,
+            SystemClaim.claimed_at,
+            SystemClaim.expires_at,
+            func.count().over(partition_by=SystemClaim.system_id).label("open_claims"),
+            func.row_number().over(
+                partition_by=SystemClaim.system_id,
+                order_by=(SystemClaim.claimed_at.desc(), SystemClaim.id.desc())
+            ).label("rank")
+        )
+        .where(SystemClaim.released_at.is_(None))
+        .subquery("open_claim")
+    )
+
+
+def check_current_claims(db: Session) -> list:
+    """
+    Systems whose current-holder pointer or CLAIMED status disagrees with
+    their newest open claim, or that have more than one open claim. Returns
+    rows of (system id, name, pointer claim id, newest open claim id,
+    number of open claims).
+    """
+
+    open_claim = _open_claims()
+    query = (
+        select(
+            System.id,
+            System.name,
+            System.current_claim_id,
+            open_claim.c.id,
+            func.coalesce(open_claim.c.open_claims, 0)
+        )
+        .outerjoin(open_claim, and_(open_claim.c.system_id == System.id, open_claim.c.rank == 1))
+        .where(or_(
+            System.current_claim_id.is_distinct_from(open_claim.c.id),
+            System.current_holder_id.is_distinct_from(open_claim.c.claimed_by_user_id),
+            System.current_claimed_at.is_distinct_from(open_claim.c.claimed_at),
+            System.current_expires_at.is_distinct_from(open_claim.c.expires_at),
+            and_(open_claim.c.id.is_not(None), System.status != SystemStatus.CLAIMED),
+            and_(open_claim.c.id.is_(None), System.status == SystemStatus.CLAIMED),
+            open_claim.c.open_claims > 1
+        ))
+        .order_by(System.name)
+    )
+    return db.execute(query).all()
+
+
+def repair_current_claims(db: Session) -> int:
+    """
+    Rewrite the pointer (and CLAIMED/FREE status) from claim history, and
+    close all but the newest open claim of each system; returns systems fixed
+    """
+
+    inconsistent = [row[0] for row in check_current_claims(db)]
+    if not inconsistent:
+        return 0
+
+    def newest_open_claim(column):
+        return (
+            select(column)
+            .where(SystemClaim.system_id == System.id, SystemClaim.released_at.is_(None))
+            .order_by(SystemClaim.claimed_at.desc(), SystemClaim.id.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    has_open_claim = (
+        select(SystemClaim.id)
+        .where(SystemClaim.system_id == System.id, SystemClaim.released_at.is_(None))
+        .exists()
+    )
+
+    # systems before system_claims, as everywhere else
+    db.execute(
+        update(System)
+        .where(System.id.in_(inconsistent))
+        .values(
+            current_claim_id=newest_open_claim(SystemClaim.id),
+            current_holder_id=newest_open_claim(SystemClaim.claimed_by_user_id),
+            current_claimed_at=newest_open_claim(SystemClaim.claimed_at),
+            current_expires_at=newest_open_claim(SystemClaim.expires_at),
+            status=case(
+                (has_open_claim, _status(SystemStatus.CLAIMED)),
+                (System.status == SystemStatus.CLAIMED, _status(SystemStatus.FREE)),
+                else_=System.status
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+    # The pointer now names the newest open claim; older ones end where it
+    # began, so the system's claim intervals still do not overlap
+    db.execute(
+        update(SystemClaim)
+        .where(
+            SystemClaim.system_id == System.id,
+            System.id.in_(inconsistent),
+            SystemClaim.released_at.is_(None),
+            SystemClaim.id != System.current_claim_id
+        )
+        .values(released_at=System.current_claimed_at)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    return len(inconsistent)
@@ -1,10 +1,13 @@
 # app/db/models/__init__.py
 
 from ..session import Base
+from .data_version import DataVersion
 from .department_membership import DepartmentMembership
 from .department import Department
 from .organization import Organization
 from .system_claims import SystemClaim
+from .system_reservation import SystemReservation
 from .system_type import SystemType
+from .system_waiter import SystemWaiter
 from .system import System
 from .user import User
\ No newline at end of file
@@ -0,0 +1,27 @@
+# app/db/models/data_version.py
+
+from sqlalchemy import BigInteger, Column, SmallInteger, String
+
+from ..session import Base
+
+# Number of counter rows per domain - writers bump the row for their
+# backend (pg_backend_pid() % DATA_VERSION_SHARDS) so concurrent transactions
+# rarely wait on the same row
+DATA_VERSION_SHARDS = 16
+
+class DataVersion(Base):
+    """
+    Change counters per data domain ("systems", "claims", "departments", "users"),
+    bumped by statement-level triggers in the writing transaction (migrations
+    0005 and 0010).
+    The sum of a domain's shards changes whenever its data changes, which is
+    what the fragment cache keys on.
+    """
+    __tablename__ = "data_versions"
+
+    domain = Column(String(50), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"DataVersion(domain: {self.domain}, shard: {self.shard}, version: {self.version})"
@@ -16,12 +16,14 @@ class DepartmentMembership(Base):
     user_id = Column(
                 UUID(as_uuid=True),
                 ForeignKey("users.id"),
-                nullable=False
+                nullable=False,
+                index=True
             )
     department_id = Column(
                 UUID(as_uuid=True),
                 ForeignKey("departments.id"),
-                nullable=False
+                nullable=False,
+                index=True
             )
     organization_id = Column(
                 UUID(as_uuid=True),
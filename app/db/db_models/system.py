@@ -2,11 +2,12 @@
 
 import enum
 from sqlalchemy import(
-                    Column, String, DateTime, ForeignKey, Text,
-                    func,
+                    Column, String, DateTime, ForeignKey, Index, Text,
+                    func, text,
                     Enum
                 )
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
 import uuid
 
 from ..session import Base
@@ -35,9 +36,20 @@ class System(Base):
     organization_id = Column(
                         UUID(as_uuid=True),
                         ForeignKey("organizations.id"),
-                        nullable=False
+                        nullable=False,
+                        index=True
                     )
-    department_id = Column(UUID(as_uuid=True), ForeignKey("departments.id"))
+    department_id = Column(UUID(as_uuid=True), ForeignKey("departments.id"), index=True)
+
+    # Current holder - denormalized from the open SystemClaim and kept in the
+    # same transaction by app/claims.py, so "who has it" needs no claim scan.
+    # current_claim_id has no FK: it is a pointer into append-only history.
+    current_claim_id = Column(UUID(as_uuid=True), nullable=True)
+    current_holder_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    current_claimed_at = Column(DateTime(timezone=True), nullable=True)
+    current_expires_at = Column(DateTime(timezone=True), nullable=True)
+
+    current_holder = relationship("User", foreign_keys=[current_holder_id])
     
     # Notes
     notes = Column(Text)
@@ -54,6 +66,15 @@ class System(Base):
                     onupdate=func.now(),
                     nullable=True
                 )
+
+    __table_args__ = (
+        # Claim expiry scheduler: load the claims that have a deadline
+        Index(
+            "ix_systems_current_expires_at",
+            current_expires_at,
+            postgresql_where=text("current_expires_at IS NOT NULL")
+        ),
+    )
     
 
     def __repr__(self):
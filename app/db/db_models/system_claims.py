@@ -1,16 +1,21 @@
 # app/db/models/system_claims.py
 
-from sqlalchemy import Column, DateTime, ForeignKey, String, Text, func
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String, Text, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
 
 from ..session import Base
 
+# Append-only claim history, range partitioned by month on claimed_at (see
+# app/db/partitions.py). The partition key has to be part of every unique
+# index, so the primary key is (id, claimed_at), and a system's open claim is
+# found through systems.current_claim_id / current_claimed_at, which prunes
+# to a single partition.
 class SystemClaim(Base):
     __tablename__ = "system_claims"
 
-    # Primary key
+    # Primary key (with claimed_at)
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
     # Notes
@@ -20,17 +25,20 @@ class SystemClaim(Base):
     organization_id = Column(
                             UUID(as_uuid=True),
                             ForeignKey("organizations.id"),
-                            nullable=False
+                            nullable=False,
+                            index=True
                         )
     system_id = Column(
                             UUID(as_uuid=True),
                             ForeignKey("systems.id"),
-                            nullable=False
+                            nullable=False,
+                            index=True
                         )
     claimed_by_user_id = Column(
                             UUID(as_uuid=True),
                             ForeignKey("users.id"),
-                            nullable=False
+                            nullable=False,
+                            index=True
                         )
     
     user = relationship("User")
@@ -39,10 +47,27 @@ class SystemClaim(Base):
     # Timestamps
     claimed_at = Column(
                     DateTime(timezone=True),
+                    primary_key=True,
                     server_default=func.now(),
                     nullable=False
                 )
     released_at = Column(
                     DateTime(timezone=True),
                     nullable=True   # Null means still claimed
-                )
\ No newline at end of file
+                )
+    expires_at = Column(
+                    DateTime(timezone=True),
+                    nullable=True   # Released automatically at this time (app/claim_expiry.py)
+                )
+
+    __table_args__ = (
+        # Recent activity feed: ORDER BY claimed_at DESC LIMIT n
+        Index("ix_system_claims_claimed_at_desc", claimed_at.desc()),
+        # Open claims per system (consistency checks; partitioned, so not unique)
+        Index(
+            "ix_system_claims_open_system",
+            system_id,
+            postgresql_where=text("released_at IS NULL")
+        ),
+        {"postgresql_partition_by": "RANGE (claimed_at)"},
+    )
\ No newline at end of file
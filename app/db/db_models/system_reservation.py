@@ -0,0 +1,92 @@
+# app/db/models/system_reservation.py
+
+from sqlalchemy import CheckConstraint, Column, DDL, DateTime, ForeignKey, Index, Text, event, func, text
+from sqlalchemy.dialects.postgresql import UUID, ExcludeConstraint
+from sqlalchemy.orm import relationship
+import uuid
+
+from ..session import Base
+
+# Booking of a system for a future window [starts_at, ends_at). Active
+# (not cancelled) reservations of a system never overlap - the exclusion
+# constraint is the source of truth; app/reservations.py keeps an in-memory
+# index of it for fast checks. Equality on system_id goes through a uuid
+# range type (uuidrange), so the GiST constraint needs no btree_gist.
+class SystemReservation(Base):
+    __tablename__ = "system_reservations"
+
+    # Primary key
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # Notes
+    notes = Column(Text)
+
+    # Relationships
+    organization_id = Column(
+                            UUID(as_uuid=True),
+                            ForeignKey("organizations.id"),
+                            nullable=False,
+                            index=True
+                        )
+    system_id = Column(
+                            UUID(as_uuid=True),
+                            ForeignKey("systems.id"),
+                            nullable=False
+                        )
+    user_id = Column(
+                            UUID(as_uuid=True),
+                            ForeignKey("users.id"),
+                            nullable=False,
+                            index=True
+                        )
+
+    user = relationship("User")
+    system = relationship("System")
+
+    # Reserved window
+    starts_at = Column(DateTime(timezone=True), nullable=False)
+    ends_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Timestamps
+    created_at = Column(
+                    DateTime(timezone=True),
+                    server_default=func.now(),
+                    nullable=False
+                )
+    cancelled_at = Column(
+                    DateTime(timezone=True),
+                    nullable=True   # Null means active
+                )
+
+    __table_args__ = (
+        CheckConstraint("ends_at > starts_at", name="ck_system_reservations_window"),
+        ExcludeConstraint(
+            (func.uuidrange(system_id, system_id, text("'[]'")), "="),
+            (func.tstzrange(starts_at, ends_at), "&&"),
+            name="ex_system_reservations_overlap",
+            using="gist",
+            where=text("cancelled_at IS NULL")
+        ),
+        # Loading the index at startup: active reservations that have not ended
+        Index(
+            "ix_system_reservations_active_ends_at",
+            ends_at,
+            postgresql_where=text("cancelled_at IS NULL")
+        ),
+    )
+
+    def __repr__(self):
+        return f"SystemReservation(id: {self.id}, system_id: {self.system_id}, starts_at: {self.starts_at}, ends_at: {self.ends_at})"
+
+
+# The range type the exclusion constraint compares system ids with
+event.listen(
+    SystemReservation.__table__,
+    "before_create",
+    DDL("""
+        DO $$ BEGIN
+            CREATE TYPE uuidrange AS RANGE (subtype = uuid);
+        EXCEPTION WHEN duplicate_object THEN NULL;
+        END $$
+    """)
+)
@@ -0,0 +1,67 @@
+# app/db/models/system_waiter.py
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Identity, Index, Text, func, text
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+
+from ..session import Base
+
+# A queued "give me a system" request (app/waitlist.py). The pool is one
+# system (system_id), a department (department_id) or any system of the
+# organization (both null). Waiters are served in `position` order; the
+# row is the waiter's whole state, so queues survive worker restarts.
+class SystemWaiter(Base):
+    __tablename__ = "system_waiters"
+
+    # Primary key
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # FIFO order
+    position = Column(BigInteger, Identity(always=True), nullable=False, unique=True)
+
+    # Notes for the claim once granted
+    notes = Column(Text)
+
+    # Relationships
+    organization_id = Column(
+                            UUID(as_uuid=True),
+                            ForeignKey("organizations.id"),
+                            nullable=False
+                        )
+    user_id = Column(
+                            UUID(as_uuid=True),
+                            ForeignKey("users.id"),
+                            nullable=False,
+                            index=True
+                        )
+
+    # Pool
+    department_id = Column(UUID(as_uuid=True), ForeignKey("departments.id"), nullable=True)
+    system_id = Column(UUID(as_uuid=True), ForeignKey("systems.id"), nullable=True)
+
+    # Outcome - the claim this waiter was granted (no FK: claims are partitioned history)
+    granted_claim_id = Column(UUID(as_uuid=True), nullable=True)
+    granted_system_id = Column(UUID(as_uuid=True), ForeignKey("systems.id"), nullable=True)
+    granted_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Timestamps
+    created_at = Column(
+                    DateTime(timezone=True),
+                    server_default=func.now(),
+                    nullable=False
+                )
+    # Abandoned unless the client polls again before this
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    cancelled_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # The dispatcher: oldest waiting waiter first
+        Index(
+            "ix_system_waiters_waiting",
+            organization_id, position,
+            postgresql_where=text("granted_at IS NULL AND cancelled_at IS NULL")
+        ),
+    )
+
+    def __repr__(self):
+        return f"SystemWaiter(id: {self.id}, position: {self.position}, user_id: {self.user_id})"
@@ -0,0 +1,217 @@
+# app/db/partitions.py
+
+"""
+Monthly range partitions of system_claims (partitioned on claimed_at).
+
+    system_claims            partitioned parent, PRIMARY KEY (id, claimed_at)
+    system_claims_2026_10    FOR VALUES FROM ('2026-10-01 UTC') TO ('2026-11-01 UTC')
+    ...
+
+There is no DEFAULT partition, so a month must exist before the first claim
+lands in it. ensure_claim_partitions creates the current month and the next
+CLAIM_PARTITIONS_AHEAD; the app runs it at startup and every
+CLAIM_PARTITION_CHECK_HOURS, and maintain_claim_partitions.py does the same
+from cron.
+
+Retention (archive_expired_partitions) detaches partitions older than
+CLAIM_RETENTION_MONTHS with DETACH PARTITION CONCURRENTLY (claims keep
+flowing), writes each one to a gzipped CSV in CLAIM_ARCHIVE_DIR and drops
+it. A partition that still holds an open claim is left alone. A partition
+detached by an interrupted run is picked up by the next one.
+"""
+
+import asyncio
+import gzip
+import os
+import re
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..request_log import request_log
+
+CLAIM_PARTITIONS_AHEAD = int(os.getenv("CLAIM_PARTITIONS_AHEAD", "3"))
+CLAIM_PARTITION_CHECK_HOURS = float(os.getenv("CLAIM_PARTITION_CHECK_HOURS", "12"))
+CLAIM_RETENTION_MONTHS = int(os.getenv("CLAIM_RETENTION_MONTHS", "24"))
+CLAIM_ARCHIVE_DIR = os.getenv("CLAIM_ARCHIVE_DIR", "archive/system_claims")
+
+PARENT_TABLE = "system_claims"
+PARTITION_NAME = re.compile(r"^system_claims_(\d{4})_(\d{2})$")
+
+
+def month_start(value: Optional[date] = None) -> date:
+    """ First day of the (UTC) month containing `value` (default: now) """
+
+    value = value or datetime.now(timezone.utc)
+    if isinstance(value, datetime):
+        value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    match = PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def attached_partitions(connection: Connection) -> Dict[str, date]:
+    """ Partition name -> month, for the partitions attached to system_claims """
+
+    rows = connection.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = CAST(:parent AS regclass)
+    """), {"parent": PARENT_TABLE})
+    return {name: partition_month(name) for (name,) in rows if partition_month(name)}
+
+
+def detached_partitions(connection: Connection) -> Dict[str, date]:
+    """ Monthly claim tables that exist but are not attached (left by an interrupted retention run) """
+
+    rows = connection.execute(text("""
+        SELECT c.relname
+        FROM pg_class c
+        WHERE c.relkind = 'r'
+          AND NOT c.relispartition
+          AND c.relnamespace = CAST(current_schema() AS regnamespace)
+          AND c.relname ~ '^system_claims_[0-9]{4}_[0-9]{2}$'
+    """))
+    return {name: partition_month(name) for (name,) in rows}
+
+
+def ensure_claim_partitions(
+    connection: Connection,
+    start: Optional[date] = None,
+    months_ahead: int = CLAIM_PARTITIONS_AHEAD
+) -> List[str]:
+    """
+    Create any missing monthly partition from `start` (default: this month)
+    through `months_ahead` months from now. Returns the names created; runs
+    in the connection's transaction, the caller commits.
+    """
+
+    # Serialize concurrent callers (several app workers start at once)
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext('system_claims_partitions'))"))
+    existing = attached_partitions(connection)
+
+    created = []
+    month = month_start(start)
+    last = add_months(month_start(), months_ahead)
+    while month <= last:
+        name = partition_name(month)
+        if name not in existing:
+            connection.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+                f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+            ))
+            created.append(name)
+        month = add_months(month, 1)
+
+    return created
+
+
+def _archive_table(connection: Connection, name: str, archive_dir: Path) -> Tuple[int, Path]:
+    """ COPY a detached partition into <archive_dir>/<name>.csv.gz, then drop it """
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_dir / f"{name}.csv.gz"
+    partial = archive_dir / f"{name}.csv.gz.partial"
+
+    rows = connection.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+    cursor = connection.connection.driver_connection.cursor()
+    with gzip.open(partial, "wb") as output:
+        with cursor.copy(f"COPY (SELECT * FROM {name} ORDER BY claimed_at, id) TO STDOUT WITH (FORMAT csv, HEADER)") as copy:
+            for data in copy:
+                output.write(data)
+    with open(partial, "rb") as written:
+        os.fsync(written.fileno())
+    os.replace(partial, path)
+
+    # Only drop once the archive is safely on disk
+    connection.execute(text(f"DROP TABLE {name}"))
+    connection.commit()
+    return rows, path
+
+
+def archive_expired_partitions(
+    engine: Engine,
+    retention_months: int = CLAIM_RETENTION_MONTHS,
+    archive_dir: str = CLAIM_ARCHIVE_DIR,
+    dry_run: bool = False
+) -> List[dict]:
+    """
+    Detach, archive and drop every claim partition whose whole month is
+    older than `retention_months`. Returns one report dict per partition.
+    """
+
+    cutoff = add_months(month_start(), -retention_months)
+    reports = []
+    to_detach = []
+
+    with engine.connect() as connection:
+        expired = [name for name, month in attached_partitions(connection).items() if month < cutoff]
+        to_archive = sorted(name for name, month in detached_partitions(connection).items() if month < cutoff)
+        pending = set(connection.execute(text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = CAST(:parent AS regclass) AND pg_inherits.inhdetachpending
+        """), {"parent": PARENT_TABLE}).scalars())
+
+        for name in sorted(expired):
+            open_claims = connection.execute(
+                text(f"SELECT count(*) FROM {name} WHERE released_at IS NULL")
+            ).scalar()
+            if open_claims:
+                reports.append({"partition": name, "action": "skipped", "open_claims": open_claims})
+            else:
+                to_detach.append(name)
+
+    if dry_run:
+        return reports + [{"partition": name, "action": "would archive"} for name in to_archive + to_detach]
+
+    # DETACH .. CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for name in to_detach:
+            # An interrupted concurrent detach has to be finalized instead
+            mode = "FINALIZE" if name in pending else "CONCURRENTLY"
+            connection.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name} {mode}"))
+            to_archive.append(name)
+
+    with engine.connect() as connection:
+        for name in to_archive:
+            rows, path = _archive_table(connection, name, Path(archive_dir))
+            reports.append({"partition": name, "action": "archived", "rows": rows, "path": str(path)})
+
+    return reports
+
+
+async def keep_claim_partitions(engine: Engine, interval_hours: float = CLAIM_PARTITION_CHECK_HOURS) -> None:
+    """ Background task: make sure future partitions exist, now and every interval """
+
+    def ensure() -> List[str]:
+        with engine.begin() as connection:
+            return ensure_claim_partitions(connection)
+
+    while True:
+        try:
+            created = await asyncio.to_thread(ensure)
+            if created:
+                request_log.event("claim_partitions_created", partitions=created)
+        except SQLAlchemyError as e:
+            request_log.event("claim_partition_check_failed", error=str(e))
+        await asyncio.sleep(interval_hours * 3600)
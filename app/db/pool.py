@@ -0,0 +1,104 @@
+# app/db/pool.py
+
+"""
+Connection pool configuration and instrumentation.
+
+Pool settings come from the environment so they can be sized per deployment:
+    - DB_POOL_SIZE          persistent connections per engine (default 10)
+    - DB_MAX_OVERFLOW       extra connections allowed under burst (default 20)
+    - DB_POOL_TIMEOUT       seconds to wait for a connection (default 30)
+    - DB_POOL_RECYCLE       seconds before a connection is replaced (default 1800)
+    - DB_POOL_PRE_PING      check connections on checkout (default true)
+    - DB_ECHO               log every SQL statement (default false; development only,
+                            see app/sql_profiler.py for production)
+    - DB_POOL_WARMUP        connections opened per engine at app startup (default 2)
+
+The pool classes below are the stock QueuePool / AsyncAdaptedQueuePool with
+a checkout timer, so waiters and checkout wait time can be read next to the
+pool's own checked-out / overflow counters.
+"""
+
+import os
+import threading
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "2"))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def pool_settings() -> dict:
+    """ Keyword arguments shared by create_engine and create_async_engine """
+
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+        "echo": _env_bool("DB_ECHO", False),
+    }
+
+
+class _CheckoutTimer:
+    """ Tracks callers waiting for a connection and how long they waited """
+
+    def _init_stats(self) -> None:
+        self._stats_lock = threading.Lock()
+        self.waiters = 0
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        with self._stats_lock:
+            self.waiters += 1
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.waiters -= 1
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            checkouts = self.checkouts
+            wait_total = self.wait_total
+            wait_max = self.wait_max
+            waiters = self.waiters
+
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "waiters": waiters,
+            "checkouts": checkouts,
+            "checkout_wait_avg_ms": round(wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+            "checkout_wait_max_ms": round(wait_max * 1000, 3),
+        }
+
+
+class InstrumentedQueuePool(_CheckoutTimer, QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_stats()
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimer, AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_stats()
@@ -0,0 +1,83 @@
+# app/db/query_budget.py
+
+"""
+Per-request SQL statement counting and query budgets.
+
+Routes declare how many statements they are allowed to issue:
+
+    @app.get("/api/activity")
+    @query_budget(2)
+    async def get_post(...): ...
+
+When budgets are enforced (ENFORCE_QUERY_BUDGETS=1, meant for tests), every
+statement executed on an instrumented engine is counted against the current
+request, and a request that goes over its route's budget raises
+QueryBudgetExceeded - which is how an N+1 lazy load shows up as a failure
+instead of a slow page.
+"""
+
+import os
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ENFORCE_QUERY_BUDGETS = os.getenv("ENFORCE_QUERY_BUDGETS", "").lower() in ("1", "true", "yes")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """ A request issued more SQL statements than its route allows """
+
+
+class StatementCounter:
+    """ Statements issued while handling one request """
+
+    def __init__(self):
+        self.count = 0
+        self.statements: List[str] = []
+
+    def record(self, statement: str) -> None:
+        self.count += 1
+        self.statements.append(statement)
+
+
+_current_counter: ContextVar[Optional[StatementCounter]] = ContextVar("statement_counter", default=None)
+
+
+def query_budget(max_statements: int) -> Callable:
+    """ Declare the maximum number of SQL statements a route may issue """
+
+    def decorator(func: Callable) -> Callable:
+        func.__query_budget__ = max_statements
+        return func
+
+    return decorator
+
+
+def start_counting() -> StatementCounter:
+    counter = StatementCounter()
+    _current_counter.set(counter)
+    return counter
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.record(statement)
+
+
+def install_statement_counter(engine: Engine) -> None:
+    """ Count statements on a (sync) engine - pass async_engine.sync_engine for async """
+
+    if not event.contains(engine, "before_cursor_execute", _count_statement):
+        event.listen(engine, "before_cursor_execute", _count_statement)
+
+
+def check_budget(endpoint: Optional[Callable], path: str, counter: StatementCounter) -> None:
+    budget = getattr(endpoint, "__query_budget__", None)
+    if budget is not None and counter.count > budget:
+        statements = "\n\n".join(counter.statements)
+        raise QueryBudgetExceeded(
+            f"{path} issued {counter.count} SQL statements (budget {budget}):\n{statements}"
+        )
@@ -5,16 +5,32 @@ Database configuration and setup module.
 
 This module configures the SQLAlchemy for the System Management application.
 It provides:
-    - Database engine
+    - Database engine (get_engine)
     - Session factory for creating database sessions
+    - Async engine (get_async_engine) and session factory (asyncpg driver) for async routes
     - Base class for all ORM models
+
+Nothing here connects, or even loads a database driver, at import. The
+engines are created on first use - the first session, get_engine(), or the
+app's startup warm-up (warm_pools) - so scripts and tests that only need the
+models or one engine don't pay for both, and DATABASE_URL is only required
+once a database is actually used. `engine`, `async_engine` and
+`ASYNC_DATABASE_URL` can still be imported by name; that creates them.
 """
 
+import asyncio
 import os
+import threading
+from typing import Callable, List, Optional
+
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
+from .pool import DB_POOL_WARMUP, InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_settings
+
 # read the .env
 load_dotenv()
 
@@ -24,14 +40,145 @@ class Base(DeclarativeBase):
 
 # Database setup
 DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL not found...")
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,          # print SQL to see what's hapening
-    pool_pre_ping=True  # check if connection is live
-)
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_engine_hooks: List[Callable[[Engine], None]] = []
+_engine_lock = threading.RLock()
+
+
+def database_url() -> str:
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL not found...")
+    return DATABASE_URL
+
+
+def async_database_url() -> str:
+    """ Same database as DATABASE_URL, but through asyncpg (or ASYNC_DATABASE_URL) """
+
+    return os.getenv("ASYNC_DATABASE_URL") or make_url(database_url())\
+        .set(drivername="postgresql+asyncpg")\
+        .render_as_string(hide_password=False)
+
+
+def on_engine(hook: Callable[[Engine], None]) -> None:
+    """ Run hook(engine) on every (sync) engine: those created already and those to come """
+
+    with _engine_lock:
+        if hook in _engine_hooks:
+            return
+        _engine_hooks.append(hook)
+        if _engine is not None:
+            hook(_engine)
+        if _async_engine is not None:
+            hook(_async_engine.sync_engine)
+
+
+def get_engine() -> Engine:
+    """ The sync engine, created on first call """
+
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                # Pool size, overflow, timeout, recycle, pre-ping and echo come from the
+                # environment (see app/db/pool.py). SQL echo is off unless DB_ECHO is set.
+                engine = create_engine(
+                    database_url(),
+                    poolclass=InstrumentedQueuePool,
+                    **pool_settings()
+                )
+                for hook in _engine_hooks:
+                    hook(engine)
+                _engine = engine
+    return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """ The async engine, created on first call - a separate pool sized by the same settings """
+
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                # Async routes never block the event loop on a DB round trip
+                async_engine = create_async_engine(
+                    async_database_url(),
+                    poolclass=InstrumentedAsyncQueuePool,
+                    **pool_settings()
+                )
+                for hook in _engine_hooks:
+                    hook(async_engine.sync_engine)
+                _async_engine = async_engine
+    return _async_engine
+
+
+class _LazySessionmaker(sessionmaker):
+    """ sessionmaker bound to the engine on its first session, not at import """
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    """ async_sessionmaker bound to the async engine on its first session """
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_async_engine())
+        return super().__call__(**local_kw)
+
 
 # Session factory - create new db sessions
-SessionLocal = sessionmaker(bind=engine)
\ No newline at end of file
+SessionLocal = _LazySessionmaker()
+
+# Objects are read after commit (e.g. the user after login), so keep them loaded
+AsyncSessionLocal = _LazyAsyncSessionmaker(expire_on_commit=False)
+
+
+def __getattr__(name: str):
+    # `from app.db.session import engine` keeps working - and creates the engine
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    if name == "ASYNC_DATABASE_URL":
+        return async_database_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def warm_pools(connections: int = DB_POOL_WARMUP) -> None:
+    """ Create both engines and open `connections` pooled connections in each """
+
+    engine = get_engine()
+    async_engine = get_async_engine()
+    connections = min(connections, engine.pool.size())
+    if connections <= 0:
+        return
+
+    def warm_sync() -> None:
+        opened = [engine.connect() for _ in range(connections)]
+        for connection in opened:
+            connection.close()
+
+    opened = await asyncio.gather(*(async_engine.connect().start() for _ in range(connections)))
+    await asyncio.gather(*(connection.close() for connection in opened))
+    await asyncio.to_thread(warm_sync)
+
+
+def pool_stats() -> dict:
+    """ Live statistics for both connection pools """
+
+    return {
+        "sync": get_engine().pool.stats(),
+        "async": get_async_engine().sync_engine.pool.stats()
+    }
+
+
+async def get_async_db():
+    """ FastAPI dependency yielding an AsyncSession """
+
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -21,6 +21,7 @@ from .db_models import (
     User
 )
 
+from .partitions import ensure_claim_partitions
 from .session import Base, engine
 from sqlalchemy import text
 from typing import List
@@ -35,6 +36,9 @@ def create_all_tables() -> None:
     try:
         with engine.connect():
             metadata.create_all(bind=engine)
+        # system_claims is partitioned - it needs its monthly partitions
+        with engine.begin() as connection:
+            ensure_claim_partitions(connection)
         print("Tables created sucesfully")
     except Exception as e:
         print(f"Error creating table: {e}")
@@ -0,0 +1,171 @@
+# app/events.py
+
+"""
+Live system and claim events for browsers (Server-Sent Events).
+
+Triggers on system_claims and systems (migration 0003) publish a small JSON
+payload with pg_notify on the "system_events" channel. Each worker keeps ONE
+dedicated LISTEN connection and fans every notification out to all of its
+SSE subscribers, so the database sees one listener per worker no matter how
+many dashboards are open.
+
+Payloads carry their organization_id (migration 0011). A browser's
+subscriber only receives its own organization's events (and "resync");
+internal consumers - the reservation index, waitlist and expiry tasks -
+subscribe without an organization and receive everything.
+
+Every subscriber has a bounded queue. A client that falls SSE_QUEUE_SIZE
+events behind is dropped rather than slowing the others down or growing
+memory; EventSource reconnects on its own and the page refetches.
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from typing import Optional, Set
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from .db.session import async_database_url
+from .request_log import request_log
+
+EVENTS_CHANNEL = "system_events"
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+RECONNECT_DELAY_SECONDS = 1.0
+RECONNECT_DELAY_MAX_SECONDS = 30.0
+
+
+class Subscriber:
+    """ One SSE client: a bounded queue of pending events """
+
+    def __init__(self, maxsize: int = SSE_QUEUE_SIZE, organization_id: Optional[uuid.UUID] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+        # Payloads carry ids as JSON strings
+        self.organization_id = str(organization_id) if organization_id is not None else None
+
+    def wants(self, event: dict) -> bool:
+        """ Unscoped subscribers get every event, scoped ones their organization's """
+
+        if self.organization_id is None or event.get("type") == "resync":
+            return True
+        return event.get("organization_id") == self.organization_id
+
+    def offer(self, event: dict) -> bool:
+        """ Queue an event without waiting; False means the client is too slow """
+
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.dropped = True
+            return False
+
+
+class EventBroadcaster:
+    """ Shared LISTEN connection fanning notifications out to subscribers """
+
+    def __init__(self, channel: str = EVENTS_CHANNEL):
+        self.channel = channel
+        self.subscribers: Set[Subscriber] = set()
+        self.events_received = 0
+        self.subscribers_dropped = 0
+        self._connection: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._connection_lost = asyncio.Event()
+
+    def _dsn(self) -> str:
+        # asyncpg wants a plain postgresql:// DSN, not the SQLAlchemy dialect URL
+        return make_url(async_database_url()).set(drivername="postgresql").render_as_string(hide_password=False)
+
+    def subscribe(self, organization_id: Optional[uuid.UUID] = None) -> Subscriber:
+        """ Subscribe to one organization's events, or to all of them (internal consumers) """
+
+        subscriber = Subscriber(organization_id=organization_id)
+        self.subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen_forever())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    def publish(self, event: dict) -> None:
+        """ Fan an event out; slow subscribers are dropped, never awaited """
+
+        self.events_received += 1
+        for subscriber in list(self.subscribers):
+            if not subscriber.wants(event):
+                continue
+            if not subscriber.offer(event):
+                self.subscribers.discard(subscriber)
+                self.subscribers_dropped += 1
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        self.publish(event)
+
+    def _on_termination(self, connection) -> None:
+        self._connection_lost.set()
+
+    async def _listen_forever(self) -> None:
+        delay = RECONNECT_DELAY_SECONDS
+        while True:
+            try:
+                self._connection_lost.clear()
+                self._connection = await asyncpg.connect(self._dsn())
+                self._connection.add_termination_listener(self._on_termination)
+                await self._connection.add_listener(self.channel, self._on_notification)
+                delay = RECONNECT_DELAY_SECONDS
+
+                # Events missed while reconnecting are lost - tell clients to refetch
+                self.publish({"type": "resync"})
+                await self._connection_lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except (OSError, asyncpg.PostgresError) as e:
+                request_log.event("event_listener_failed", error=str(e), retry_in_s=delay)
+            finally:
+                await self._close_connection()
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_DELAY_MAX_SECONDS)
+
+    async def _close_connection(self) -> None:
+        if self._connection is not None and not self._connection.is_closed():
+            try:
+                await self._connection.close(timeout=5)
+            except (OSError, asyncpg.PostgresError, asyncio.TimeoutError):
+                self._connection.terminate()
+        self._connection = None
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.subscribers.clear()
+
+    def stats(self) -> dict:
+        return {
+            "listening": self._connection is not None,
+            "subscribers": len(self.subscribers),
+            "events_received": self.events_received,
+            "subscribers_dropped": self.subscribers_dropped
+        }
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+
+
+event_broadcaster = EventBroadcaster()
@@ -0,0 +1,152 @@
+# app/exports.py
+
+"""
+Streaming export of claim history (CSV or NDJSON).
+
+Claim history is read through a server-side cursor in batches of
+EXPORT_BATCH_SIZE rows and each batch is formatted and handed on before the
+next one is fetched, so memory stays flat however many rows match. Only
+plain columns are selected (no ORM objects), joined with the system and
+user names.
+
+The same query and formatting back both the HTTP endpoint (async engine)
+and the export_claims.py CLI (sync engine).
+"""
+
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import Select, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .db.db_models import System, SystemClaim, User
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
+EXPORT_COLUMNS = (
+    "claim_id",
+    "claimed_at",
+    "released_at",
+    "organization_id",
+    "system_id",
+    "system_name",
+    "user_id",
+    "user_email",
+    "user_first_name",
+    "user_last_name",
+    "notes"
+)
+
+
+def claim_history_query(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    organization_id: Optional[uuid.UUID] = None,
+    system_id: Optional[uuid.UUID] = None
+) -> Select:
+    """ Claims with system and user names, oldest first; `until` is exclusive """
+
+    query = (
+        select(
+            SystemClaim.id.label("claim_id"),
+            SystemClaim.claimed_at,
+            SystemClaim.released_at,
+            SystemClaim.organization_id,
+            SystemClaim.system_id,
+            System.name.label("system_name"),
+            SystemClaim.claimed_by_user_id.label("user_id"),
+            User.email.label("user_email"),
+            User.first_name.label("user_first_name"),
+            User.last_name.label("user_last_name"),
+            SystemClaim.notes
+        )
+        .join(System, SystemClaim.system_id == System.id)
+        .join(User, SystemClaim.claimed_by_user_id == User.id)
+        .order_by(SystemClaim.claimed_at, SystemClaim.id)
+    )
+    if since is not None:
+        query = query.where(SystemClaim.claimed_at >= since)
+    if until is not None:
+        query = query.where(SystemClaim.claimed_at < until)
+    if organization_id is not None:
+        query = query.where(SystemClaim.organization_id == organization_id)
+    if system_id is not None:
+        query = query.where(SystemClaim.system_id == system_id)
+    return query
+
+
+def _value(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def format_header(export_format: str) -> str:
+    """ Text written before the first batch (the CSV header row) """
+
+    if export_format != "csv":
+        return ""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_COLUMNS)
+    return buffer.getvalue()
+
+
+def format_batch(export_format: str, rows: Iterable[Sequence]) -> str:
+    """ One chunk of output for a batch of rows in EXPORT_COLUMNS order """
+
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["" if value is None else _value(value) for value in row])
+        return buffer.getvalue()
+
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, map(_value, row)))) + "\n"
+        for row in rows
+    )
+
+
+def iter_claim_batches(
+    connection: Connection,
+    query: Select,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[Sequence[Sequence]]:
+    """ Batches of rows read through a server-side cursor (sync engine) """
+
+    result = connection.execution_options(yield_per=batch_size).execute(query)
+    yield from result.partitions()
+
+
+async def stream_claim_history(
+    engine: AsyncEngine,
+    query: Select,
+    export_format: str,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[str]:
+    """
+    Formatted chunks read through a server-side cursor (async engine).
+
+    Opens its own connection for the lifetime of the stream, so the response
+    body is not tied to the request's session.
+    """
+
+    yield format_header(export_format)
+    async with engine.connect() as connection:
+        result = await connection.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield format_batch(export_format, rows)
@@ -0,0 +1,170 @@
+# app/fragment_cache.py
+
+"""
+Rendered HTMX fragment cache with ETag revalidation.
+
+A fragment is identified by:
+    - the template (and a digest of every template file, so a deploy with
+      changed templates never serves old markup)
+    - the request's query string (filters, cursor), plus a route-supplied
+      variant for anything else it renders (e.g. the organization and the
+      minute of a time-relative report)
+    - the data versions it depends on - sums of the data_versions counters,
+      bumped by triggers in the same transaction as every write ("users"
+      for fragments that show other users' names, e.g. a system's holder)
+    - the viewer's role bits (is_admin)
+
+The viewer's role is the only per-viewer part of the key, so every user
+of the same role shares one entry. A cached template must not render the
+viewer's own fields (name, email, id) - if one needs to, pass them in
+`variant` (e.g. the user id), as get_utilization does with the
+organization.
+
+The ETag is a hash of that key, so it is stable across workers. A request
+whose If-None-Match matches the current ETag gets a 304 after a single
+data_versions read; otherwise the rendered body is served from an
+in-process LRU, and the ORM is only queried when the fragment has never
+been rendered at this version. Nothing expires by time: a new version is a
+new key.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+from fastapi.templating import Jinja2Templates
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db.db_models import DataVersion
+
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "512"))
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+
+def _templates_digest() -> str:
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(TEMPLATES_DIR.glob("*.html")):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class FragmentCache:
+    """ Bounded LRU of ETag -> rendered body """
+
+    def __init__(self, maxsize: int = FRAGMENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.templates_digest = _templates_digest()
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def etag(self, template: str, variant: str, versions: Dict[str, int], role: str) -> str:
+        key = "|".join([
+            self.templates_digest,
+            template,
+            variant,
+            ",".join(f"{domain}={versions.get(domain, 0)}" for domain in sorted(versions)),
+            role
+        ])
+        return '"' + hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '"'
+
+    def get(self, etag: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, body: bytes) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[etag] = body
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+fragment_cache = FragmentCache()
+
+
+async def read_data_versions(db: AsyncSession, domains: Iterable[str]) -> Dict[str, int]:
+    """ Current version per domain - one small query over the counter rows """
+
+    domains = tuple(domains)
+    if not domains:
+        return {}
+
+    result = await db.execute(
+        select(DataVersion.domain, func.sum(DataVersion.version))
+        .where(DataVersion.domain.in_(domains))
+        .group_by(DataVersion.domain)
+    )
+    versions = {domain: int(version) for domain, version in result.all()}
+    return {domain: versions.get(domain, 0) for domain in domains}
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))
+
+
+async def fragment_response(
+    request: Request,
+    db: AsyncSession,
+    templates: Jinja2Templates,
+    template: str,
+    domains: Tuple[str, ...],
+    is_admin: bool,
+    build_context: Callable[[], Awaitable[dict]],
+    variant: str = ""
+) -> Response:
+    """
+    Serve `template` from the fragment cache, or render it with the context
+    from `build_context()` (only awaited on a miss). `variant` keys anything
+    besides the query string the fragment depends on.
+    """
+
+    versions = await read_data_versions(db, domains)
+    etag = fragment_cache.etag(
+        template, f"{request.url.query}|{variant}", versions, "admin" if is_admin else "user"
+    )
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _etag_matches(request, etag):
+        fragment_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    body = fragment_cache.get(etag)
+    if body is None:
+        context = await build_context()
+        context["request"] = request
+        body = templates.get_template(template).render(context).encode()
+        fragment_cache.put(etag, body)
+
+    return HTMLResponse(content=body, headers=headers)
@@ -1,30 +1,129 @@
-from fastapi import Depends, FastAPI, Form, HTTPException, Request, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import APIRouter, Depends, FastAPI, File, Form, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.security import OAuth2
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncio
+import csv
+import io
+import os
+import time
+from urllib.parse import urlencode
+import uuid
 
-from app.db.session import SessionLocal
+from app.db.partitions import keep_claim_partitions
+from app.db.session import (
+    AsyncSessionLocal,
+    SessionLocal,
+    get_async_db,
+    get_async_engine,
+    get_engine,
+    on_engine,
+    pool_stats,
+    warm_pools
+)
+from app.db.query_budget import (
+    ENFORCE_QUERY_BUDGETS,
+    check_budget,
+    install_statement_counter,
+    query_budget,
+    start_counting
+)
 from app.db.db_models import(
                         User,
+                        Department,
                         Organization,
                         SystemClaim,
                         System
                     )
+from app.db.db_models.system import SystemStatus
 from app.auth import (
     authenticate_user,
     create_access_token,
     get_password_hash,
+    get_password_hash_async,
     get_current_active_user,
     get_current_user_from_cookie,
+    warm_up_password_hasher,
+    PasswordHasherBusy,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from app.principal_cache import UserSnapshot, principal_cache
+from app.claims import (
+    CLAIM_MAX_HOURS,
+    ClaimNotFound,
+    SystemNotFound,
+    SystemReserved,
+    SystemUnavailable,
+    claim_any_system,
+    claim_system,
+    release_system
+)
+from app.claim_expiry import claim_expiry
+from app.events import SSE_HEARTBEAT_SECONDS, event_broadcaster, format_sse
+from app.reservations import (
+    RESERVATION_MAX_DAYS,
+    InvalidReservation,
+    ReservationConflict,
+    ReservationNotFound,
+    cancel_reservation,
+    create_reservation,
+    reservation_index
+)
+from app.waitlist import (
+    AcquireRequest,
+    EmptyPool,
+    WaiterNotFound,
+    cancel as cancel_waiter,
+    enqueue,
+    resume,
+    waiter_status,
+    waitlist
+)
+from app.analytics import UTILIZATION_MAX_DAYS, utilization_report
+from app.exports import EXPORT_FORMATS, claim_history_query, stream_claim_history
+from app.request_log import request_log
+from app import metrics
+from app.sql_profiler import sql_profiler
+from app.fragment_cache import fragment_cache, fragment_response
+from app.system_import import import_systems
+from app.pagination import (
+    InvalidCursor, InvalidFilter, clamp_page_size, decode_cursor, encode_cursor, parse_filter
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Engines, the first pooled connections and the bcrypt backend are set up
+    # here rather than at import, so the first requests don't pay for them
+    try:
+        await warm_pools()
+    except (SQLAlchemyError, OSError) as e:
+        request_log.event("pool_warmup_failed", error=str(e))
+    await warm_up_password_hasher()
+    # Claims need this month's system_claims partition (and the next ones) to exist
+    partition_task = asyncio.create_task(keep_claim_partitions(get_engine()))
+    reservation_task = asyncio.create_task(reservation_index.keep_in_sync(get_async_engine(), event_broadcaster))
+    waitlist_task = asyncio.create_task(waitlist.run(AsyncSessionLocal, event_broadcaster))
+    expiry_task = asyncio.create_task(claim_expiry.run(AsyncSessionLocal, event_broadcaster))
+    yield
+    partition_task.cancel()
+    reservation_task.cancel()
+    waitlist_task.cancel()
+    expiry_task.cancel()
+    await event_broadcaster.stop()
+    request_log.stop()
 
-app = FastAPI()
+router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Records template_render_seconds; must be set before any template is loaded
+templates.env.template_class = metrics.TimedTemplate
 
 # Add this to make static files available in templates
 templates.env.globals["static"] = lambda path: f"/static/{path}"
@@ -34,20 +133,38 @@ def db_connect():
         yield db
 
 
-@app.middleware("http")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
 async def log_requests(request: Request, call_next) -> HTMLResponse:
-    print(f"Route: {request.url.path} | Method: {request.method}")
-    response = await call_next(request)
+    started = time.perf_counter()
+    request_metrics = metrics.start_request(request)
+    status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        duration = time.perf_counter() - started
+        metrics.finish_request(request, request_metrics, status_code, duration)
+        # Queued for the log writer thread - never blocks on stdout
+        request_log.request(request, status_code, duration, request_metrics)
 
+
+async def enforce_query_budgets(request: Request, call_next):
+    counter = start_counting()
+    response = await call_next(request)
+    check_budget(request.scope.get("endpoint"), request.url.path, counter)
     return response
 
 
-@app.get("/")
-def main_page(request: Request, db: Session = Depends(db_connect)) -> HTMLResponse:
+@router.get("/")
+@query_budget(1)
+async def main_page(request: Request, db: AsyncSession = Depends(get_async_db)) -> HTMLResponse:
     current_user = None
     # Check if user is authenticated via cookie
     try:
-        current_user = get_current_user_from_cookie(request, db)
+        current_user = await get_current_user_from_cookie(request, db)
     except HTTPException:
         pass  # User not authenticated
 
@@ -58,35 +175,43 @@ def main_page(request: Request, db: Session = Depends(db_connect)) -> HTMLRespon
     })
 
 
-@app.get("/login")
+@router.get("/login")
 def login_page(request: Request) -> HTMLResponse:
     return templates.TemplateResponse("login.html", {"request": request})
 
 
-@app.post("/api/login")
+@router.post("/api/login")
+@query_budget(2)
 async def login(
     request: Request,
     username: str = Form(),
     password: str = Form(),
     remember_me: str = Form(None),
-    db: Session = Depends(db_connect)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    print(f"Login attempt for user: {username}")
+    try:
+        user = await authenticate_user(db, username, password)
+    except PasswordHasherBusy:
+        request_log.event("login", email=username, outcome="hasher_busy")
+        return templates.TemplateResponse("login.html", {
+            "request": request,
+            "error": "Too many sign-in attempts right now, please try again"
+        }, status_code=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
     
-    user = authenticate_user(db, username, password)
     if not user:
-        print(f"Authentication failed for user: {username}")
+        request_log.event("login", email=username, outcome="failed")
         # Return login page with error message
         return templates.TemplateResponse("login.html", {
             "request": request,
             "error": "Incorrect email or password"
         })
     
-    print(f"Authentication successful for user: {username}")
+    request.state.user_id = user.id
+    request_log.event("login", email=username, outcome="success", user_id=user.id)
     
     # Update last login
     user.last_login = datetime.now()
-    db.commit()
+    await db.commit()
     
     # Remember me for 30 days
     if remember_me:
@@ -99,8 +224,6 @@ async def login(
         data={"sub": user.email}, expires_delta=access_token_expires
     )
     
-    print(f"Generated token for user {username}: {access_token[:20]}...")
-    
     # Create response with token in cookie and redirect to dashboard
     response = RedirectResponse(url="/", status_code=302)
     response.set_cookie(
@@ -114,7 +237,7 @@ async def login(
     return response
 
 
-@app.get("/logout")
+@router.get("/logout")
 def logout():
     """Logout user by clearing the cookie and redirecting to home."""
     response = RedirectResponse(url="/", status_code=302)
@@ -122,10 +245,10 @@ def logout():
     return response
 
 
-@app.get("/admin/create-user")
+@router.get("/admin/create-user")
 def admin_create_user_page(
     request: Request,
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ) -> HTMLResponse:
     # Check if current user is admin
     if not current_user.is_admin:
@@ -140,7 +263,7 @@ def admin_create_user_page(
     })
     
 
-@app.post("/api/admin/create-user")
+@router.post("/api/admin/create-user")
 async def admin_create_user(
     request: Request,
     first_name: str = Form(),
@@ -149,7 +272,7 @@ async def admin_create_user(
     password: str = Form(),
     is_admin: bool = Form(False),
     is_active: bool = Form(True),
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserSnapshot = Depends(get_current_active_user),
     db: Session = Depends(db_connect)
 ):
     # Check if current user is admin (you can modify this logic based on your admin criteria)
@@ -176,7 +299,14 @@ async def admin_create_user(
         db.refresh(organization)
     
     # Create new user with hashed password
-    hashed_password = get_password_hash(password)
+    try:
+        hashed_password = await get_password_hash_async(password)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password hashing is busy, please try again",
+            headers={"Retry-After": "1"}
+        )
     user = User(
         first_name=first_name,
         last_name=last_name,
@@ -193,53 +323,653 @@ async def admin_create_user(
     
     return {"message": "User created successfully"}
 
-@app.get("/api/activity")
-def get_post(
-    request: Request, 
-    db: Session = Depends(db_connect),
-    current_user: User = Depends(get_current_active_user)
+@router.get("/api/admin/principal-cache")
+def principal_cache_stats(current_user: UserSnapshot = Depends(get_current_active_user)):
+    """Hit ratio and size of the authenticated principal cache."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+
+    return principal_cache.stats()
+
+@router.get("/api/admin/db-pool")
+def db_pool_stats(current_user: UserSnapshot = Depends(get_current_active_user)):
+    """Connection pool usage, for sizing DB_POOL_SIZE / DB_MAX_OVERFLOW."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+
+    return pool_stats()
+
+@router.get("/api/admin/fragment-cache")
+def fragment_cache_stats(current_user: UserSnapshot = Depends(get_current_active_user)):
+    """Hit ratio and 304 count of the rendered fragment cache."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+
+    return fragment_cache.stats()
+
+@router.get("/api/admin/reservation-index")
+def reservation_index_stats(current_user: UserSnapshot = Depends(get_current_active_user)):
+    """Systems and reservations held by this worker's reservation index."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+
+    return reservation_index.stats()
+
+@router.get("/api/admin/waitlist")
+def waitlist_stats(current_user: UserSnapshot = Depends(get_current_active_user)):
+    """Long polls parked on this worker and systems its dispatcher granted."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+
+    return waitlist.stats()
+
+@router.get("/api/admin/claim-expiry")
+def claim_expiry_stats(current_user: UserSnapshot = Depends(get_current_active_user)):
+    """Deadlines scheduled on this worker and claims it has expired."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+
+    return claim_expiry.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics(request: Request) -> PlainTextResponse:
+    """Prometheus scrape endpoint for this worker; needs "Authorization: Bearer $METRICS_TOKEN" when set."""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token"
+        )
+
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
+@router.get("/api/admin/request-log")
+def request_log_stats(current_user: UserSnapshot = Depends(get_current_active_user)):
+    """Records written, sampled out and dropped by the request log."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+
+    return request_log.stats()
+
+@router.get("/admin/sql-profile")
+def admin_sql_profile_page(
+    request: Request,
+    order: str = Query("total", pattern="^(total|p95|max|count|slow)$"),
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ) -> HTMLResponse:
-    # see last 10 posts
-    claims = db.query(SystemClaim)\
-                    .join(User)\
-                    .join(System)\
-                    .order_by(SystemClaim.claimed_at.desc())\
-                    .limit(10)\
-                    .all()
-
-    return templates.TemplateResponse("activity.html", {
-        "request": request, 
-        "claims": claims, 
-        "user": current_user
+    """Statement fingerprints of this worker, worst first."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+
+    summary = sql_profiler.stats()
+    return templates.TemplateResponse("admin_sql_profile.html", {
+        "request": request,
+        "user": current_user,
+        "summary": summary,
+        "since": datetime.fromtimestamp(summary["since"], timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC"),
+        "entries": sql_profiler.report(order),
+        "order": order,
+        "orders": ("total", "p95", "max", "count", "slow")
     })
 
-@app.get("/api/dashboard")
-def get_dashboard(
+@router.get("/api/admin/sql-profile")
+def sql_profile(
+    order: str = Query("total", pattern="^(total|p95|max|count|slow)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Statement fingerprints with count, total, p95 and captured plans."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+
+    return {"summary": sql_profiler.stats(), "fingerprints": sql_profiler.report(order, limit)}
+
+@router.post("/api/admin/sql-profile/reset")
+def reset_sql_profile(current_user: UserSnapshot = Depends(get_current_active_user)):
+    """Start the SQL profile over."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+
+    sql_profiler.reset()
+    return sql_profiler.stats()
+
+@router.get("/api/admin/events")
+def event_stats(current_user: UserSnapshot = Depends(get_current_active_user)):
+    """Listener state, subscriber count and slow clients dropped."""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+
+    return event_broadcaster.stats()
+
+@router.get("/api/admin/claims/export")
+def export_claims(
+    export_format: str = Query("csv", alias="format"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    system_id: Optional[uuid.UUID] = None,
+    current_user: UserSnapshot = Depends(get_current_active_user)
+) -> StreamingResponse:
+    """
+    Stream the admin's organization's claim history as CSV or NDJSON
+    (format=csv|ndjson), oldest first.
+
+    Rows are read through a server-side cursor and written out batch by
+    batch, so the export runs in constant memory.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format, expected one of: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    query = claim_history_query(since, until, current_user.organization_id, system_id)
+    filename = f"claims-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.{export_format}"
+    return StreamingResponse(
+        stream_claim_history(get_async_engine(), query, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/api/admin/systems/import")
+def import_systems_csv(
+    file: UploadFile = File(),
+    dry_run: bool = Form(False),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """
+    Bulk import systems into the admin's organization from an inventory CSV
+    (name,status,department,notes); upserts on name.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. Admin privileges required."
+        )
+
+    # The upload is spooled to disk by Starlette and read back as a stream
+    source = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    with get_engine().connect() as connection:
+        try:
+            result = import_systems(connection, source, current_user.organization_id)
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid CSV: {e}"
+            )
+
+        if dry_run:
+            connection.rollback()
+        else:
+            connection.commit()
+
+    return {"dry_run": dry_run, **result.as_dict()}
+
+@router.get("/api/activity")
+@query_budget(3)
+async def get_post(
     request: Request, 
-    db: Session = Depends(db_connect),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ) -> HTMLResponse:
-    return templates.TemplateResponse("dashboard.html", {
-            "request": request, 
-            "user": current_user
-        })
+    async def build_context() -> dict:
+        # see last 10 posts - one query, only the columns the feed shows, so no
+        # ORM objects are hydrated and nothing can lazy load per row
+        result = await db.execute(
+                        select(
+                            SystemClaim.id,
+                            SystemClaim.claimed_at,
+                            SystemClaim.released_at,
+                            SystemClaim.notes,
+                            System.name.label("system_name"),
+                            User.first_name.label("user_first_name"),
+                            User.last_name.label("user_last_name"),
+                            User.email.label("user_email")
+                        )
+                        .join(User, SystemClaim.claimed_by_user_id == User.id)
+                        .join(System, SystemClaim.system_id == System.id)
+                        .order_by(SystemClaim.claimed_at.desc())
+                        .limit(10)
+                    )
+        return {"claims": result.all(), "user": current_user}
 
+    return await fragment_response(
+        request, db, templates, "activity.html",
+        ("claims", "systems", "users"), current_user.is_admin, build_context
+    )
 
-@app.get("/api/systems")
-def get_systems(
+@router.get("/api/dashboard")
+@query_budget(1)
+async def get_dashboard(
     request: Request, 
-    db: Session = Depends(db_connect),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ) -> HTMLResponse:
-    systems = db.query(System).all()
-    
-    return templates.TemplateResponse("systems_content.html", {
-        "request": request, 
-        "systems": systems, 
-        "user": current_user
+    async def build_context() -> dict:
+        return {"user": current_user}
+
+    return await fragment_response(
+        request, db, templates, "dashboard.html",
+        (), current_user.is_admin, build_context
+    )
+
+
+@router.get("/api/dashboard/utilization")
+@query_budget(3)
+async def get_utilization(
+    request: Request,
+    days: int = Query(30, ge=1, le=UTILIZATION_MAX_DAYS),
+    department_id: Optional[uuid.UUID] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+) -> HTMLResponse:
+    """
+    Utilization of the organization's systems over the last `days` days,
+    per department and per system.
+    """
+    # Open claims keep counting, so the report is also keyed by the minute
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+
+    async def build_context() -> dict:
+        def report() -> dict:
+            with get_engine().connect() as connection:
+                return utilization_report(
+                    connection, current_user.organization_id,
+                    now - timedelta(days=days), now, department_id
+                )
+
+        return {"report": await asyncio.to_thread(report), "days": days, "user": current_user}
+
+    return await fragment_response(
+        request, db, templates, "dashboard_utilization.html",
+        ("claims", "systems", "departments"), current_user.is_admin, build_context,
+        variant=f"{current_user.organization_id}|{now.isoformat()}"
+    )
+
+
+@router.get("/api/systems")
+@query_budget(4)
+async def get_systems(
+    request: Request, 
+    status_filter: Optional[str] = Query(None, alias="status"),
+    department_filter: Optional[str] = Query(None, alias="department_id"),
+    organization_filter: Optional[str] = Query(None, alias="organization_id"),
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+) -> HTMLResponse:
+    """
+    One page of systems ordered by (name, id).
+
+    Without a cursor the full systems view is rendered; with `after` only the
+    next batch of table rows is returned for HTMX infinite scroll.
+    """
+    try:
+        cursor = decode_cursor(after)
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    # The filter form sends "" for its "All ..." options
+    try:
+        system_status = parse_filter(status_filter, SystemStatus)
+        department_id = parse_filter(department_filter, uuid.UUID)
+        organization_id = parse_filter(organization_filter, uuid.UUID)
+    except InvalidFilter as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid filter value: {e}"
+        )
+    page_size = clamp_page_size(limit)
+
+    async def build_context() -> dict:
+        # The holder comes from the current-holder pointer in the same query
+        query = (
+            select(System)
+            .options(joinedload(System.current_holder).load_only(User.first_name, User.last_name))
+            .order_by(System.name, System.id)
+        )
+        if system_status is not None:
+            query = query.where(System.status == system_status)
+        if department_id is not None:
+            query = query.where(System.department_id == department_id)
+        if organization_id is not None:
+            query = query.where(System.organization_id == organization_id)
+        if cursor is not None:
+            query = query.where(tuple_(System.name, System.id) > cursor)
+
+        # One extra row tells us whether there is a next page
+        result = await db.execute(query.limit(page_size + 1))
+        systems = result.scalars().all()
+
+        next_url = None
+        if len(systems) > page_size:
+            systems = systems[:page_size]
+            params = {key: value for key, value in request.query_params.items() if key != "after"}
+            params["after"] = encode_cursor(systems[-1].name, systems[-1].id)
+            next_url = f"{request.url.path}?{urlencode(params)}"
+
+        context = {
+            "systems": systems, 
+            "next_url": next_url,
+            "user": current_user
+        }
+        if cursor is not None:
+            return context
+
+        departments = await db.execute(select(Department.id, Department.name).order_by(Department.name))
+        context.update({
+            "statuses": list(SystemStatus),
+            "departments": departments.all(),
+            "selected_status": system_status.value if system_status else "",
+            "selected_department": str(department_id) if department_id else ""
+        })
+        return context
+
+    # Infinite-scroll pages only render rows; the first page renders the whole view
+    template = "systems_rows.html" if cursor is not None else "systems_content.html"
+    return await fragment_response(
+        request, db, templates, template,
+        ("systems", "departments", "users"), current_user.is_admin, build_context
+    )
+
+@router.get("/api/events")
+async def events(
+    request: Request,
+    current_user: UserSnapshot = Depends(get_current_active_user)
+) -> StreamingResponse:
+    """
+    Server-Sent Events stream of claim and system status changes.
+
+    Events: "claim" (claimed/released), "system" (status changed) and
+    "resync" (events may have been missed - refetch the current view).
+    Only the user's own organization's events are sent.
+    """
+    subscriber = event_broadcaster.subscribe(current_user.organization_id)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not subscriber.dropped:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+
+            if subscriber.dropped:
+                # Too slow to keep up - the browser reconnects and refetches
+                yield format_sse({"type": "resync"})
+        finally:
+            event_broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
     })
 
-@app.post("/create-user")
+@router.post("/api/systems/claim-any")
+async def claim_any(
+    department_id: Optional[uuid.UUID] = None,
+    notes: Optional[str] = Form(None),
+    duration_minutes: Optional[int] = Form(None, ge=1, le=CLAIM_MAX_HOURS * 60),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Claim any free system in the user's organization (optionally one department)."""
+    try:
+        claimed = await claim_any_system(
+            db,
+            current_user.id,
+            department_id=department_id,
+            organization_id=current_user.organization_id,
+            notes=notes,
+            duration=timedelta(minutes=duration_minutes) if duration_minutes else None
+        )
+    except SystemUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="No free system available"
+        )
+
+    return {"message": "System claimed", **claimed.as_dict()}
+
+@router.post("/api/systems/{system_id}/claim")
+async def claim(
+    system_id: uuid.UUID,
+    notes: Optional[str] = Form(None),
+    duration_minutes: Optional[int] = Form(None, ge=1, le=CLAIM_MAX_HOURS * 60),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Claim a system for duration_minutes (default CLAIM_DEFAULT_HOURS); it is released automatically after."""
+    try:
+        claimed = await claim_system(
+            db, system_id, current_user.id, notes=notes,
+            duration=timedelta(minutes=duration_minutes) if duration_minutes else None,
+            organization_id=current_user.organization_id
+        )
+    except SystemNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="System not found"
+        )
+    except SystemReserved:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="System is reserved by another user"
+        )
+    except SystemUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="System is not free"
+        )
+
+    return {"message": "System claimed", **claimed.as_dict()}
+
+@router.post("/api/systems/{system_id}/release")
+async def release(
+    system_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    # Admins can release a claim held by anyone
+    holder = None if current_user.is_admin else current_user.id
+    try:
+        claim_id = await release_system(db, system_id, holder, organization_id=current_user.organization_id)
+    except ClaimNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No active claim on this system"
+        )
+
+    return {"message": "System released", "claim_id": str(claim_id)}
+
+@router.post("/api/systems/{system_id}/reservations")
+async def reserve(
+    system_id: uuid.UUID,
+    starts_at: datetime = Form(),
+    ends_at: datetime = Form(),
+    notes: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Reserve a system for a future window [starts_at, ends_at)."""
+    try:
+        reserved = await create_reservation(
+            db, reservation_index, system_id,
+            current_user.id, current_user.organization_id,
+            starts_at, ends_at, notes=notes
+        )
+    except InvalidReservation as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except ReservationConflict:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="System is already reserved in that window"
+        )
+
+    return {"message": "System reserved", **reserved.as_dict()}
+
+@router.post("/api/reservations/{reservation_id}/cancel")
+async def cancel_system_reservation(
+    reservation_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    # Admins can cancel anyone's reservation in their organization
+    owner = None if current_user.is_admin else current_user.id
+    try:
+        system_id = await cancel_reservation(
+            db, reservation_index, reservation_id, current_user.organization_id, owner
+        )
+    except ReservationNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No active reservation with this id"
+        )
+
+    return {"message": "Reservation cancelled", "reservation_id": str(reservation_id), "system_id": str(system_id)}
+
+@router.get("/api/systems/{system_id}/next-free")
+@query_budget(2)
+async def next_free_slot(
+    system_id: uuid.UUID,
+    duration_minutes: int = Query(60, ge=1, le=RESERVATION_MAX_DAYS * 24 * 60),
+    after: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Earliest start (at or after `after`, default now) of a free window of the given length."""
+    known = await db.scalar(
+        select(System.id).where(System.id == system_id, System.organization_id == current_user.organization_id)
+    )
+    if known is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="System not found"
+        )
+
+    now = datetime.now(timezone.utc)
+    after = max(now, after.replace(tzinfo=after.tzinfo or timezone.utc)) if after else now
+    if not reservation_index.loaded:
+        await reservation_index.load(get_async_engine())
+    starts_at = reservation_index.next_free(system_id, after, timedelta(minutes=duration_minutes))
+
+    return {
+        "system_id": str(system_id),
+        "starts_at": starts_at.isoformat(),
+        "ends_at": (starts_at + timedelta(minutes=duration_minutes)).isoformat()
+    }
+
+@router.post("/api/acquire")
+async def acquire(
+    acquire_request: AcquireRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """Claim a free system of a pool, waiting up to `timeout` seconds behind earlier waiters.
+
+    200 with the claim once granted; 202 with the waiter id while still
+    queued - post again with that waiter_id to keep the place in line.
+    """
+    waiter_id = acquire_request.waiter_id
+    try:
+        if waiter_id is None:
+            waiter_id = await enqueue(db, current_user.id, current_user.organization_id, acquire_request)
+        else:
+            await resume(db, waiter_id, current_user.id, acquire_request.timeout)
+    except EmptyPool:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No systems in this pool"
+        )
+    except WaiterNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No waiter with this id (cancelled or abandoned)"
+        )
+
+    # Watch before dispatching, so a grant made in between still wakes us
+    granted = waitlist.watch(waiter_id)
+    try:
+        await waitlist.dispatch(db)
+        result = await waiter_status(db, waiter_id)
+        if result["status"] == "waiting":
+            try:
+                await asyncio.wait_for(granted, acquire_request.timeout)
+            except asyncio.TimeoutError:
+                pass
+            result = await waiter_status(db, waiter_id)
+    finally:
+        waitlist.unwatch(waiter_id)
+
+    if result["status"] == "waiting":
+        response.status_code = status.HTTP_202_ACCEPTED
+    return result
+
+@router.post("/api/acquire/{waiter_id}/cancel")
+async def cancel_acquire(
+    waiter_id: uuid.UUID,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    try:
+        await cancel_waiter(db, waiter_id, current_user.id)
+    except WaiterNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No waiting waiter with this id"
+        )
+
+    return {"message": "Left the waitlist", "waiter_id": str(waiter_id)}
+
+@router.post("/create-user")
 def create_user(
                 first_name: str=Form(),
                 last_name: str=Form(),
@@ -272,3 +1002,30 @@ def create_user(
 
     return {"message": "User created!"}
 
+
+def create_app() -> FastAPI:
+    """
+    Build the application. Cheap: no engine, connection or crypt context is
+    created here - the engines come up on first use or in the lifespan
+    warm-up, so importing this module (scripts, tests, workers) stays fast.
+    """
+    app = FastAPI(lifespan=lifespan)
+    app.mount("/static", StaticFiles(directory="app/static"), name="static")
+    app.include_router(router)
+
+    # Statement count and DB time per request, for /metrics and the request log
+    on_engine(metrics.install_engine_metrics)
+    # Slow-statement log and per-fingerprint timings, for /admin/sql-profile
+    on_engine(sql_profiler.install)
+    app.middleware("http")(log_requests)
+
+    # Test mode: fail any request that issues more SQL than its route's @query_budget
+    if ENFORCE_QUERY_BUDGETS:
+        on_engine(install_statement_counter)
+        app.middleware("http")(enforce_query_budgets)
+
+    return app
+
+
+# For `uvicorn app.main:app`; `uvicorn --factory app.main:create_app` builds a fresh one
+app = create_app()
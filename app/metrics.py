@@ -0,0 +1,333 @@
+# app/metrics.py
+
+"""
+Prometheus metrics, served as text by GET /metrics.
+
+    http_request_duration_seconds{method,route}   histogram
+    http_requests_total{method,route,status}      counter
+    http_requests_in_flight                       gauge
+    db_statements_per_request{route}              histogram
+    db_time_per_request_seconds{route}            histogram
+    db_statement_duration_seconds                 histogram (every statement)
+    password_hash_seconds{operation}              histogram (bcrypt verify / hash)
+    template_render_seconds{template}             histogram
+
+Observations come from the event loop, the request threadpool (sync routes,
+sync engine) and the bcrypt executor. Every thread writes to its own shard
+of each metric, so recording takes no lock; /metrics sums the shards. A
+scrape may see one observation half-applied, which Prometheus tolerates.
+Threadpool workers come and go (anyio retires idle ones), so the shards of
+threads that have exited are folded into one retired total - whenever a
+new thread registers and on every scrape - and the number of shards stays
+bounded by the live threads.
+
+Metrics are per worker process. With several uvicorn workers, scrape each
+one (or run one worker per container) - a scrape through a load balancer
+sees whichever worker answered.
+
+DB statements are attributed to the request through a ContextVar, the same
+way app/db/query_budget.py counts them: engine events on the sync engine
+and on async_engine.sync_engine, installed by install_engine_metrics.
+"""
+
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import jinja2
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+BCRYPT_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0)
+RENDER_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _add_series(total: Dict[Tuple[str, ...], list], shard: Dict[Tuple[str, ...], list]) -> None:
+    """ Add every series of `shard` into `total` """
+
+    for labels, series in list(shard.items()):
+        summed = total.get(labels)
+        if summed is None:
+            total[labels] = list(series)
+        else:
+            for i, value in enumerate(series):
+                summed[i] += value
+
+
+class _Metric:
+    """ Labelled series kept in one shard per live thread, plus the retired threads' total """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        # (owning thread, its shard) - a weak reference, so a finished thread can go
+        self._shards: List[Tuple[weakref.ref, Dict[Tuple[str, ...], list]]] = []
+        self._retired: Dict[Tuple[str, ...], list] = {}
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict[Tuple[str, ...], list]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            # Only taken once per thread
+            with self._shards_lock:
+                self._retire_finished()
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+        return shard
+
+    def _retire_finished(self) -> None:
+        """ Fold the shards of threads that have exited into _retired; needs _shards_lock """
+
+        live = []
+        for thread_ref, shard in self._shards:
+            thread = thread_ref()
+            if thread is None or not thread.is_alive():
+                # The thread is gone, so nothing writes to this shard any more
+                _add_series(self._retired, shard)
+            else:
+                live.append((thread_ref, shard))
+        self._shards = live
+
+    def _merged(self) -> Dict[Tuple[str, ...], list]:
+        merged: Dict[Tuple[str, ...], list] = {}
+        with self._shards_lock:
+            self._retire_finished()
+            _add_series(merged, self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            _add_series(merged, shard)
+        return merged
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = [0]
+        series[0] += amount
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, (value,) in sorted(self._merged().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """ A single unlabelled value, only changed on the event loop thread """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self.value = 0
+
+    def render(self) -> List[str]:
+        return self.header() + [f"{self.name} {_format_number(self.value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # Per-bucket counts (the last one is +Inf), then the sum
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def totals(self) -> Tuple[int, float]:
+        """ (count, sum) over every label set """
+
+        count, total = 0, 0.0
+        for series in self._merged().values():
+            count += sum(series[:-1])
+            total += series[-1]
+        return count, total
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, series in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_number(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_number(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time to produce the response (headers, for streams).",
+    LATENCY_BUCKETS, ("method", "route")
+)
+requests_total = Counter("http_requests_total", "Requests handled.", ("method", "route", "status"))
+requests_in_flight = Gauge("http_requests_in_flight", "Requests being handled right now.")
+request_statements = Histogram(
+    "db_statements_per_request", "SQL statements issued per request.", STATEMENT_BUCKETS, ("route",)
+)
+request_db_time = Histogram(
+    "db_time_per_request_seconds", "Time spent executing SQL per request.", DB_TIME_BUCKETS, ("route",)
+)
+statement_duration = Histogram(
+    "db_statement_duration_seconds", "Execution time of each SQL statement.", DB_TIME_BUCKETS
+)
+password_hash_time = Histogram(
+    "password_hash_seconds", "bcrypt time per call, excluding executor queueing.", BCRYPT_BUCKETS, ("operation",)
+)
+template_render_time = Histogram(
+    "template_render_seconds", "Jinja2 template render time.", RENDER_BUCKETS, ("template",)
+)
+
+REGISTRY = (
+    request_duration, requests_total, requests_in_flight,
+    request_statements, request_db_time, statement_duration,
+    password_hash_time, template_render_time
+)
+
+
+def render_metrics(metrics: Iterable[_Metric] = REGISTRY) -> str:
+    """ Prometheus text exposition format 0.0.4 """
+
+    return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+# Per-request collection
+
+class RequestMetrics:
+    """ SQL issued while handling one request """
+
+    __slots__ = ("statements", "db_seconds", "scope")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.statements = 0
+        self.db_seconds = 0.0
+        # The ASGI scope; routing adds "route" to it before the endpoint runs
+        self.scope = scope
+
+
+_current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def start_request(request: Optional[Request] = None) -> RequestMetrics:
+    request_metrics = RequestMetrics(request.scope if request is not None else None)
+    _current_request.set(request_metrics)
+    requests_in_flight.value += 1
+    return request_metrics
+
+
+def current_route() -> Optional[str]:
+    """ Route template of the request being handled in this context, if any """
+
+    request_metrics = _current_request.get()
+    if request_metrics is None or request_metrics.scope is None:
+        return None
+    return getattr(request_metrics.scope.get("route"), "path", None) or UNMATCHED_ROUTE
+
+
+def finish_request(request: Request, request_metrics: RequestMetrics, status_code: int, duration: float) -> None:
+    requests_in_flight.value -= 1
+    # Route template, not the path: unmatched paths would be unbounded label values
+    route = getattr(request.scope.get("route"), "path", None) or UNMATCHED_ROUTE
+    request_duration.observe(duration, request.method, route)
+    requests_total.inc(request.method, route, str(status_code))
+    request_statements.observe(request_metrics.statements, route)
+    request_db_time.observe(request_metrics.db_seconds, route)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.get("metrics_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    statement_duration.observe(elapsed)
+    request_metrics = _current_request.get()
+    if request_metrics is not None:
+        request_metrics.statements += 1
+        request_metrics.db_seconds += elapsed
+
+
+def _handle_error(exception_context) -> None:
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("metrics_started"):
+        connection.info["metrics_started"].pop()
+
+
+def install_engine_metrics(engine: Engine) -> None:
+    """ Time statements on a (sync) engine - pass async_engine.sync_engine for async """
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class TimedTemplate(jinja2.Template):
+    """ Template class that records its render time - set as env.template_class """
+
+    def render(self, *args, **kwargs) -> str:
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            template_render_time.observe(time.perf_counter() - started, self.name or "<string>")
+
+
+def time_password_job(operation: str, func):
+    """ Wrap a bcrypt call so the executor thread records how long it ran """
+
+    def timed(*args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            password_hash_time.observe(time.perf_counter() - started, operation)
+
+    return timed
@@ -0,0 +1,63 @@
+# app/pagination.py
+
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row on a page, encoded as an opaque
+URL-safe token. The next page is "rows strictly after that key", which an
+index can answer directly - unlike OFFSET, the cost does not grow with the
+page number.
+"""
+
+import base64
+import json
+import uuid
+from typing import Callable, Optional, Tuple, TypeVar
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+T = TypeVar("T")
+
+
+class InvalidCursor(ValueError):
+    """ Raised when a cursor token cannot be decoded """
+
+
+class InvalidFilter(ValueError):
+    """ Raised when a filter value cannot be parsed """
+
+
+def encode_cursor(name: str, row_id: uuid.UUID) -> str:
+    raw = json.dumps([name, str(row_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Tuple[str, uuid.UUID]]:
+    if not token:
+        return None
+
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        name, row_id = json.loads(raw)
+        return str(name), uuid.UUID(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(token) from e
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_filter(value: Optional[str], parse: Callable[[str], T]) -> Optional[T]:
+    """ A filter query parameter; blank (the form's "All ..." option) means no filter """
+
+    if value is None or not value.strip():
+        return None
+
+    try:
+        return parse(value.strip())
+    except ValueError as e:
+        raise InvalidFilter(value) from e
@@ -0,0 +1,165 @@
+# app/principal_cache.py
+
+"""
+In-process cache of authenticated principals.
+
+Every authenticated request used to decode the JWT and look the user up by
+email. The cache maps a token to its decoded claims plus a lightweight
+snapshot of the user, so repeated HTMX fragment requests skip both steps.
+
+Entries are bounded in number (LRU) and in age (TTL), never outlive the
+token's own "exp", and are dropped as soon as a commit changes a user's
+is_active, is_admin or password_hash (or deletes the user). The cache is
+per worker process; the TTL bounds how long another worker can lag behind.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .db.db_models.user import User
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+
+# Changing any of these must invalidate the cached principal
+SECURITY_ATTRIBUTES = ("is_active", "is_admin", "password_hash")
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """ Detached, read-only copy of the User fields the routes and templates use """
+
+    id: uuid.UUID
+    email: str
+    first_name: str
+    last_name: str
+    organization_id: uuid.UUID
+    is_active: bool
+    is_admin: bool
+    last_login: Optional[datetime]
+    avatar_url: Optional[str]
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            organization_id=user.organization_id,
+            is_active=user.is_active,
+            is_admin=user.is_admin,
+            last_login=user.last_login,
+            avatar_url=user.avatar_url
+        )
+
+
+class PrincipalCache:
+    """ Bounded TTL/LRU cache: token -> (claims, UserSnapshot) """
+
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, dict, UserSnapshot]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Tuple[dict, UserSnapshot]]:
+        """ Return (claims, snapshot) for a token, or None on a miss """
+
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, claims, snapshot = entry
+            if expires_at <= time.monotonic() or claims.get("exp", 0) <= time.time():
+                del self._entries[token]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return claims, snapshot
+
+    def put(self, token: str, claims: dict, snapshot: UserSnapshot) -> None:
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._entries[token] = (time.monotonic() + self.ttl, claims, snapshot)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: uuid.UUID) -> None:
+        """ Drop every cached token that belongs to a user """
+
+        with self._lock:
+            stale = [token for token, (_, _, snapshot) in self._entries.items()
+                     if snapshot.id == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio, 4)
+        }
+
+
+principal_cache = PrincipalCache()
+
+
+# Invalidation - collect changed users at flush time, drop them once the
+# transaction commits (a rollback leaves the cached principal valid).
+# Listening on Session also covers AsyncSession, which wraps a sync Session.
+
+@event.listens_for(Session, "after_flush")
+def _collect_principal_changes(session, flush_context) -> None:
+    changed = session.info.setdefault("principal_invalidations", set())
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changed.add(obj.id)
+
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            attrs = inspect(obj).attrs
+            if any(attrs[name].history.has_changes() for name in SECURITY_ATTRIBUTES):
+                changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_principals(session) -> None:
+    for user_id in session.info.pop("principal_invalidations", ()):
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_principal_changes(session) -> None:
+    session.info.pop("principal_invalidations", None)
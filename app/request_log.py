@@ -0,0 +1,187 @@
+# app/request_log.py
+
+"""
+Structured request log: one JSON object per line on stdout.
+
+Requests never wait on stdout. emit() puts the record on a bounded queue
+(put_nowait) and returns; a writer thread formats the records and writes
+them in batches. When the queue is full (stdout stalled, or a burst
+faster than it drains) the record is dropped and counted, not awaited.
+
+    {"ts": 1760787000.123, "event": "request", "method": "POST",
+     "route": "/api/systems/{system_id}/claim", "status": 200,
+     "duration_ms": 4.2, "user_id": "...", "db_statements": 2, "db_ms": 1.3}
+
+High-volume routes can be sampled with REQUEST_LOG_SAMPLE, a comma list
+of "route prefix=rate" (longest prefix wins, rate 0..1), e.g.
+"/static=0,/api/dashboard=0.1". Sampled records carry "sample_rate" so
+counts can be scaled back up. Errors (status >= 500) and requests slower
+than REQUEST_LOG_SLOW_MS are always kept.
+
+Everything else the server reports goes through event() too, never
+print(): logins, slow queries, and the background tasks' failures
+("event_listener_failed", "claim_partition_check_failed",
+"reservation_reload_failed", "waitlist_dispatch_failed",
+"claim_expiry_failed", "pool_warmup_failed") - those run on the event
+loop, where a stalled stdout would stall every request.
+"""
+
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from fastapi import Request
+
+REQUEST_LOG_BUFFER = int(os.getenv("REQUEST_LOG_BUFFER", "10000"))
+REQUEST_LOG_SAMPLE = os.getenv("REQUEST_LOG_SAMPLE", "")
+REQUEST_LOG_SLOW_MS = float(os.getenv("REQUEST_LOG_SLOW_MS", "1000"))
+REQUEST_LOG_BATCH = 256
+
+
+def parse_sample_rates(spec: str) -> List[Tuple[str, float]]:
+    """ "prefix=rate,..." -> [(prefix, rate)], longest prefix first """
+
+    rates = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, _, rate = item.rpartition("=")
+        if not prefix:
+            raise ValueError(f"REQUEST_LOG_SAMPLE entry needs prefix=rate: {item!r}")
+        rates.append((prefix, min(1.0, max(0.0, float(rate)))))
+    return sorted(rates, key=lambda entry: len(entry[0]), reverse=True)
+
+
+class RequestLog:
+    """ Bounded queue in front of a writer thread """
+
+    def __init__(
+        self,
+        sink: Optional[TextIO] = None,
+        buffer: int = REQUEST_LOG_BUFFER,
+        sample: str = REQUEST_LOG_SAMPLE,
+        slow_ms: float = REQUEST_LOG_SLOW_MS
+    ):
+        self._sink = sink
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=buffer)
+        self._rates = parse_sample_rates(sample)
+        self._slow_ms = slow_ms
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.emitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.write_errors = 0
+
+    def sample_rate(self, route: str) -> float:
+        for prefix, rate in self._rates:
+            if route.startswith(prefix):
+                return rate
+        return 1.0
+
+    def emit(self, record: dict) -> bool:
+        """ Queue a record for writing; False if it was dropped (buffer full) """
+
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.emitted += 1
+        return True
+
+    def event(self, event: str, **fields) -> bool:
+        return self.emit({"ts": round(time.time(), 3), "event": event, **fields})
+
+    def request(self, request: Request, status_code: int, duration: float, sql=None) -> bool:
+        """ Log a finished request, unless sampled out; `sql` is its metrics.RequestMetrics """
+
+        # The route template ("/api/systems/{system_id}") groups by endpoint
+        route = getattr(request.scope.get("route"), "path", None) or request.url.path
+        duration_ms = duration * 1000
+        rate = 1.0
+        if status_code < 500 and duration_ms < self._slow_ms:
+            rate = self.sample_rate(route)
+            if rate < 1.0 and random.random() >= rate:
+                self.sampled_out += 1
+                return False
+
+        record = {
+            "ts": round(time.time(), 3),
+            "event": "request",
+            "method": request.method,
+            "route": route,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 2),
+            "user_id": getattr(request.state, "user_id", None)
+        }
+        if sql is not None:
+            record["db_statements"] = sql.statements
+            record["db_ms"] = round(sql.db_seconds * 1000, 2)
+        if route != request.url.path:
+            record["path"] = request.url.path
+        if rate < 1.0:
+            record["sample_rate"] = rate
+        return self.emit(record)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_forever, name="request-log", daemon=True)
+                self._thread.start()
+
+    def _write_forever(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < REQUEST_LOG_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            records = [record for record in batch if record is not None]
+            if records:
+                lines = "".join(json.dumps(record, default=str, separators=(",", ":")) + "\n" for record in records)
+                sink = self._sink or sys.stdout
+                try:
+                    sink.write(lines)
+                    sink.flush()
+                    self.written += len(records)
+                except (OSError, ValueError):
+                    self.write_errors += 1
+            if stop:
+                return
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """ Flush what is queued and stop the writer thread """
+
+        thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "emitted": self.emitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "queued": self._queue.qsize(),
+            "buffer": self._queue.maxsize,
+            "write_errors": self.write_errors
+        }
+
+
+request_log = RequestLog()
@@ -0,0 +1,527 @@
+# app/reservations.py
+
+"""
+Future system reservations and the in-memory reservation index.
+
+A reservation books a system for a future window [starts_at, ends_at).
+The exclusion constraint on system_reservations (migration 0007) is the
+source of truth: active reservations of one system never overlap, whatever
+the workers believe.
+
+Every worker also keeps a ReservationIndex, so conflict checks and "next
+free slot" queries never scan a system's bookings:
+
+    - one SystemSchedule per system: an interval tree (a treap ordered by
+      start) of its active reservations. Every subtree also knows its first
+      start, last end and largest gap between consecutive reservations, so
+      both an overlap check and "earliest free window of this length after
+      t" descend a single path - O(log n) expected.
+    - the index is loaded from the database at startup and updated
+      incrementally: directly by this worker's writes, and from the
+      "reservation" notifications (migration 0007) for every worker's
+      writes. A "resync" (the listener reconnected, events may be lost)
+      reloads it.
+
+The index is a hint, not the last word. A conflict it reports is
+re-checked in the database before the window is refused - the reservation
+may have been cancelled on another worker whose notification has not
+arrived yet - and a conflict it misses is still rejected by the
+constraint. A stale index costs a round trip, never a wrong answer. The
+index is only touched from the event loop, so it needs no lock.
+
+Reservations are enforced against claims both ways: a window overlapping
+another user's current claim (until its expires_at, or for good if it
+has none) is refused here, and app/claims.py refuses a claim overlapping
+another user's reservation. Both lock the system row first, so a claim
+and a reservation made at the same moment cannot both succeed.
+"""
+
+import asyncio
+import os
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, insert, literal, or_, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from .db.db_models import System, SystemReservation
+from .events import EventBroadcaster
+from .request_log import request_log
+
+RESERVATION_MAX_DAYS = int(os.getenv("RESERVATION_MAX_DAYS", "30"))
+RESERVATION_RELOAD_DELAY_SECONDS = 5.0
+
+# SQLSTATE of an exclusion constraint violation
+EXCLUSION_VIOLATION = "23P01"
+
+# Gap of a subtree without two consecutive reservations
+NO_GAP = timedelta.min
+
+
+class ReservationError(Exception):
+    """ Base class for reservation failures """
+
+
+class InvalidReservation(ReservationError):
+    """ The window is empty, in the past, too long, or the system is unknown """
+
+
+class ReservationConflict(ReservationError):
+    """ The window overlaps an active reservation, or another user's claim, of the system """
+
+    def __init__(self, system_id: uuid.UUID, reservation_id: Optional[uuid.UUID] = None):
+        super().__init__(system_id)
+        self.system_id = system_id
+        self.reservation_id = reservation_id
+
+
+class ReservationNotFound(ReservationError):
+    """ No active reservation (of this user) with that id """
+
+
+class ReservationResult:
+    """ Outcome of a successful reservation """
+
+    def __init__(self, reservation_id: uuid.UUID, system_id: uuid.UUID, starts_at: datetime, ends_at: datetime):
+        self.reservation_id = reservation_id
+        self.system_id = system_id
+        self.starts_at = starts_at
+        self.ends_at = ends_at
+
+    def as_dict(self) -> dict:
+        return {
+            "reservation_id": str(self.reservation_id),
+            "system_id": str(self.system_id),
+            "starts_at": self.starts_at.isoformat(),
+            "ends_at": self.ends_at.isoformat()
+        }
+
+
+class _Node:
+    """
+    One reservation in a SystemSchedule treap, with what its subtree needs
+    for O(log n) queries: first start, last end and the largest gap
+    between consecutive reservations inside the subtree.
+    """
+
+    __slots__ = ("start", "end", "id", "priority", "left", "right", "first_start", "last_end", "gap")
+
+    def __init__(self, start: datetime, end: datetime, reservation_id: uuid.UUID, priority: float):
+        self.start = start
+        self.end = end
+        self.id = reservation_id
+        self.priority = priority
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+        self.first_start = start
+        self.last_end = end
+        self.gap = NO_GAP
+
+    def update(self) -> "_Node":
+        left, right = self.left, self.right
+        gap = NO_GAP
+        if left is not None:
+            gap = max(left.gap, self.start - left.last_end)
+            self.first_start = left.first_start
+        else:
+            self.first_start = self.start
+        if right is not None:
+            gap = max(gap, right.gap, right.first_start - self.end)
+            self.last_end = right.last_end
+        else:
+            self.last_end = self.end
+        self.gap = gap
+        return self
+
+
+def _split(node: Optional[_Node], goes_left: Callable[[_Node], bool]) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """ Split in-order into (prefix where goes_left holds, rest); goes_left must be monotone """
+
+    if node is None:
+        return None, None
+    if goes_left(node):
+        node.right, right = _split(node.right, goes_left)
+        return node.update(), right
+    left, node.left = _split(node.left, goes_left)
+    return left, node.update()
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    """ Join two treaps where every reservation of `left` comes first """
+
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return left.update()
+    right.left = _merge(left, right.left)
+    return right.update()
+
+
+def _first_gap_end(node: _Node, duration: timedelta, previous_end: Optional[datetime]) -> Optional[datetime]:
+    """
+    In-order, the end of the first reservation (starting from `previous_end`,
+    the one just before this subtree) followed by a gap of at least
+    `duration`. Only descends into a subtree known to contain the answer.
+    """
+
+    while True:
+        left, right = node.left, node.right
+        if left is not None and (
+            left.gap >= duration or (previous_end is not None and left.first_start - previous_end >= duration)
+        ):
+            node = left
+            continue
+        before = left.last_end if left is not None else previous_end
+        if before is not None and node.start - before >= duration:
+            return before
+        if right is not None and (right.gap >= duration or right.first_start - node.end >= duration):
+            node, previous_end = right, node.end
+            continue
+        return None
+
+
+class SystemSchedule:
+    """
+    Active reservations of one system: an interval tree (a treap ordered by
+    start). They never overlap, so the ends are in the same order as the
+    starts and every subtree covers one contiguous stretch of time.
+    """
+
+    __slots__ = ("root", "size")
+
+    def __init__(self):
+        self.root: Optional[_Node] = None
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @classmethod
+    def from_sorted(cls, reservations: List[Tuple[uuid.UUID, datetime, datetime]]) -> "SystemSchedule":
+        """ Build a balanced tree from (id, start, end) sorted by start, in O(n) """
+
+        def build(lo: int, hi: int, depth: int) -> Optional[_Node]:
+            if lo >= hi:
+                return None
+            mid = (lo + hi) // 2
+            reservation_id, start, end = reservations[mid]
+            # Deeper means lower priority, so the heap order holds
+            node = _Node(start, end, reservation_id, 1.0 / (depth + 1))
+            node.left = build(lo, mid, depth + 1)
+            node.right = build(mid + 1, hi, depth + 1)
+            return node.update()
+
+        schedule = cls()
+        schedule.root = build(0, len(reservations), 1)
+        schedule.size = len(reservations)
+        return schedule
+
+    def conflict(self, start: datetime, end: datetime) -> Optional[uuid.UUID]:
+        """ Id of a reservation overlapping [start, end), if any - O(log n) """
+
+        # Only the last reservation starting before `end` can reach past `start`
+        node, last = self.root, None
+        while node is not None:
+            if node.start < end:
+                last, node = node, node.right
+            else:
+                node = node.left
+        if last is not None and last.end > start:
+            return last.id
+        return None
+
+    def next_free(self, after: datetime, duration: timedelta) -> datetime:
+        """ Earliest start >= `after` of a free window of `duration` - O(log n) """
+
+        # Reservations that end by `after` do not matter
+        done, upcoming = _split(self.root, lambda node: node.end <= after)
+        try:
+            if upcoming is None or upcoming.first_start - after >= duration:
+                return after
+            found = _first_gap_end(upcoming, duration, None)
+            return found if found is not None else upcoming.last_end
+        finally:
+            self.root = _merge(done, upcoming)
+
+    def add(self, reservation_id: uuid.UUID, start: datetime, end: datetime) -> None:
+        left, right = _split(self.root, lambda node: node.start < start)
+        self.root = _merge(_merge(left, _Node(start, end, reservation_id, random.random())), right)
+        self.size += 1
+
+    def remove(self, reservation_id: uuid.UUID, start: datetime) -> None:
+        left, rest = _split(self.root, lambda node: node.start < start)
+        match, right = _split(rest, lambda node: node.start == start and node.id == reservation_id)
+        if match is not None:
+            self.size -= 1
+        self.root = _merge(left, right)
+
+    def prune(self, before: datetime) -> List[uuid.UUID]:
+        """ Drop reservations that ended by `before`; returns their ids """
+
+        ended, self.root = _split(self.root, lambda node: node.end <= before)
+        pruned = []
+        stack = [ended] if ended is not None else []
+        while stack:
+            node = stack.pop()
+            pruned.append(node.id)
+            stack.extend(child for child in (node.left, node.right) if child is not None)
+        self.size -= len(pruned)
+        return pruned
+
+
+class ReservationIndex:
+    """ Every system's SystemSchedule, kept in step with system_reservations """
+
+    def __init__(self):
+        self.loaded = False
+        self.reloads = 0
+        self.events_applied = 0
+        self._schedules: Dict[uuid.UUID, SystemSchedule] = {}
+        # reservation id -> (system id, start), to find it again on removal
+        self._windows: Dict[uuid.UUID, Tuple[uuid.UUID, datetime]] = {}
+
+    def conflict(self, system_id: uuid.UUID, start: datetime, end: datetime) -> Optional[uuid.UUID]:
+        schedule = self._schedules.get(system_id)
+        return schedule.conflict(start, end) if schedule else None
+
+    def next_free(self, system_id: uuid.UUID, after: datetime, duration: timedelta) -> datetime:
+        schedule = self._schedules.get(system_id)
+        return schedule.next_free(after, duration) if schedule else after
+
+    def add(self, reservation_id: uuid.UUID, system_id: uuid.UUID, start: datetime, end: datetime) -> None:
+        """ Record an active reservation (idempotent) """
+
+        if reservation_id in self._windows:
+            return
+        schedule = self._schedules.setdefault(system_id, SystemSchedule())
+        for pruned in schedule.prune(datetime.now(timezone.utc)):
+            self._windows.pop(pruned, None)
+        schedule.add(reservation_id, start, end)
+        self._windows[reservation_id] = (system_id, start)
+
+    def remove(self, reservation_id: uuid.UUID) -> None:
+        """ Forget a cancelled or deleted reservation (idempotent) """
+
+        window = self._windows.pop(reservation_id, None)
+        if window is None:
+            return
+        system_id, start = window
+        schedule = self._schedules[system_id]
+        schedule.remove(reservation_id, start)
+        if not schedule:
+            del self._schedules[system_id]
+
+    def apply_event(self, event: dict) -> None:
+        """ Apply a "reservation" notification from migration 0007's trigger """
+
+        reservation_id = uuid.UUID(event["reservation_id"])
+        self.remove(reservation_id)
+        if event["op"] != "delete" and event.get("cancelled_at") is None:
+            self.add(
+                reservation_id,
+                uuid.UUID(event["system_id"]),
+                datetime.fromisoformat(event["starts_at"]),
+                datetime.fromisoformat(event["ends_at"])
+            )
+        self.events_applied += 1
+
+    async def load(self, engine: AsyncEngine) -> None:
+        """ Rebuild from the active reservations that have not ended yet """
+
+        async with engine.connect() as connection:
+            result = await connection.execute(
+                select(
+                    SystemReservation.id,
+                    SystemReservation.system_id,
+                    SystemReservation.starts_at,
+                    SystemReservation.ends_at
+                )
+                .where(SystemReservation.cancelled_at.is_(None), SystemReservation.ends_at > func.now())
+                .order_by(SystemReservation.system_id, SystemReservation.starts_at)
+            )
+            rows = result.all()
+
+        by_system: Dict[uuid.UUID, List[Tuple[uuid.UUID, datetime, datetime]]] = {}
+        windows = {}
+        for reservation_id, system_id, start, end in rows:
+            by_system.setdefault(system_id, []).append((reservation_id, start, end))
+            windows[reservation_id] = (system_id, start)
+
+        # Rows arrive sorted by start within each system
+        self._schedules = {
+            system_id: SystemSchedule.from_sorted(reservations) for system_id, reservations in by_system.items()
+        }
+        self._windows = windows
+        self.loaded = True
+        self.reloads += 1
+
+    async def keep_in_sync(self, engine: AsyncEngine, broadcaster: EventBroadcaster) -> None:
+        """ Background task: load, then follow reservation notifications """
+
+        while True:
+            # Subscribe before loading, so no change slips in between
+            subscriber = broadcaster.subscribe()
+            try:
+                await self.load(engine)
+                while True:
+                    event = await subscriber.queue.get()
+                    if event.get("type") == "resync":
+                        await self.load(engine)
+                    elif event.get("type") == "reservation":
+                        self.apply_event(event)
+                    # Fell behind and was dropped - resubscribe and reload
+                    if subscriber.dropped and subscriber.queue.empty():
+                        break
+            except (SQLAlchemyError, OSError) as e:
+                request_log.event("reservation_reload_failed", error=str(e))
+                await asyncio.sleep(RESERVATION_RELOAD_DELAY_SECONDS)
+            finally:
+                broadcaster.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "systems": len(self._schedules),
+            "reservations": len(self._windows),
+            "reloads": self.reloads,
+            "events_applied": self.events_applied
+        }
+
+
+reservation_index = ReservationIndex()
+
+
+def _as_utc(value: datetime) -> datetime:
+    """ Naive datetimes from forms are taken as UTC """
+
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+async def create_reservation(
+    db: AsyncSession,
+    index: ReservationIndex,
+    system_id: uuid.UUID,
+    user_id: uuid.UUID,
+    organization_id: uuid.UUID,
+    starts_at: datetime,
+    ends_at: datetime,
+    notes: Optional[str] = None
+) -> ReservationResult:
+    """ Reserve a system of the user's organization, or raise ReservationConflict / InvalidReservation """
+
+    starts_at, ends_at = _as_utc(starts_at), _as_utc(ends_at)
+    if ends_at <= starts_at:
+        raise InvalidReservation("The reservation must end after it starts")
+    if starts_at <= datetime.now(timezone.utc):
+        raise InvalidReservation("Reservations must start in the future")
+    if ends_at - starts_at > timedelta(days=RESERVATION_MAX_DAYS):
+        raise InvalidReservation(f"Reservations are limited to {RESERVATION_MAX_DAYS} days")
+
+    # A conflict the index knows of is confirmed before rejecting: it may
+    # have been cancelled by another worker whose notification is still on its way
+    conflicting = index.conflict(system_id, starts_at, ends_at)
+    while conflicting is not None:
+        still_active = await db.scalar(
+            select(SystemReservation.id)
+            .where(
+                SystemReservation.id == conflicting,
+                SystemReservation.cancelled_at.is_(None),
+                SystemReservation.starts_at < ends_at,
+                SystemReservation.ends_at > starts_at
+            )
+        )
+        if still_active is not None:
+            await db.rollback()
+            raise ReservationConflict(system_id, conflicting)
+        index.remove(conflicting)
+        conflicting = index.conflict(system_id, starts_at, ends_at)
+
+    # Another user's claim overlapping the window - open-ended without expiry
+    claimed_by_other = and_(
+        System.current_holder_id.is_not(None),
+        System.current_holder_id != user_id,
+        or_(System.current_expires_at.is_(None), System.current_expires_at > starts_at)
+    )
+
+    reservation_id = uuid.uuid4()
+    try:
+        # Inserting from the systems row checks it exists in the organization.
+        # FOR SHARE waits for a claim in progress and then rechecks the row.
+        result = await db.execute(
+            insert(SystemReservation)
+            .from_select(
+                ["id", "system_id", "organization_id", "user_id", "starts_at", "ends_at", "notes"],
+                select(
+                    literal(reservation_id, SystemReservation.id.type),
+                    System.id,
+                    System.organization_id,
+                    literal(user_id, SystemReservation.user_id.type),
+                    literal(starts_at, SystemReservation.starts_at.type),
+                    literal(ends_at, SystemReservation.ends_at.type),
+                    literal(notes, SystemReservation.notes.type)
+                )
+                .where(System.id == system_id, System.organization_id == organization_id, ~claimed_by_other)
+                .with_for_update(read=True)
+            )
+            .returning(SystemReservation.id)
+        )
+        inserted = result.first()
+        if inserted is None:
+            claimed = await db.scalar(
+                select(claimed_by_other).where(System.id == system_id, System.organization_id == organization_id)
+            )
+            await db.rollback()
+            if claimed:
+                raise ReservationConflict(system_id)
+            raise InvalidReservation("Unknown system")
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if getattr(e.orig, "sqlstate", None) == EXCLUSION_VIOLATION:
+            # Another worker's reservation this index has not seen yet
+            raise ReservationConflict(system_id)
+        raise
+
+    index.add(reservation_id, system_id, starts_at, ends_at)
+    return ReservationResult(reservation_id, system_id, starts_at, ends_at)
+
+
+async def cancel_reservation(
+    db: AsyncSession,
+    index: ReservationIndex,
+    reservation_id: uuid.UUID,
+    organization_id: uuid.UUID,
+    user_id: Optional[uuid.UUID] = None
+) -> uuid.UUID:
+    """
+    Cancel an active reservation; `user_id` restricts it to that user's own
+    (None for admins). Returns the system id, or raises ReservationNotFound.
+    """
+
+    query = (
+        update(SystemReservation)
+        .where(
+            SystemReservation.id == reservation_id,
+            SystemReservation.organization_id == organization_id,
+            SystemReservation.cancelled_at.is_(None)
+        )
+        .values(cancelled_at=func.now())
+        .returning(SystemReservation.system_id)
+    )
+    if user_id is not None:
+        query = query.where(SystemReservation.user_id == user_id)
+
+    system_id = (await db.execute(query)).scalar()
+    if system_id is None:
+        await db.rollback()
+        raise ReservationNotFound(reservation_id)
+    await db.commit()
+
+    index.remove(reservation_id)
+    return system_id
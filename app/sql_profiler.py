@@ -0,0 +1,326 @@
+# app/sql_profiler.py
+
+"""
+SQL profiler: a slow-statement log and timings per statement fingerprint.
+
+Engine events (before/after_cursor_execute, installed on the sync engine
+and on async_engine.sync_engine) time every statement and:
+
+    - aggregate it under its fingerprint - the statement with literals and
+      bind parameters replaced by "?" and IN / VALUES lists collapsed, so
+      "WHERE id IN ($1, $2)" and "WHERE id IN ($1, $2, $3)" are one entry.
+      Each fingerprint keeps count, total, max and a log-scale histogram
+      for p95, plus the routes that issued it. Shown on /admin/sql-profile.
+    - log statements slower than SQL_SLOW_MS to the request log (JSON
+      lines, event "slow_query") with the route, the elapsed time and the
+      shape of the parameters (types and lengths, never values).
+
+With SQL_PROFILE_EXPLAIN=1, a slow SELECT whose fingerprint is among the
+SQL_PROFILE_EXPLAIN_TOP by total time also gets an EXPLAIN (ANALYZE,
+BUFFERS) captured, at most once per fingerprint every
+SQL_PROFILE_EXPLAIN_EVERY_SECONDS. The plan is taken on the same
+connection, right after the statement, inside a savepoint: it runs the
+query a second time, so it is opt-in.
+
+This replaces DB_ECHO for production use: echo logs everything with no
+timing and no request; this keeps a few numbers per distinct statement.
+"""
+
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metrics import current_route
+from .request_log import request_log
+
+SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "200"))
+SQL_PROFILE_MAX_FINGERPRINTS = int(os.getenv("SQL_PROFILE_MAX_FINGERPRINTS", "500"))
+SQL_PROFILE_EXPLAIN = os.getenv("SQL_PROFILE_EXPLAIN", "").lower() in ("1", "true", "yes")
+SQL_PROFILE_EXPLAIN_TOP = int(os.getenv("SQL_PROFILE_EXPLAIN_TOP", "10"))
+SQL_PROFILE_EXPLAIN_EVERY_SECONDS = float(os.getenv("SQL_PROFILE_EXPLAIN_EVERY_SECONDS", "600"))
+
+# Latency histogram per fingerprint: 50 µs, then x1.25 per bucket (~75 s at the top)
+_BUCKET_FLOOR = 0.00005
+_BUCKET_FACTOR = 1.25
+_BUCKET_COUNT = 64
+_LOG_FACTOR = math.log(_BUCKET_FACTOR)
+
+OVERFLOW_FINGERPRINT = "<other statements>"
+MAX_ROUTES_PER_FINGERPRINT = 10
+STATEMENT_LOG_CHARS = 1000
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAMETER = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<![:\w]):\w+")
+_NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:::\w+)?(?:\s*,\s*\?(?:::\w+)?)*\s*\)")
+_REPEATED_LIST = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+_normalized_cache: Dict[str, str] = {}
+
+
+def normalize(statement: str) -> str:
+    """ Statement text with literals and parameters as "?" and lists collapsed """
+
+    normalized = _normalized_cache.get(statement)
+    if normalized is None:
+        normalized = _SPACE.sub(" ", statement).strip()
+        normalized = _STRING.sub("?", normalized)
+        normalized = _PARAMETER.sub("?", normalized)
+        normalized = _NUMBER.sub("?", normalized)
+        normalized = _LIST.sub("(...)", normalized)
+        normalized = _REPEATED_LIST.sub("(...)", normalized)
+        if len(_normalized_cache) >= 4096:
+            _normalized_cache.clear()
+        _normalized_cache[statement] = normalized
+    return normalized
+
+
+def fingerprint_id(normalized: str) -> str:
+    return hashlib.blake2b(normalized.encode(), digest_size=6).hexdigest()
+
+
+def _value_shape(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    if isinstance(value, (list, tuple, set)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """ Types and lengths of bind parameters - never their values """
+
+    if executemany:
+        rows = list(parameters or ())
+        return {"rows": len(rows), "each": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: _value_shape(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_value_shape(value) for value in parameters]
+    return None
+
+
+class FingerprintStats:
+    """ Aggregated timings of one normalized statement """
+
+    __slots__ = (
+        "fingerprint", "statement", "count", "total", "max", "slow",
+        "buckets", "routes", "plan", "plan_at", "plan_ms"
+    )
+
+    def __init__(self, fingerprint: str, statement: str):
+        self.fingerprint = fingerprint
+        self.statement = statement
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.buckets = [0] * _BUCKET_COUNT
+        self.routes: Dict[str, int] = {}
+        self.plan: Optional[str] = None
+        self.plan_at: Optional[float] = None
+        self.plan_ms: Optional[float] = None
+
+    def add(self, elapsed: float, route: Optional[str], slow: bool) -> None:
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        if slow:
+            self.slow += 1
+        index = 0 if elapsed <= _BUCKET_FLOOR else int(math.log(elapsed / _BUCKET_FLOOR) / _LOG_FACTOR) + 1
+        self.buckets[min(index, _BUCKET_COUNT - 1)] += 1
+        if route is not None and (route in self.routes or len(self.routes) < MAX_ROUTES_PER_FINGERPRINT):
+            self.routes[route] = self.routes.get(route, 0) + 1
+
+    def percentile(self, pct: float) -> float:
+        """ Upper bound of the bucket holding the pct-th percentile (within 25%) """
+
+        rank = math.ceil(self.count * pct / 100)
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(_BUCKET_FLOOR * _BUCKET_FACTOR ** index, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "statement": self.statement,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 2),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "slow": self.slow,
+            "routes": dict(sorted(self.routes.items(), key=lambda item: -item[1])),
+            "plan": self.plan,
+            "plan_at": self.plan_at,
+            "plan_ms": self.plan_ms
+        }
+
+
+class SqlProfiler:
+    """ Per-worker statement fingerprints, fed by engine events """
+
+    def __init__(
+        self,
+        slow_ms: float = SQL_SLOW_MS,
+        max_fingerprints: int = SQL_PROFILE_MAX_FINGERPRINTS,
+        explain: bool = SQL_PROFILE_EXPLAIN,
+        explain_top: int = SQL_PROFILE_EXPLAIN_TOP
+    ):
+        self.slow_seconds = slow_ms / 1000
+        self.max_fingerprints = max_fingerprints
+        self.explain = explain
+        self.explain_top = explain_top
+        self._stats: Dict[str, FingerprintStats] = {}
+        self._lock = threading.Lock()
+        self.since = time.time()
+        self.statements = 0
+        self.slow = 0
+        self.explains = 0
+
+    def record(self, statement: str, parameters, executemany: bool, elapsed: float) -> Optional[FingerprintStats]:
+        normalized = normalize(statement)
+        fingerprint = fingerprint_id(normalized)
+        route = current_route()
+        slow = elapsed >= self.slow_seconds
+
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    fingerprint = OVERFLOW_FINGERPRINT
+                    stats = self._stats.get(fingerprint)
+                    if stats is None:
+                        stats = self._stats[fingerprint] = FingerprintStats(fingerprint, OVERFLOW_FINGERPRINT)
+                else:
+                    stats = self._stats[fingerprint] = FingerprintStats(fingerprint, normalized)
+            stats.add(elapsed, route, slow)
+            self.statements += 1
+            if slow:
+                self.slow += 1
+
+        if slow:
+            request_log.event(
+                "slow_query",
+                fingerprint=fingerprint,
+                route=route,
+                elapsed_ms=round(elapsed * 1000, 2),
+                statement=normalized[:STATEMENT_LOG_CHARS],
+                params=parameter_shape(parameters, executemany)
+            )
+        return stats if slow else None
+
+    def _wants_plan(self, stats: FingerprintStats, statement: str, context, executemany: bool) -> bool:
+        if not self.explain or executemany or stats.fingerprint == OVERFLOW_FINGERPRINT:
+            return False
+        # EXPLAIN ANALYZE executes the statement: plain SELECTs only, no row locks
+        normalized = stats.statement.upper()
+        if not normalized.startswith("SELECT") or " FOR UPDATE" in normalized or " FOR SHARE" in normalized:
+            return False
+        if context is not None and context.execution_options.get("stream_results"):
+            return False
+        if stats.plan_at is not None and time.time() - stats.plan_at < SQL_PROFILE_EXPLAIN_EVERY_SECONDS:
+            return False
+        with self._lock:
+            top = sorted(self._stats.values(), key=lambda entry: entry.total, reverse=True)[:self.explain_top]
+        return stats in top
+
+    def _capture_plan(self, conn, stats: FingerprintStats, statement: str, parameters) -> None:
+        """ EXPLAIN (ANALYZE, BUFFERS) on the same connection, in a savepoint """
+
+        started = time.perf_counter()
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("SAVEPOINT sql_profiler_explain")
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters or None)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+            except Exception as e:
+                plan = f"EXPLAIN failed: {e}"
+            # Whatever the second run did (or broke) is undone; the transaction carries on
+            cursor.execute("ROLLBACK TO SAVEPOINT sql_profiler_explain")
+            cursor.execute("RELEASE SAVEPOINT sql_profiler_explain")
+        except Exception as e:
+            # No transaction to hold a savepoint (autocommit) - leave it
+            plan = f"EXPLAIN skipped: {e}"
+        finally:
+            cursor.close()
+
+        stats.plan = plan
+        stats.plan_at = time.time()
+        stats.plan_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.explains += 1
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info.get("profiler_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        stats = self.record(statement, parameters, executemany, elapsed)
+        if stats is not None and self._wants_plan(stats, statement, context, executemany):
+            self._capture_plan(conn, stats, statement, parameters)
+
+    def _handle_error(self, exception_context) -> None:
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("profiler_started"):
+            connection.info["profiler_started"].pop()
+
+    def install(self, engine: Engine) -> None:
+        """ Profile a (sync) engine - pass async_engine.sync_engine for async """
+
+        if not event.contains(engine, "before_cursor_execute", self._before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+            event.listen(engine, "handle_error", self._handle_error)
+
+    def report(self, order_by: str = "total", limit: int = 100) -> List[dict]:
+        """ Fingerprints, worst first by total, p95, max, count or slow """
+
+        keys = {
+            "total": lambda entry: entry.total,
+            "p95": lambda entry: entry.percentile(95),
+            "max": lambda entry: entry.max,
+            "count": lambda entry: entry.count,
+            "slow": lambda entry: entry.slow
+        }
+        with self._lock:
+            entries = sorted(self._stats.values(), key=keys[order_by], reverse=True)[:limit]
+            return [entry.as_dict() for entry in entries]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {}
+            self.since = time.time()
+            self.statements = 0
+            self.slow = 0
+
+    def stats(self) -> dict:
+        return {
+            "since": self.since,
+            "statements": self.statements,
+            "slow": self.slow,
+            "fingerprints": len(self._stats),
+            "slow_ms": self.slow_seconds * 1000,
+            "explain": self.explain,
+            "explains": self.explains
+        }
+
+
+sql_profiler = SqlProfiler()
@@ -0,0 +1,223 @@
+# app/system_import.py
+
+"""
+Bulk system import from an inventory CSV.
+
+    name,status,department,notes
+    BESS-0001,free,Grid Ops,
+    BESS-0002,maintenance,,Inverter swap scheduled
+
+Only `name` is required. The file is read as a stream and each row is
+validated in Python, then written with psycopg3 COPY into a temporary
+staging table - no ORM objects, no per-row round trips. A few set-based
+statements then finish the job in the same transaction:
+
+    - rows that cannot be applied (unknown department, a name owned by
+      another organization) are deleted from staging and reported
+    - the rest are upserted into systems ON CONFLICT (name). Existing rows
+      are only written when something changed, and a CLAIMED system keeps
+      its status (claims go through app/claims.py); a blank status keeps
+      the current one
+    - the upsert only updates the organization's own systems, so a name
+      another organization creates after the check above is not taken
+      over; those rows are reported as rejected too
+
+Nothing is written unless the whole import commits.
+"""
+
+import csv
+import os
+import uuid
+from typing import Iterable, List, Optional, TextIO, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .db.db_models.system import SystemStatus
+
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "100"))
+NAME_MAX_LENGTH = 50
+
+# CLAIMED is set by the claim service, never by an import
+IMPORTABLE_STATUSES = {
+    status.value: status.name
+    for status in SystemStatus
+    if status is not SystemStatus.CLAIMED
+}
+
+CREATE_STAGING = """
+CREATE TEMPORARY TABLE system_import_staging (
+    line integer NOT NULL,
+    name varchar(50) NOT NULL,
+    status text,
+    department text,
+    notes text
+) ON COMMIT DROP
+"""
+
+COPY_STAGING = "COPY system_import_staging (line, name, status, department, notes) FROM STDIN"
+
+REJECT_UNKNOWN_DEPARTMENT = """
+DELETE FROM system_import_staging s
+WHERE s.department IS NOT NULL
+  AND NOT EXISTS (
+    SELECT 1 FROM departments d
+    WHERE d.name = s.department AND d.organization_id = :organization_id
+  )
+RETURNING s.line, s.department
+"""
+
+REJECT_OTHER_ORGANIZATION = """
+DELETE FROM system_import_staging s
+USING systems t
+WHERE t.name = s.name AND t.organization_id <> :organization_id
+RETURNING s.line, s.name
+"""
+
+# A blank status keeps the current one, and a CLAIMED system stays CLAIMED
+KEEP_CURRENT_STATUS = """
+UPDATE system_import_staging s
+SET status = t.status::text
+FROM systems t
+WHERE t.name = s.name
+  AND t.organization_id = :organization_id
+  AND (s.status IS NULL OR t.status = 'CLAIMED')
+"""
+
+UPSERT = """
+INSERT INTO systems (id, name, status, organization_id, department_id, notes)
+SELECT gen_random_uuid(),
+       s.name,
+       COALESCE(s.status, 'FREE')::systemstatus,
+       :organization_id,
+       d.id,
+       s.notes
+FROM system_import_staging s
+LEFT JOIN departments d ON d.name = s.department AND d.organization_id = :organization_id
+ORDER BY s.line
+ON CONFLICT (name) DO UPDATE SET
+    status = CASE WHEN systems.status = 'CLAIMED' THEN systems.status ELSE excluded.status END,
+    department_id = excluded.department_id,
+    notes = excluded.notes,
+    updated_at = now()
+WHERE systems.organization_id = :organization_id
+  AND ((systems.status <> 'CLAIMED' AND systems.status IS DISTINCT FROM excluded.status)
+       OR systems.department_id IS DISTINCT FROM excluded.department_id
+       OR systems.notes IS DISTINCT FROM excluded.notes)
+RETURNING (xmax = 0) AS inserted
+"""
+
+# Names another organization took between REJECT_OTHER_ORGANIZATION and
+# UPSERT; the upsert left their systems alone
+SKIPPED_OTHER_ORGANIZATION = """
+SELECT s.line, s.name
+FROM system_import_staging s
+JOIN systems t ON t.name = s.name
+WHERE t.organization_id <> :organization_id
+ORDER BY s.line
+"""
+
+
+class ImportResult:
+    """ Counts (and the first IMPORT_MAX_ERRORS rejections) of one import """
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.rejected = 0
+        self.errors: List[str] = []
+
+    def reject(self, line: int, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append(f"line {line}: {reason}")
+
+    def as_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "rejected": self.rejected,
+            "errors": self.errors
+        }
+
+
+def _blank(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip()
+    return value or None
+
+
+def validate_rows(rows: Iterable[dict], result: ImportResult) -> Iterable[Tuple]:
+    """
+    Staging tuples for the valid rows of a csv.DictReader; invalid rows are
+    recorded on `result`. A name seen twice in the file keeps its first row.
+    """
+
+    seen = set()
+    # Line 1 is the header
+    for line, row in enumerate(rows, start=2):
+        name = _blank(row.get("name"))
+        if name is None:
+            result.reject(line, "name is required")
+            continue
+        if len(name) > NAME_MAX_LENGTH:
+            result.reject(line, f"name longer than {NAME_MAX_LENGTH} characters")
+            continue
+        if name in seen:
+            result.reject(line, f"duplicate name {name!r}")
+            continue
+
+        status = _blank(row.get("status"))
+        if status is not None:
+            status = IMPORTABLE_STATUSES.get(status.lower())
+            if status is None:
+                result.reject(line, f"invalid status {row.get('status')!r}")
+                continue
+
+        seen.add(name)
+        yield (line, name, status, _blank(row.get("department")), _blank(row.get("notes")))
+
+
+def import_systems(connection: Connection, source: TextIO, organization_id: uuid.UUID) -> ImportResult:
+    """
+    Import systems for one organization from a CSV text stream.
+
+    Runs in the connection's current transaction; the caller commits.
+    """
+
+    result = ImportResult()
+    reader = csv.DictReader(source)
+    if reader.fieldnames is None or "name" not in [field.strip() for field in reader.fieldnames]:
+        raise ValueError("CSV must have a header row with a 'name' column")
+    reader.fieldnames = [field.strip() for field in reader.fieldnames]
+
+    connection.execute(text(CREATE_STAGING))
+
+    # COPY goes through the psycopg connection underneath, same transaction
+    cursor = connection.connection.driver_connection.cursor()
+    with cursor.copy(COPY_STAGING) as copy:
+        for row in validate_rows(reader, result):
+            copy.write_row(row)
+
+    params = {"organization_id": organization_id}
+    for line, department in connection.execute(text(REJECT_UNKNOWN_DEPARTMENT), params):
+        result.reject(line, f"unknown department {department!r}")
+    for line, name in connection.execute(text(REJECT_OTHER_ORGANIZATION), params):
+        result.reject(line, f"system {name!r} belongs to another organization")
+
+    connection.execute(text(KEEP_CURRENT_STATUS), params)
+
+    staged = connection.execute(text("SELECT count(*) FROM system_import_staging")).scalar()
+    for (inserted,) in connection.execute(text(UPSERT), params):
+        if inserted:
+            result.inserted += 1
+        else:
+            result.updated += 1
+    skipped = 0
+    for line, name in connection.execute(text(SKIPPED_OTHER_ORGANIZATION), params):
+        result.reject(line, f"system {name!r} belongs to another organization")
+        skipped += 1
+    result.unchanged = staged - result.inserted - result.updated - skipped
+
+    return result
@@ -0,0 +1,216 @@
+# app/user_provisioning.py
+
+"""
+Bulk user provisioning from a CSV of users and initial passwords.
+
+    email,first_name,last_name,password,is_admin
+    ada@example.com,Ada,Lovelace,correct-horse,false
+
+bcrypt dominates the cost (BCRYPT_ROUNDS, ~100-300 ms per hash), so
+passwords are hashed in a process pool sized to the available cores and
+the users are written in batches of PROVISION_BATCH_SIZE with one
+multi-row INSERT .. ON CONFLICT per batch, committed batch by batch.
+
+The database is the checkpoint: users that already have a password are
+skipped before anything is hashed, so rerunning after a crash only hashes
+what was not committed yet (at most one batch is redone). Existing users
+of the same organization without a password (e.g. from add_users.py) get
+theirs set; emails that belong to another organization are rejected.
+"""
+
+import csv
+import os
+import uuid
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+
+from .auth import get_password_hash
+from .db.db_models import User
+
+PROVISION_BATCH_SIZE = int(os.getenv("PROVISION_BATCH_SIZE", "200"))
+PROVISION_MAX_ERRORS = 100
+EMAIL_MAX_LENGTH = 100
+NAME_MAX_LENGTH = 50
+REQUIRED_COLUMNS = ("email", "first_name", "last_name", "password")
+TRUE_VALUES = {"1", "true", "yes", "y"}
+
+
+def available_cores() -> int:
+    """ Cores this process may run on (respects CPU affinity / container limits) """
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class ProvisionResult:
+    """ Counts (and the first PROVISION_MAX_ERRORS rejections) of one run """
+
+    def __init__(self):
+        self.created = 0
+        self.passwords_set = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.errors: List[str] = []
+
+    def reject(self, line: int, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < PROVISION_MAX_ERRORS:
+            self.errors.append(f"line {line}: {reason}")
+
+    def as_dict(self) -> dict:
+        return {
+            "created": self.created,
+            "passwords_set": self.passwords_set,
+            "skipped": self.skipped,
+            "rejected": self.rejected,
+            "errors": self.errors
+        }
+
+
+def read_users(source: TextIO, result: ProvisionResult) -> List[dict]:
+    """ Valid rows of the CSV; invalid ones are recorded on `result` """
+
+    reader = csv.DictReader(source)
+    fieldnames = [field.strip() for field in reader.fieldnames or []]
+    missing = [column for column in REQUIRED_COLUMNS if column not in fieldnames]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    reader.fieldnames = fieldnames
+
+    users = []
+    seen = set()
+    # Line 1 is the header
+    for line, row in enumerate(reader, start=2):
+        email = (row.get("email") or "").strip()
+        first_name = (row.get("first_name") or "").strip()
+        last_name = (row.get("last_name") or "").strip()
+        password = row.get("password") or ""
+
+        if "@" not in email or len(email) > EMAIL_MAX_LENGTH:
+            result.reject(line, f"invalid email {email!r}")
+        elif email in seen:
+            result.reject(line, f"duplicate email {email!r}")
+        elif not first_name or not last_name:
+            result.reject(line, "first_name and last_name are required")
+        elif len(first_name) > NAME_MAX_LENGTH or len(last_name) > NAME_MAX_LENGTH:
+            result.reject(line, f"name longer than {NAME_MAX_LENGTH} characters")
+        elif not password:
+            result.reject(line, "password is required")
+        else:
+            seen.add(email)
+            users.append({
+                "line": line,
+                "email": email,
+                "first_name": first_name,
+                "last_name": last_name,
+                "password": password,
+                "is_admin": (row.get("is_admin") or "").strip().lower() in TRUE_VALUES
+            })
+
+    return users
+
+
+def existing_users(
+    connection: Connection,
+    emails: Iterable[str],
+    chunk_size: int = 1000
+) -> Dict[str, Tuple[uuid.UUID, bool]]:
+    """ email -> (organization id, whether the user has a password), for the emails that exist """
+
+    emails = list(emails)
+    found = {}
+    for start in range(0, len(emails), chunk_size):
+        rows = connection.execute(
+            select(User.email, User.organization_id, User.password_hash.is_not(None))
+            .where(User.email.in_(emails[start:start + chunk_size]))
+        )
+        found.update({email: (organization, has_password) for email, organization, has_password in rows})
+    return found
+
+
+def _upsert_batch(
+    connection: Connection,
+    organization_id: uuid.UUID,
+    users: List[dict],
+    hashes: List[str]
+) -> List[str]:
+    """ Insert the users or set their missing passwords; returns the emails written """
+
+    statement = insert(User).values([
+        {
+            "id": uuid.uuid4(),
+            "email": user["email"],
+            "first_name": user["first_name"],
+            "last_name": user["last_name"],
+            "password_hash": password_hash,
+            "organization_id": organization_id,
+            "is_admin": user["is_admin"],
+            "is_active": True
+        }
+        for user, password_hash in zip(users, hashes)
+    ])
+    # Only fills in a missing password of this organization's user - never
+    # overwrites one set meanwhile, or touches a user of another organization
+    statement = statement.on_conflict_do_update(
+        index_elements=[User.email],
+        set_={"password_hash": statement.excluded.password_hash},
+        where=and_(User.password_hash.is_(None), User.organization_id == organization_id)
+    ).returning(User.email)
+    return connection.execute(statement).scalars().all()
+
+
+def provision_users(
+    connection: Connection,
+    source: TextIO,
+    organization_id: uuid.UUID,
+    executor: Executor,
+    batch_size: int = PROVISION_BATCH_SIZE,
+    progress: Optional[Callable[[ProvisionResult, int], None]] = None
+) -> ProvisionResult:
+    """
+    Create the users in `source` (or set their missing passwords), hashing
+    on `executor` and committing every `batch_size` users.
+    """
+
+    result = ProvisionResult()
+    users = read_users(source, result)
+
+    existing = existing_users(connection, (user["email"] for user in users))
+    connection.commit()
+    pending = []
+    for user in users:
+        organization, has_password = existing.get(user["email"], (organization_id, False))
+        if organization != organization_id:
+            result.reject(user["line"], f"user {user['email']!r} belongs to another organization")
+        elif has_password:
+            result.skipped += 1
+        else:
+            pending.append(user)
+
+    # Spread each batch evenly over the pool's processes
+    chunksize = max(1, batch_size // (4 * available_cores()))
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        hashes = list(executor.map(get_password_hash, [user["password"] for user in batch], chunksize=chunksize))
+
+        written = set(_upsert_batch(connection, organization_id, batch, hashes))
+        connection.commit()
+
+        for user in batch:
+            if user["email"] not in written:
+                # Given a password, or moved to another organization, since the check
+                result.skipped += 1
+            elif user["email"] in existing:
+                result.passwords_set += 1
+            else:
+                result.created += 1
+        if progress is not None:
+            progress(result, len(pending))
+
+    return result
@@ -0,0 +1,369 @@
+# app/waitlist.py
+
+"""
+Blocking acquire: "give me a free system from this pool, waiting if none
+is free", served first come, first served.
+
+A pool is one system, a department, or any system of the organization.
+Every acquire is a row in system_waiters (migration 0008) ordered by
+`position`, so the queue lives in the database and survives restarts.
+Systems are handed to waiters, not raced for:
+
+    - dispatch() repeatedly takes the oldest waiting waiter that a FREE
+      system can serve and claims that system for it, all in one
+      transaction (waiter row, then systems, then system_claims - the
+      claims.py lock order). Row locks are taken with SKIP LOCKED, so any
+      number of workers can dispatch at once without blocking each other
+      or granting twice.
+    - every worker runs dispatch() when a system turns FREE (the "system"
+      notification from migration 0003), at startup, after a listener
+      resync and every WAITLIST_SWEEP_SECONDS as a safety net.
+    - granting updates the waiter row, which notifies "waiter"; the worker
+      holding that waiter's long-poll request wakes it up.
+
+A long poll that times out returns the waiter id. The client polls again
+with it (on any worker) to keep its place; a waiter not polled again
+within WAITLIST_GRACE_SECONDS is abandoned and skipped.
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+from sqlalchemy import and_, delete, exists, func, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .claims import SystemUnavailable, claim_system, unreserved_for
+from .db.db_models import System, SystemWaiter
+from .db.db_models.system import SystemStatus
+from .events import EventBroadcaster
+from .request_log import request_log
+
+WAITLIST_MAX_WAIT_SECONDS = float(os.getenv("WAITLIST_MAX_WAIT_SECONDS", "60"))
+WAITLIST_GRACE_SECONDS = float(os.getenv("WAITLIST_GRACE_SECONDS", "30"))
+WAITLIST_SWEEP_SECONDS = float(os.getenv("WAITLIST_SWEEP_SECONDS", "5"))
+WAITLIST_RETENTION_HOURS = 24
+
+
+class AcquireRequest(BaseModel):
+    """ JSON body of POST /api/acquire """
+
+    department_id: Optional[uuid.UUID] = None
+    system_id: Optional[uuid.UUID] = None
+    notes: Optional[str] = None
+    # Seconds to wait in this request before answering "still waiting"
+    timeout: float = Field(30.0, gt=0, le=WAITLIST_MAX_WAIT_SECONDS)
+    # Resume a waiter from an earlier poll instead of queueing again
+    waiter_id: Optional[uuid.UUID] = None
+
+
+class WaiterNotFound(Exception):
+    """ No waiter with that id for this user (unknown, cancelled or abandoned) """
+
+
+class EmptyPool(Exception):
+    """ The requested pool has no systems in the organization, so could never be served """
+
+
+def _is_waiting():
+    return and_(
+        SystemWaiter.granted_at.is_(None),
+        SystemWaiter.cancelled_at.is_(None),
+        SystemWaiter.expires_at > func.now()
+    )
+
+
+def _pool(organization_id: uuid.UUID, department_id: Optional[uuid.UUID], system_id: Optional[uuid.UUID]) -> list:
+    """ Conditions for the systems of a pool """
+
+    conditions = [System.organization_id == organization_id]
+    if system_id is not None:
+        conditions.append(System.id == system_id)
+    if department_id is not None:
+        conditions.append(System.department_id == department_id)
+    return conditions
+
+
+def _serves_waiter():
+    """ A FREE system, not reserved by someone else, in the pool of the SystemWaiter row being selected """
+
+    return exists().where(
+        System.status == SystemStatus.FREE,
+        unreserved_for(SystemWaiter.user_id),
+        System.organization_id == SystemWaiter.organization_id,
+        or_(SystemWaiter.system_id.is_(None), System.id == SystemWaiter.system_id),
+        or_(SystemWaiter.department_id.is_(None), System.department_id == SystemWaiter.department_id)
+    )
+
+
+async def enqueue(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    organization_id: uuid.UUID,
+    acquire: AcquireRequest
+) -> uuid.UUID:
+    """ Join the back of the queue; returns the waiter id """
+
+    pool = _pool(organization_id, acquire.department_id, acquire.system_id)
+    if not await db.scalar(select(exists().where(*pool))):
+        await db.rollback()
+        raise EmptyPool()
+
+    waiter_id = uuid.uuid4()
+    db.add(SystemWaiter(
+        id=waiter_id,
+        organization_id=organization_id,
+        user_id=user_id,
+        department_id=acquire.department_id,
+        system_id=acquire.system_id,
+        notes=acquire.notes,
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=acquire.timeout + WAITLIST_GRACE_SECONDS)
+    ))
+    await db.commit()
+    return waiter_id
+
+
+async def resume(db: AsyncSession, waiter_id: uuid.UUID, user_id: uuid.UUID, timeout: float) -> None:
+    """ Keep a waiter's place for another poll, or raise WaiterNotFound """
+
+    result = await db.execute(
+        update(SystemWaiter)
+        .where(
+            SystemWaiter.id == waiter_id,
+            SystemWaiter.user_id == user_id,
+            SystemWaiter.cancelled_at.is_(None),
+            or_(SystemWaiter.granted_at.is_not(None), SystemWaiter.expires_at > func.now())
+        )
+        .values(expires_at=func.now() + timedelta(seconds=timeout + WAITLIST_GRACE_SECONDS))
+        .returning(SystemWaiter.id)
+    )
+    if result.first() is None:
+        await db.rollback()
+        raise WaiterNotFound(waiter_id)
+    await db.commit()
+
+
+async def cancel(db: AsyncSession, waiter_id: uuid.UUID, user_id: uuid.UUID) -> None:
+    """ Leave the queue, or raise WaiterNotFound (also once granted - release the claim instead) """
+
+    result = await db.execute(
+        update(SystemWaiter)
+        .where(SystemWaiter.id == waiter_id, SystemWaiter.user_id == user_id, _is_waiting())
+        .values(cancelled_at=func.now())
+        .returning(SystemWaiter.id)
+    )
+    if result.first() is None:
+        await db.rollback()
+        raise WaiterNotFound(waiter_id)
+    await db.commit()
+
+
+async def waiter_status(db: AsyncSession, waiter_id: uuid.UUID) -> dict:
+    """ The grant of a waiter, or how many waiters of its organization are ahead of it """
+
+    waiter = (await db.execute(
+        select(
+            SystemWaiter.position,
+            SystemWaiter.organization_id,
+            SystemWaiter.granted_claim_id,
+            SystemWaiter.granted_system_id,
+            SystemWaiter.granted_at,
+            SystemWaiter.created_at,
+            SystemWaiter.expires_at
+        )
+        .where(SystemWaiter.id == waiter_id)
+    )).one()
+
+    if waiter.granted_at is not None:
+        await db.commit()
+        return {
+            "status": "claimed",
+            "waiter_id": str(waiter_id),
+            "claim_id": str(waiter.granted_claim_id),
+            "system_id": str(waiter.granted_system_id),
+            "claimed_at": waiter.granted_at.isoformat(),
+            "waited_ms": round((waiter.granted_at - waiter.created_at).total_seconds() * 1000)
+        }
+
+    ahead = (await db.execute(
+        select(func.count())
+        .select_from(SystemWaiter)
+        .where(
+            _is_waiting(),
+            SystemWaiter.organization_id == waiter.organization_id,
+            SystemWaiter.position < waiter.position
+        )
+    )).scalar()
+    await db.commit()
+    return {
+        "status": "waiting",
+        "waiter_id": str(waiter_id),
+        "ahead": ahead,
+        "expires_at": waiter.expires_at.isoformat()
+    }
+
+
+async def dispatch(db: AsyncSession) -> int:
+    """ Grant FREE systems to the oldest waiters they can serve; returns grants made """
+
+    granted = 0
+    while True:
+        waiter = (await db.execute(
+            select(
+                SystemWaiter.id,
+                SystemWaiter.organization_id,
+                SystemWaiter.department_id,
+                SystemWaiter.system_id,
+                SystemWaiter.user_id,
+                SystemWaiter.notes
+            )
+            .where(_is_waiting(), _serves_waiter())
+            .order_by(SystemWaiter.position)
+            .limit(1)
+            .with_for_update(of=SystemWaiter, skip_locked=True)
+        )).first()
+        if waiter is None:
+            await db.rollback()
+            return granted
+
+        system_id = (await db.execute(
+            select(System.id)
+            .where(
+                System.status == SystemStatus.FREE,
+                unreserved_for(waiter.user_id),
+                *_pool(waiter.organization_id, waiter.department_id, waiter.system_id)
+            )
+            .order_by(System.name)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )).scalar()
+        if system_id is None:
+            # Its systems are being handed out by another dispatcher right now
+            await db.rollback()
+            return granted
+
+        try:
+            claimed = await claim_system(db, system_id, waiter.user_id, notes=waiter.notes, commit=False)
+        except SystemUnavailable:
+            # Reserved by another user since the select - retried on the next event or sweep
+            await db.rollback()
+            return granted
+        await db.execute(
+            update(SystemWaiter)
+            .where(SystemWaiter.id == waiter.id)
+            .values(
+                granted_claim_id=claimed.claim_id,
+                granted_system_id=system_id,
+                granted_at=claimed.claimed_at
+            )
+        )
+        await db.commit()
+        granted += 1
+
+
+async def remove_finished(db: AsyncSession) -> int:
+    """ Delete granted, cancelled and abandoned waiters older than WAITLIST_RETENTION_HOURS """
+
+    result = await db.execute(
+        delete(SystemWaiter)
+        .where(
+            SystemWaiter.created_at < func.now() - timedelta(hours=WAITLIST_RETENTION_HOURS),
+            ~_is_waiting()
+        )
+    )
+    await db.commit()
+    return result.rowcount
+
+
+class Waitlist:
+    """ Per-worker dispatcher and the long-poll requests waiting on it """
+
+    def __init__(self):
+        self._wakers: Dict[uuid.UUID, asyncio.Future] = {}
+        self.dispatches = 0
+        self.granted = 0
+        self.woken = 0
+
+    def watch(self, waiter_id: uuid.UUID) -> asyncio.Future:
+        """ Future resolved when the waiter is granted; register it before checking the row """
+
+        future = asyncio.get_running_loop().create_future()
+        self._wakers[waiter_id] = future
+        return future
+
+    def unwatch(self, waiter_id: uuid.UUID) -> None:
+        future = self._wakers.pop(waiter_id, None)
+        if future is not None and not future.done():
+            future.cancel()
+
+    def _wake(self, event: dict) -> None:
+        try:
+            future = self._wakers.get(uuid.UUID(event["waiter_id"]))
+        except (KeyError, ValueError):
+            return
+        if future is not None and not future.done():
+            future.set_result(None)
+            self.woken += 1
+
+    async def dispatch(self, db: AsyncSession) -> int:
+        granted = await dispatch(db)
+        self.dispatches += 1
+        self.granted += granted
+        return granted
+
+    async def run(self, session_factory: async_sessionmaker, broadcaster: EventBroadcaster) -> None:
+        """ Background task: dispatch on every FREE system and wake granted waiters """
+
+        while True:
+            subscriber = broadcaster.subscribe()
+            try:
+                # Serves whatever queued up while no worker was running
+                async with session_factory() as db:
+                    await self.dispatch(db)
+                while True:
+                    try:
+                        events = [await asyncio.wait_for(subscriber.queue.get(), WAITLIST_SWEEP_SECONDS)]
+                    except asyncio.TimeoutError:
+                        async with session_factory() as db:
+                            await self.dispatch(db)
+                            await remove_finished(db)
+                        continue
+
+                    # Everything already queued, so a burst of releases costs one dispatch
+                    while not subscriber.queue.empty():
+                        events.append(subscriber.queue.get_nowait())
+
+                    freed = False
+                    for event in events:
+                        kind = event.get("type")
+                        if kind == "waiter":
+                            self._wake(event)
+                        elif kind == "resync" or (kind == "system" and event.get("status") == SystemStatus.FREE.value):
+                            freed = True
+                    if freed:
+                        async with session_factory() as db:
+                            await self.dispatch(db)
+
+                    # Fell behind and was dropped - resubscribe and dispatch
+                    if subscriber.dropped and subscriber.queue.empty():
+                        break
+            except (SQLAlchemyError, OSError) as e:
+                request_log.event("waitlist_dispatch_failed", error=str(e))
+                await asyncio.sleep(WAITLIST_SWEEP_SECONDS)
+            finally:
+                broadcaster.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        return {
+            "waiting_requests": len(self._wakers),
+            "dispatches": self.dispatches,
+            "granted": self.granted,
+            "woken": self.woken
+        }
+
+
+waitlist = Waitlist()
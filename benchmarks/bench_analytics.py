@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: utilization analytics over a year of claims.
+
+Seeds S systems in D departments (prefixed "bench-analytics-"), each with
+back-to-back claims over the last year, then times utilization_report for
+the whole year: the bulk fetch, the NumPy computation and the total.
+The target is under a second for a year of thousands of systems.
+
+Needs DATABASE_URL with migrations applied. Seeding a million claims takes
+a minute or two.
+
+    python benchmarks/bench_analytics.py --systems 2000 --claims-per-day 1
+    python benchmarks/bench_analytics.py --systems 5000 --claims-per-day 2 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.analytics import utilization_report
+from app.db.partitions import ensure_claim_partitions
+from app.db.session import engine
+
+DAYS = 365
+
+SEED = [
+    "INSERT INTO organizations (id, name) VALUES (gen_random_uuid(), 'bench-analytics-org')",
+    """
+    INSERT INTO users (id, first_name, last_name, email, organization_id)
+    SELECT gen_random_uuid(), 'Bench', 'Analyst' || g, 'bench-analytics-' || g || '@example.com', o.id
+    FROM generate_series(1, 100) g, organizations o WHERE o.name = 'bench-analytics-org'
+    """,
+    """
+    INSERT INTO departments (id, name, organization_id)
+    SELECT gen_random_uuid(), 'bench-analytics-' || g, o.id
+    FROM generate_series(1, :departments) g, organizations o WHERE o.name = 'bench-analytics-org'
+    """,
+    """
+    INSERT INTO systems (id, name, status, organization_id, department_id)
+    SELECT gen_random_uuid(), 'bench-analytics-' || g, 'FREE', o.id, d.id
+    FROM generate_series(1, :systems) g
+    CROSS JOIN organizations o
+    JOIN (SELECT id, row_number() OVER (ORDER BY name) AS n FROM departments WHERE name LIKE 'bench-analytics-%') d
+      ON d.n = 1 + g % :departments
+    WHERE o.name = 'bench-analytics-org'
+    """,
+    # Claim k of a system starts at slot k; each is held for 10-90% of its slot
+    """
+    INSERT INTO system_claims (id, organization_id, system_id, claimed_by_user_id, claimed_at, released_at)
+    SELECT gen_random_uuid(), s.organization_id, s.id, u.id,
+           now() - make_interval(secs => (k + 1) * :slot),
+           now() - make_interval(secs => (k + 1) * :slot) + make_interval(secs => :slot * (0.1 + 0.8 * random()))
+    FROM (SELECT id, organization_id, row_number() OVER () AS n FROM systems WHERE name LIKE 'bench-analytics-%') s
+    CROSS JOIN generate_series(0, :claims_per_system - 1) k
+    JOIN (SELECT id, row_number() OVER () AS n FROM users WHERE email LIKE 'bench-analytics-%') u
+      ON u.n = 1 + (s.n + k) % 100
+    """,
+]
+
+TEARDOWN = [
+    """
+    DELETE FROM system_claims WHERE organization_id IN
+        (SELECT id FROM organizations WHERE name = 'bench-analytics-org')
+    """,
+    "DELETE FROM systems WHERE name LIKE 'bench-analytics-%'",
+    "DELETE FROM departments WHERE name LIKE 'bench-analytics-%'",
+    "DELETE FROM users WHERE email LIKE 'bench-analytics-%'",
+    "DELETE FROM organizations WHERE name = 'bench-analytics-org'",
+]
+
+
+def run_statements(statements, **params) -> None:
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement), params)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--systems", type=int, default=2000)
+    parser.add_argument("--departments", type=int, default=20)
+    parser.add_argument("--claims-per-day", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    claims_per_system = int(DAYS * args.claims_per_day)
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=DAYS)
+
+    run_statements(TEARDOWN)
+    with engine.begin() as connection:
+        ensure_claim_partitions(connection, start=start)
+    seed_started = time.perf_counter()
+    run_statements(SEED, systems=args.systems, departments=args.departments,
+                   claims_per_system=claims_per_system, slot=86400 / args.claims_per_day)
+    print(f"seeded {args.systems * claims_per_system} claims in {time.perf_counter() - seed_started:.1f}s")
+    # Measure the steady state, not the first read of freshly written pages
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM (ANALYZE) system_claims"))
+
+    try:
+        with engine.connect() as connection:
+            organization_id = connection.execute(
+                text("SELECT id FROM organizations WHERE name = 'bench-analytics-org'")
+            ).scalar()
+
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            with engine.connect() as connection:
+                report = utilization_report(connection, organization_id, start, now)
+            timings.append((time.perf_counter() - started, report["fetch_ms"], report["compute_ms"]))
+    finally:
+        run_statements(TEARDOWN)
+
+    total, fetch_ms, compute_ms = min(timings)
+    busiest = report["departments"][0]
+    print(f"systems={args.systems} departments={args.departments} claims={report['claims']} window={DAYS}d")
+    print(f"  fetch (SQL)     {fetch_ms:10.1f} ms")
+    print(f"  compute (NumPy) {compute_ms:10.1f} ms")
+    print(f"  total           {total * 1000:10.1f} ms (best of {args.repeat}) - target < 1000 ms")
+    print(f"  busiest department {busiest['name']}: {busiest['utilization']:.1%} utilized, "
+          f"{busiest['claims_per_day']:.1f} claims/day, peak {busiest['peak_concurrency']} concurrent")
+
+
+if __name__ == "__main__":
+    main()
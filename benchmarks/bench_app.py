@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-to-end request load on the web app, in process.
+
+Drives app.main.app through httpx.ASGITransport (no sockets, no uvicorn):
+the real routes, middleware, auth, templates, fragment cache and database.
+For each dataset size it seeds an organization (prefixed "bench-app-") with
+S systems, departments, users and claim history, then runs every flow at
+every concurrency level for --duration seconds:
+
+    login      POST /api/login (bcrypt verify, JWT, cookie)
+    main       GET /
+    systems    GET /api/systems (first page)
+    activity   GET /api/activity
+    claim      POST /api/systems/claim-any, then release the system
+
+Each flow is reported with requests/sec, latency p50/p95/p99 per iteration
+(claim + release count as one iteration of two requests), errors (status
+>= 400) and SQL statements per request, from the app's own
+db_statements_per_request metric. Results go to --output as JSON;
+--compare prints the change against an earlier result file.
+
+Use a scratch database: DATABASE_URL with migrations applied. Other rows
+in it count too (the systems list and activity feed are not per
+organization), so compare runs against the same database. Request log
+lines are sampled out (REQUEST_LOG_SAMPLE) unless set otherwise; login
+events and slow requests still go to stdout.
+
+    python benchmarks/bench_app.py --systems 200 2000 --concurrency 1 10 50
+    python benchmarks/bench_app.py --flows systems activity --output after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Before the app is imported: keep only errors and slow requests in the request log
+os.environ.setdefault("REQUEST_LOG_SAMPLE", "/=0")
+
+import httpx
+from sqlalchemy import text
+
+from app import metrics
+from app.auth import create_access_token, get_password_hash
+from app.db.partitions import ensure_claim_partitions
+from app.db.session import async_engine, engine
+from app.main import app, lifespan
+
+PASSWORD = "bench-app-password"
+HISTORY_DAYS = 30
+FLOWS = ("login", "main", "systems", "activity", "claim")
+
+SEED = [
+    "INSERT INTO organizations (id, name) VALUES (gen_random_uuid(), 'bench-app-org')",
+    """
+    INSERT INTO users (id, first_name, last_name, email, password_hash, is_active, is_admin, organization_id)
+    SELECT gen_random_uuid(), 'Bench', 'User' || g, 'bench-app-' || g || '@example.com', :password_hash,
+           true, false, o.id
+    FROM generate_series(1, :users) g, organizations o WHERE o.name = 'bench-app-org'
+    """,
+    """
+    INSERT INTO departments (id, name, organization_id)
+    SELECT gen_random_uuid(), 'bench-app-' || g, o.id
+    FROM generate_series(1, :departments) g, organizations o WHERE o.name = 'bench-app-org'
+    """,
+    """
+    INSERT INTO systems (id, name, status, organization_id, department_id)
+    SELECT gen_random_uuid(), 'bench-app-' || lpad(g::text, 6, '0'), 'FREE', o.id, d.id
+    FROM generate_series(1, :systems) g
+    CROSS JOIN organizations o
+    JOIN (SELECT id, row_number() OVER (ORDER BY name) AS n FROM departments WHERE name LIKE 'bench-app-%') d
+      ON d.n = 1 + g % :departments
+    WHERE o.name = 'bench-app-org'
+    """,
+    # Released claims spread over the last HISTORY_DAYS days
+    """
+    INSERT INTO system_claims (id, organization_id, system_id, claimed_by_user_id, claimed_at, released_at)
+    SELECT gen_random_uuid(), s.organization_id, s.id, u.id,
+           now() - make_interval(secs => (k + 1) * :slot),
+           now() - make_interval(secs => (k + 1) * :slot) + make_interval(secs => :slot * 0.5)
+    FROM (SELECT id, organization_id, row_number() OVER () AS n FROM systems WHERE name LIKE 'bench-app-%') s
+    CROSS JOIN generate_series(0, :claims_per_system - 1) k
+    JOIN (SELECT id, row_number() OVER () AS n FROM users WHERE email LIKE 'bench-app-%') u
+      ON u.n = 1 + (s.n + k) % :users
+    """,
+]
+
+TEARDOWN = [
+    """
+    DELETE FROM system_claims WHERE organization_id IN
+        (SELECT id FROM organizations WHERE name = 'bench-app-org')
+    """,
+    "DELETE FROM systems WHERE name LIKE 'bench-app-%'",
+    "DELETE FROM departments WHERE name LIKE 'bench-app-%'",
+    "DELETE FROM users WHERE email LIKE 'bench-app-%'",
+    "DELETE FROM organizations WHERE name = 'bench-app-org'",
+]
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_statements(statements, **params) -> None:
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement), params)
+
+
+def seed(systems: int, departments: int, users: int, claims_per_system: int) -> list:
+    """ Seed one dataset; returns (email, cookie header) per user """
+
+    run_statements(TEARDOWN)
+    with engine.begin() as connection:
+        ensure_claim_partitions(connection, start=datetime.now(timezone.utc) - timedelta(days=HISTORY_DAYS))
+    run_statements(
+        SEED, systems=systems, departments=departments, users=users,
+        claims_per_system=claims_per_system, slot=HISTORY_DAYS * 86400 / max(claims_per_system, 1),
+        password_hash=get_password_hash(PASSWORD)
+    )
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM (ANALYZE) systems, system_claims, users"))
+        emails = connection.execute(
+            text("SELECT email FROM users WHERE email LIKE 'bench-app-%' ORDER BY email")
+        ).scalars().all()
+
+    return [
+        (email, {"Cookie": f"access_token={create_access_token({'sub': email})}"})
+        for email in emails
+    ]
+
+
+async def login(client: httpx.AsyncClient, email: str, headers: dict) -> list:
+    response = await client.post("/api/login", data={"username": email, "password": PASSWORD})
+    # The other flows send their own cookie; don't let the client jar add this one
+    client.cookies.clear()
+    return [response]
+
+
+async def main_page(client: httpx.AsyncClient, email: str, headers: dict) -> list:
+    return [await client.get("/", headers=headers)]
+
+
+async def systems_list(client: httpx.AsyncClient, email: str, headers: dict) -> list:
+    return [await client.get("/api/systems", headers=headers)]
+
+
+async def activity(client: httpx.AsyncClient, email: str, headers: dict) -> list:
+    return [await client.get("/api/activity", headers=headers)]
+
+
+async def claim_release(client: httpx.AsyncClient, email: str, headers: dict) -> list:
+    claimed = await client.post("/api/systems/claim-any", headers=headers)
+    if claimed.status_code != 200:
+        return [claimed]
+    released = await client.post(f"/api/systems/{claimed.json()['system_id']}/release", headers=headers)
+    return [claimed, released]
+
+
+FLOW_STEPS = {
+    "login": login,
+    "main": main_page,
+    "systems": systems_list,
+    "activity": activity,
+    "claim": claim_release,
+}
+
+
+async def run_level(client: httpx.AsyncClient, step, users: list, concurrency: int, duration: float) -> dict:
+    """ `concurrency` workers, each as its own user, repeating `step` for `duration` seconds """
+
+    latencies = []
+    requests = errors = 0
+    statements_before = metrics.request_statements.totals()
+    deadline = time.perf_counter() + duration
+
+    async def worker(index: int):
+        nonlocal requests, errors
+        email, headers = users[index % len(users)]
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            responses = await step(client, email, headers)
+            latencies.append(time.perf_counter() - started)
+            requests += len(responses)
+            errors += sum(1 for response in responses if response.status_code >= 400)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    count, statements = metrics.request_statements.totals()
+    count -= statements_before[0]
+    statements -= statements_before[1]
+    return {
+        "requests": requests,
+        "iterations": len(latencies),
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "statements_per_request": round(statements / count, 2) if count else None,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(entry["systems"], entry["flow"], entry["concurrency"]): entry for entry in baseline["results"]}
+
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')})")
+    print(f"{'systems':>8} {'flow':<9} {'conc':>5} | {'rps':>16} | {'p95 ms':>18}")
+    for entry in results:
+        old = before.get((entry["systems"], entry["flow"], entry["concurrency"]))
+        if old is None:
+            continue
+        rps_change = (entry["rps"] / old["rps"] - 1) * 100 if old["rps"] else 0.0
+        p95_change = (entry["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0.0
+        print(f"{entry['systems']:>8} {entry['flow']:<9} {entry['concurrency']:>5} | "
+              f"{entry['rps']:>8.1f} ({rps_change:+5.1f}%) | {entry['p95_ms']:>9.2f} ({p95_change:+5.1f}%)")
+
+
+async def run(args) -> list:
+    results = []
+    print(f"{'systems':>8} {'flow':<9} {'conc':>5} | {'rps':>8} | {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} | "
+          f"{'stmts/req':>9} | {'errors':>6}")
+    print("-" * 90)
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            try:
+                for systems in args.systems:
+                    users = seed(systems, args.departments, args.users, args.claims_per_system)
+                    for flow in args.flows:
+                        step = FLOW_STEPS[flow]
+                        # Warm the pools, principal cache and fragment cache
+                        await run_level(client, step, users, min(args.concurrency), args.warmup)
+                        for concurrency in args.concurrency:
+                            result = await run_level(client, step, users, concurrency, args.duration)
+                            result.update(systems=systems, flow=flow, concurrency=concurrency)
+                            results.append(result)
+                            print(f"{systems:>8} {flow:<9} {concurrency:>5} | {result['rps']:>8.1f} | "
+                                  f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} | "
+                                  f"{result['statements_per_request'] or 0:>9.2f} | {result['errors']:>6}")
+            finally:
+                run_statements(TEARDOWN)
+    # Close pooled asyncpg connections while their event loop is still running
+    await async_engine.dispose()
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--systems", type=int, nargs="+", default=[200, 2000], help="dataset sizes")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--flows", nargs="+", choices=FLOWS, default=list(FLOWS))
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per flow and level")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds per flow before measuring")
+    parser.add_argument("--departments", type=int, default=20)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--claims-per-system", type=int, default=20, help=f"claim history over {HISTORY_DAYS} days")
+    parser.add_argument("--output", default="bench_app_results.json")
+    parser.add_argument("--compare", help="earlier --output file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "departments": args.departments,
+            "users": args.users,
+            "claims_per_system": args.claims_per_system,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
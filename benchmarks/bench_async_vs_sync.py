@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sync (threadpool) vs async (asyncpg) request handling.
+
+Two identical routes are mounted on a throwaway FastAPI app - one uses the
+sync SessionLocal, the other the AsyncSessionLocal - and each is driven by
+N concurrent in-process clients for a fixed duration. Requests per second
+are reported for every concurrency level.
+
+Needs a reachable DATABASE_URL with the tables created (see app/db/setup.py).
+
+    python benchmarks/bench_async_vs_sync.py --clients 50 100 250 500
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import select
+
+from app.db.session import SessionLocal, AsyncSessionLocal
+from app.db.db_models import System
+
+
+bench_app = FastAPI()
+
+
+@bench_app.get("/sync")
+def sync_systems():
+    with SessionLocal() as db:
+        systems = db.execute(select(System.id, System.name).limit(50)).all()
+    return {"count": len(systems)}
+
+
+@bench_app.get("/async")
+async def async_systems():
+    async with AsyncSessionLocal() as db:
+        systems = (await db.execute(select(System.id, System.name).limit(50))).all()
+    return {"count": len(systems)}
+
+
+async def run_level(path: str, clients: int, duration: float) -> float:
+    """ Drive `path` with `clients` concurrent workers, return requests/sec """
+
+    transport = httpx.ASGITransport(app=bench_app)
+    completed = 0
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal completed
+            while time.perf_counter() < deadline:
+                response = await client.get(path)
+                response.raise_for_status()
+                completed += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return completed / elapsed
+
+
+async def main(levels, duration: float) -> None:
+    # Warm up both pools so connection setup is not measured
+    await run_level("/sync", 5, 1)
+    await run_level("/async", 5, 1)
+
+    print(f"{'clients':>8} | {'sync rps':>10} | {'async rps':>10} | {'speedup':>7}")
+    print("-" * 45)
+    for clients in levels:
+        sync_rps = await run_level("/sync", clients, duration)
+        async_rps = await run_level("/async", clients, duration)
+        print(f"{clients:>8} | {sync_rps:>10.1f} | {async_rps:>10.1f} | {async_rps / sync_rps:>6.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.clients, args.duration))
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the auth hot path in app/auth.py, and a bcrypt configuration for a login load.
+
+Per-call cost of everything a request or a login runs through:
+
+    create_access_token        JWT encode (login)
+    verify_token               JWT decode + signature check
+    request.cookies            Cookie header parse (first access per request)
+    cookie auth (cached)       get_current_user_from_cookie on a principal cache hit
+    bcrypt verify / hash       get_pwd_context() at BCRYPT_ROUNDS
+
+reported as ops/sec (best of --repeat), peak bytes allocated during one
+call and blocks still held after 1000 calls (tracemalloc - Python has no
+allocation counter, so transient allocations show up only in the peak).
+
+Then:
+
+    - bcrypt cost sweep: verify time per cost factor, one thread, and the
+      parallel speedup on PASSWORD_HASH_CONCURRENCY threads (bcrypt releases
+      the GIL, so the password executor should scale with cores)
+    - JWT size: token and Cookie header bytes for a few claim sets and
+      algorithms, with decode time
+    - recommendation: for --login-rate logins/sec and a --latency-budget-ms
+      p95 on login, the highest cost factor that fits, modelled as an M/M/c
+      queue (c = PASSWORD_HASH_CONCURRENCY) with the measured verify time,
+      plus a PASSWORD_HASH_QUEUE_LIMIT past which logins would miss the
+      budget anyway and are better refused with 503
+
+No database needed.
+
+    python benchmarks/bench_auth.py
+    python benchmarks/bench_auth.py --login-rate 20 --latency-budget-ms 500 --rounds 10 11 12 13
+"""
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jose import jwt
+from starlette.requests import Request
+
+from app.auth import (
+    ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, BCRYPT_ROUNDS, PASSWORD_HASH_CONCURRENCY, SECRET_KEY,
+    create_access_token, get_current_user_from_cookie, get_pwd_context, verify_token
+)
+from app.principal_cache import UserSnapshot, principal_cache
+
+EMAIL = "jane.doe@example.com"
+PASSWORD = "correct horse battery staple"
+# What a browser sends alongside the session cookie
+OTHER_COOKIES = "_ga=GA1.1.1234567890.1700000000; theme=dark; sidebar=collapsed"
+# OWASP's floor for bcrypt
+MIN_ROUNDS = 10
+
+
+def make_request(cookie_header: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/systems",
+        "headers": [(b"cookie", cookie_header.encode())],
+        "state": {},
+    })
+
+
+def run_coroutine(coroutine):
+    """ Drive a coroutine that never actually suspends (a principal cache hit) """
+
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended - not a cache hit")
+
+
+def ops_per_second(func, number: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - started)
+    return number / best
+
+
+def allocations(func, number: int = 1000):
+    """ (peak bytes during one call, blocks still held after `number` calls) """
+
+    func()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        func()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+
+        before = tracemalloc.take_snapshot()
+        for _ in range(number):
+            func()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    retained = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return peak, retained
+
+
+def micro_benchmarks(repeat: int) -> None:
+    token = create_access_token({"sub": EMAIL}, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    cookie_header = f"{OTHER_COOKIES}; access_token={token}"
+    snapshot = UserSnapshot(
+        id=uuid.uuid4(), email=EMAIL, first_name="Jane", last_name="Doe", organization_id=uuid.uuid4(),
+        is_active=True, is_admin=False, last_login=None, avatar_url=None
+    )
+    # Every case may run longer than PRINCIPAL_CACHE_TTL_SECONDS at a high
+    # --repeat; the cached case must never miss (there is no database)
+    ttl, principal_cache.ttl = principal_cache.ttl, float("inf")
+    try:
+        principal_cache.put(token, jwt.get_unverified_claims(token), snapshot)
+    finally:
+        principal_cache.ttl = ttl
+    pwd_context = get_pwd_context()
+    stored_hash = pwd_context.hash(PASSWORD)
+
+    cases = [
+        ("create_access_token", lambda: create_access_token({"sub": EMAIL}, timedelta(minutes=30)), 2000),
+        ("verify_token", lambda: verify_token(token), 2000),
+        ("request.cookies", lambda: make_request(cookie_header).cookies.get("access_token"), 20000),
+        ("cookie auth (cached)",
+         lambda: run_coroutine(get_current_user_from_cookie(make_request(cookie_header), None)), 20000),
+        (f"bcrypt verify ({BCRYPT_ROUNDS})", lambda: pwd_context.verify(PASSWORD, stored_hash), 3),
+        (f"bcrypt hash ({BCRYPT_ROUNDS})", lambda: pwd_context.hash(PASSWORD), 3),
+    ]
+
+    print(f"{'operation':<24} | {'ops/sec':>12} | {'µs/op':>10} | {'peak B/op':>9} | {'kept blk/1k':>11}")
+    print("-" * 80)
+    for name, func, number in cases:
+        rate = ops_per_second(func, number, repeat)
+        peak, retained = allocations(func, number=min(number, 1000))
+        print(f"{name:<24} | {rate:>12,.0f} | {1e6 / rate:>10.1f} | {peak:>9,d} | {retained:>11d}")
+
+
+def bcrypt_sweep(rounds, samples: int, threads: int) -> dict:
+    """ Median single-thread verify time per cost factor, and the speedup on `threads` threads """
+
+    print(f"\nbcrypt verify, {samples} samples per cost, {threads} threads for the parallel column")
+    print(f"{'rounds':>6} | {'1 thread ms':>11} | {'per core/s':>10} | {f'{threads} threads/s':>12} | {'speedup':>7}")
+    print("-" * 60)
+    verify_seconds = {}
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for cost in rounds:
+            context = get_pwd_context().copy(bcrypt__rounds=cost, bcrypt__min_rounds=cost)
+            stored_hash = context.hash(PASSWORD)
+            timings = []
+            for _ in range(samples):
+                started = time.perf_counter()
+                context.verify(PASSWORD, stored_hash)
+                timings.append(time.perf_counter() - started)
+            single = statistics.median(timings)
+
+            jobs = threads * max(2, samples // 2)
+            started = time.perf_counter()
+            list(executor.map(lambda _: context.verify(PASSWORD, stored_hash), range(jobs)))
+            parallel = jobs / (time.perf_counter() - started)
+
+            verify_seconds[cost] = (single, parallel)
+            print(f"{cost:>6} | {single * 1000:>11.1f} | {1 / single:>10.1f} | {parallel:>12.1f} | "
+                  f"{parallel * single:>6.2f}x")
+    return verify_seconds
+
+
+def jwt_sizes(repeat: int) -> None:
+    expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    claim_sets = [
+        ("sub (current)", {"sub": EMAIL}),
+        ("sub + iat", {"sub": EMAIL, "iat": int(time.time())}),
+        ("user id as sub", {"sub": str(uuid.uuid4())}),
+        ("sub + uid + org + admin", {"sub": EMAIL, "uid": str(uuid.uuid4()),
+                                     "org": str(uuid.uuid4()), "adm": False}),
+    ]
+
+    print("\nJWT size (the cookie goes out on every request)")
+    print(f"{'claims':<24} {'alg':<6} | {'token B':>7} | {'cookie B':>8} | {'decode µs':>9}")
+    print("-" * 66)
+    for algorithm in ("HS256", "HS512"):
+        for name, claims in claim_sets:
+            token = jwt.encode({**claims, "exp": int(time.time() + expires.total_seconds())},
+                               SECRET_KEY, algorithm=algorithm)
+            rate = ops_per_second(lambda: jwt.decode(token, SECRET_KEY, algorithms=[algorithm]), 1000, repeat)
+            cookie = len(f"Cookie: access_token={token}")
+            print(f"{name:<24} {algorithm:<6} | {len(token):>7} | {cookie:>8} | {1e6 / rate:>9.1f}")
+
+
+def erlang_c(servers: int, load: float) -> float:
+    """ Probability an arrival has to queue in M/M/c, `load` = arrival rate x service time """
+
+    if load >= servers:
+        return 1.0
+    term = 1.0
+    total = 1.0
+    for k in range(1, servers):
+        term *= load / k
+        total += term
+    term *= load / servers
+    queued = term * servers / (servers - load)
+    return queued / (total + queued)
+
+
+def login_p95(rate: float, service: float, servers: int) -> float:
+    """ p95 login time on `servers` bcrypt threads: service time plus the M/M/c wait """
+
+    load = rate * service
+    if load >= servers:
+        return float("inf")
+    queue_probability = erlang_c(servers, load)
+    wait = 0.0
+    if queue_probability > 0.05:
+        wait = service / (servers - load) * math.log(queue_probability / 0.05)
+    return service + wait
+
+
+def recommend(verify_seconds: dict, login_rate: float, budget_ms: float, servers: int) -> None:
+    budget = budget_ms / 1000
+    print(f"\nrecommendation for {login_rate:g} logins/sec, p95 login <= {budget_ms:g} ms "
+          f"(bcrypt only - add DB and JWT time from bench_app.py), {servers} bcrypt threads")
+    print(f"{'rounds':>6} | {'effective ms':>12} | {'utilization':>11} | {'p95 ms':>8} | fits")
+    print("-" * 56)
+
+    chosen = below_minimum = None
+    for cost, (single, parallel) in sorted(verify_seconds.items()):
+        # Measured throughput, not servers / single: cores may be fewer than threads
+        effective = servers / parallel
+        utilization = login_rate / parallel
+        p95 = login_p95(login_rate, effective, servers)
+        fits = p95 <= budget and utilization <= 0.8
+        if fits and cost >= MIN_ROUNDS:
+            chosen = cost
+        elif fits:
+            below_minimum = cost
+        print(f"{cost:>6} | {effective * 1000:>12.1f} | {utilization:>10.0%} | "
+              f"{p95 * 1000 if p95 != float('inf') else float('inf'):>8.1f} | {'yes' if fits else 'no'}")
+
+    if chosen is None:
+        if below_minimum is not None:
+            print(f"\nonly cost {below_minimum} fits, below the minimum of {MIN_ROUNDS}: "
+                  "add cores / workers rather than lowering the cost")
+        else:
+            print("\nno measured cost factor fits: add cores / workers, relax the budget, or rate-limit logins")
+        return
+
+    effective = servers / verify_seconds[chosen][1]
+    # A login queued behind this many others already misses the budget
+    queue_limit = max(0, int(servers * (budget - effective) / effective))
+    print(f"\nBCRYPT_ROUNDS={chosen}")
+    print(f"PASSWORD_HASH_CONCURRENCY={servers}")
+    print(f"PASSWORD_HASH_QUEUE_LIMIT={queue_limit}")
+    if chosen != BCRYPT_ROUNDS:
+        print(f"# currently BCRYPT_ROUNDS={BCRYPT_ROUNDS}; existing hashes are rehashed on their next login")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13, 14])
+    parser.add_argument("--samples", type=int, default=5, help="bcrypt verifies per cost factor")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=PASSWORD_HASH_CONCURRENCY,
+                        help="bcrypt threads (default PASSWORD_HASH_CONCURRENCY)")
+    parser.add_argument("--login-rate", type=float, default=10.0, help="peak logins/sec per worker")
+    parser.add_argument("--latency-budget-ms", type=float, default=500.0, help="p95 login budget")
+    args = parser.parse_args()
+
+    print(f"BCRYPT_ROUNDS={BCRYPT_ROUNDS} ALGORITHM={ALGORITHM} cpus={os.cpu_count()}\n")
+    micro_benchmarks(args.repeat)
+    verify_seconds = bcrypt_sweep(args.rounds, args.samples, args.threads)
+    jwt_sizes(args.repeat)
+    recommend(verify_seconds, args.login_rate, args.latency_budget_ms, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: claim expiry lateness.
+
+Claims N systems with durations spread evenly over --spread seconds and
+runs the expiry scheduler (app/claim_expiry.py) against them. Reports how
+late each claim was released (released_at - expires_at) and how many
+batches it took. Systems and claims are created while the scheduler is
+running, so their deadlines arrive through notifications.
+
+Creates its own organization, user and systems (prefixed "bench-") and
+removes them afterwards. Needs DATABASE_URL with migrations applied.
+
+    python benchmarks/bench_claim_expiry.py --claims 2000 --spread 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, select
+
+from app.claim_expiry import claim_expiry
+from app.claims import claim_system
+from app.db.session import AsyncSessionLocal
+from app.db.db_models import Organization, System, SystemClaim, User
+from app.db.db_models.system import SystemStatus
+from app.events import event_broadcaster
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def setup(systems: int):
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        organization = Organization(id=uuid.uuid4(), name=f"bench-org-{tag}")
+        user = User(id=uuid.uuid4(), first_name="Bench", last_name="Expiry",
+                    email=f"bench-{tag}@example.com", organization_id=organization.id)
+        pool = [System(id=uuid.uuid4(), name=f"bench-{tag}-{i:05d}", status=SystemStatus.FREE,
+                       organization_id=organization.id) for i in range(systems)]
+        db.add(organization)
+        await db.flush()
+        db.add(user)
+        db.add_all(pool)
+        await db.commit()
+
+    return organization.id, user.id, [system.id for system in pool]
+
+
+async def teardown(organization_id, user_id, system_ids) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(SystemClaim).where(SystemClaim.organization_id == organization_id))
+        await db.execute(delete(System).where(System.id.in_(system_ids)))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.execute(delete(Organization).where(Organization.id == organization_id))
+        await db.commit()
+
+
+async def run(claims: int, spread: float, lead: float) -> None:
+    organization_id, user_id, system_ids = await setup(claims)
+    scheduler = asyncio.create_task(claim_expiry.run(AsyncSessionLocal, event_broadcaster))
+    try:
+        while not claim_expiry.loaded:
+            await asyncio.sleep(0.01)
+
+        # Deadlines from `lead` seconds out, spread evenly over `spread` seconds
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            for i, system_id in enumerate(system_ids):
+                deadline = start + lead + spread * i / claims
+                duration = timedelta(seconds=max(0.0, deadline - time.perf_counter()))
+                await claim_system(db, system_id, user_id, duration=duration)
+        claim_seconds = time.perf_counter() - start
+
+        async def open_claims() -> int:
+            async with AsyncSessionLocal() as db:
+                return await db.scalar(
+                    select(func.count()).select_from(SystemClaim)
+                    .where(SystemClaim.organization_id == organization_id, SystemClaim.released_at.is_(None))
+                )
+
+        batches = claim_expiry.batches
+        while await open_claims():
+            await asyncio.sleep(0.25)
+        batches = claim_expiry.batches - batches
+
+        async with AsyncSessionLocal() as db:
+            lateness = (await db.execute(
+                select(func.extract("epoch", SystemClaim.released_at - SystemClaim.expires_at))
+                .where(SystemClaim.organization_id == organization_id)
+            )).scalars().all()
+            still_claimed = await db.scalar(
+                select(func.count()).select_from(System)
+                .where(System.id.in_(system_ids), System.status != SystemStatus.FREE)
+            )
+    finally:
+        scheduler.cancel()
+        await event_broadcaster.stop()
+        await teardown(organization_id, user_id, system_ids)
+
+    lateness = [float(seconds) for seconds in lateness]
+    print(f"claims={claims} spread={spread:.1f}s lead={lead:.1f}s (claimed in {claim_seconds:.1f}s)")
+    print(f"  batches            {batches:10d}")
+    print(f"  late p50           {percentile(lateness, 50) * 1000:8.1f} ms")
+    print(f"  late p99           {percentile(lateness, 99) * 1000:8.1f} ms")
+    print(f"  late max           {max(lateness) * 1000:8.1f} ms")
+    print(f"  released early     {sum(1 for seconds in lateness if seconds < 0):10d}")
+    print(f"  systems not FREE   {still_claimed:10d} ({'OK' if still_claimed == 0 else 'NOT RELEASED'})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--claims", type=int, default=2000)
+    parser.add_argument("--spread", type=float, default=5.0, help="seconds the deadlines are spread over")
+    parser.add_argument("--lead", type=float, default=None,
+                        help="seconds until the first deadline (default: enough to create every claim)")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.claims, args.spread, args.lead if args.lead is not None else 2 + args.claims / 100))
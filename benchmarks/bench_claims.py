@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: claim/release throughput under contention.
+
+W concurrent workers race to claim a small pool of S systems, hold each
+claim briefly, and release it. Reports successful claims per second,
+conflict rate and claim latency percentiles, then checks that no system
+ever had two open claims.
+
+Creates its own organization, user and systems (prefixed "bench-") and
+removes them afterwards. Needs DATABASE_URL with migrations applied.
+
+    python benchmarks/bench_claims.py --systems 4 --workers 64 --duration 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.orm import aliased
+
+from app.claims import SystemUnavailable, claim_any_system, claim_system, release_system
+from app.db.session import AsyncSessionLocal
+from app.db.db_models import Organization, System, SystemClaim, User
+from app.db.db_models.system import SystemStatus
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def setup(systems: int):
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        organization = Organization(id=uuid.uuid4(), name=f"bench-org-{tag}")
+        user = User(id=uuid.uuid4(), first_name="Bench", last_name="Worker",
+                    email=f"bench-{tag}@example.com", organization_id=organization.id)
+        pool = [System(id=uuid.uuid4(), name=f"bench-{tag}-{i:03d}", status=SystemStatus.FREE,
+                       organization_id=organization.id) for i in range(systems)]
+        db.add(organization)
+        await db.flush()
+        db.add(user)
+        db.add_all(pool)
+        await db.commit()
+
+    return organization.id, user.id, [system.id for system in pool]
+
+
+async def teardown(organization_id, user_id, system_ids) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(SystemClaim).where(SystemClaim.organization_id == organization_id))
+        await db.execute(delete(System).where(System.id.in_(system_ids)))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.execute(delete(Organization).where(Organization.id == organization_id))
+        await db.commit()
+
+
+async def run(systems: int, workers: int, duration: float, hold: float, mode: str) -> None:
+    organization_id, user_id, system_ids = await setup(systems)
+    latencies = []
+    conflicts = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal conflicts
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    if mode == "any":
+                        claimed = await claim_any_system(db, user_id, organization_id=organization_id)
+                    else:
+                        claimed = await claim_system(db, random.choice(system_ids), user_id)
+            except SystemUnavailable:
+                conflicts += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+            await asyncio.sleep(hold)
+            async with AsyncSessionLocal() as db:
+                await release_system(db, claimed.system_id, user_id)
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        elapsed = time.perf_counter() - start
+
+        # Invariant: never more than one claim per system overlapping in time
+        async with AsyncSessionLocal() as db:
+            open_claims = (await db.execute(
+                select(func.count()).select_from(SystemClaim)
+                .where(SystemClaim.organization_id == organization_id, SystemClaim.released_at.is_(None))
+            )).scalar()
+            other = aliased(SystemClaim)
+            overlaps = (await db.execute(
+                select(func.count())
+                .select_from(SystemClaim)
+                .join(other, and_(
+                    other.system_id == SystemClaim.system_id,
+                    other.id != SystemClaim.id,
+                    other.claimed_at < SystemClaim.released_at,
+                    SystemClaim.claimed_at < other.released_at
+                ))
+                .where(SystemClaim.organization_id == organization_id)
+            )).scalar()
+    finally:
+        await teardown(organization_id, user_id, system_ids)
+
+    attempts = len(latencies) + conflicts
+    print(f"mode={mode} systems={systems} workers={workers} duration={elapsed:.1f}s hold={hold * 1000:.0f}ms")
+    print(f"  claims/sec      {len(latencies) / elapsed:10.1f}")
+    print(f"  conflict rate   {conflicts / attempts * 100 if attempts else 0:9.1f}%")
+    print(f"  latency p50     {percentile(latencies, 50) * 1000:8.2f} ms")
+    print(f"  latency p99     {percentile(latencies, 99) * 1000:8.2f} ms")
+    print(f"  open claims left {open_claims}, overlapping claims {overlaps} "
+          f"({'OK' if open_claims == 0 and overlaps == 0 else 'DOUBLE CLAIM DETECTED'})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--systems", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--hold", type=float, default=0.005, help="seconds a claim is held")
+    parser.add_argument("--mode", choices=["specific", "any"], default="specific",
+                        help="claim a random specific system, or any free one (SKIP LOCKED)")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.systems, args.workers, args.duration, args.hold, args.mode))
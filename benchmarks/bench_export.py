@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark: claim history export throughput and memory.
+
+Seeds N claims (prefixed "bench-"), exports them once and reports rows per
+second and the process's peak RSS. Run each mode in its own process -
+peak RSS only ever grows:
+
+    stream  server-side cursor, sync engine (export_claims.py)
+    async   server-side cursor, async engine (the HTTP endpoint)
+    naive   one .all() over the same query, for comparison
+
+Needs DATABASE_URL with migrations applied.
+
+    python benchmarks/bench_export.py --claims 500000 --mode stream
+    python benchmarks/bench_export.py --claims 500000 --mode naive
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.db.partitions import ensure_claim_partitions
+from app.db.session import async_engine, engine
+from app.exports import claim_history_query, format_batch, format_header, iter_claim_batches, stream_claim_history
+
+SEED = [
+    "INSERT INTO organizations (id, name) VALUES (gen_random_uuid(), 'bench-export-org')",
+    """
+    INSERT INTO users (id, first_name, last_name, email, organization_id)
+    SELECT gen_random_uuid(), 'Bench', 'Exporter' || g, 'bench-export-' || g || '@example.com', o.id
+    FROM generate_series(1, 100) g, organizations o WHERE o.name = 'bench-export-org'
+    """,
+    """
+    INSERT INTO systems (id, name, status, organization_id)
+    SELECT gen_random_uuid(), 'bench-export-' || g, 'FREE', o.id
+    FROM generate_series(1, 500) g, organizations o WHERE o.name = 'bench-export-org'
+    """,
+    """
+    INSERT INTO system_claims (id, organization_id, system_id, claimed_by_user_id, claimed_at, released_at, notes)
+    SELECT gen_random_uuid(), s.organization_id, s.id, u.id,
+           now() - make_interval(mins => g * 5),
+           now() - make_interval(mins => g * 5) + interval '3 minutes',
+           'bench export claim ' || g
+    FROM generate_series(1, :claims) g
+    JOIN (SELECT id, organization_id, row_number() OVER () AS n FROM systems WHERE name LIKE 'bench-export-%') s
+      ON s.n = 1 + g % 500
+    JOIN (SELECT id, row_number() OVER () AS n FROM users WHERE email LIKE 'bench-export-%') u
+      ON u.n = 1 + g % 100
+    """,
+]
+
+TEARDOWN = [
+    """
+    DELETE FROM system_claims WHERE organization_id IN
+        (SELECT id FROM organizations WHERE name = 'bench-export-org')
+    """,
+    "DELETE FROM systems WHERE name LIKE 'bench-export-%'",
+    "DELETE FROM users WHERE email LIKE 'bench-export-%'",
+    "DELETE FROM organizations WHERE name = 'bench-export-org'",
+]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_statements(statements, **params) -> None:
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement), params)
+
+
+def export_stream(query, export_format: str, batch_size: int, sink) -> int:
+    rows = 0
+    with engine.connect() as connection:
+        sink(format_header(export_format))
+        for batch in iter_claim_batches(connection, query, batch_size):
+            sink(format_batch(export_format, batch))
+            rows += len(batch)
+    return rows
+
+
+def export_async(query, export_format: str, batch_size: int, sink) -> int:
+    lines = 0
+
+    async def consume() -> None:
+        nonlocal lines
+        async for chunk in stream_claim_history(async_engine, query, export_format, batch_size):
+            sink(chunk)
+            lines += chunk.count("\n")
+        await async_engine.dispose()
+
+    asyncio.run(consume())
+    # One line per row (seeded notes have no newlines), plus the CSV header
+    return lines - (1 if export_format == "csv" else 0)
+
+
+def export_naive(query, export_format: str, batch_size: int, sink) -> int:
+    with engine.connect() as connection:
+        rows = connection.execute(query).all()
+    sink(format_header(export_format))
+    sink(format_batch(export_format, rows))
+    return len(rows)
+
+
+MODES = {"stream": export_stream, "async": export_async, "naive": export_naive}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--claims", type=int, default=200_000)
+    parser.add_argument("--mode", choices=sorted(MODES), default="stream")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    run_statements(TEARDOWN)
+    with engine.begin() as connection:
+        # One claim every 5 minutes going back - older months need partitions
+        ensure_claim_partitions(connection, start=datetime.now(timezone.utc) - timedelta(minutes=5 * args.claims))
+    run_statements(SEED, claims=args.claims)
+    try:
+        with engine.connect() as connection:
+            organization_id = connection.execute(
+                text("SELECT id FROM organizations WHERE name = 'bench-export-org'")
+            ).scalar()
+        query = claim_history_query(organization_id=organization_id)
+
+        written = 0
+
+        def sink(chunk: str) -> None:
+            # Discard the output, only count it - we measure the reader, not the disk
+            nonlocal written
+            written += len(chunk)
+
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+        rows = MODES[args.mode](query, args.format, args.batch_size, sink)
+        elapsed = time.perf_counter() - start
+        peak = peak_rss_mb()
+    finally:
+        run_statements(TEARDOWN)
+
+    print(f"mode={args.mode} format={args.format} claims={rows} batch={args.batch_size}")
+    print(f"  rows/sec        {rows / elapsed:12.0f}")
+    print(f"  output          {written / 1024 / 1024:10.1f} MB in {elapsed:.2f}s")
+    print(f"  peak RSS        {peak:10.1f} MB (+{peak - baseline:.1f} MB during export)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: request logging cost on the request path, print vs queued.
+
+Logs N request records to a sink that stalls --stall-ms on every write
+(a slow terminal, a full pipe, a blocked log shipper) - once with a
+synchronous print per record like the old middleware, once through
+app/request_log.py. Reports the time each logging call holds the caller
+(the event loop, in the app), and what the queued logger wrote, dropped
+or buffered. No database needed.
+
+    python benchmarks/bench_request_log.py --records 20000 --stall-ms 1
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.request_log import RequestLog
+
+
+class StallingSink(io.StringIO):
+    def __init__(self, stall: float):
+        super().__init__()
+        self.stall = stall
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        time.sleep(self.stall)
+        self.writes += 1
+        return super().write(text)
+
+
+def record(i: int) -> dict:
+    return {
+        "ts": round(time.time(), 3),
+        "event": "request",
+        "method": "GET",
+        "route": "/api/systems/{system_id}/next-free",
+        "status": 200,
+        "duration_ms": 3.1,
+        "user_id": f"00000000-0000-0000-0000-{i:012d}"
+    }
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def timed_calls(log_one, count: int, interval: float):
+    """ Per-call latency of `log_one`, called every `interval` seconds like a request stream """
+
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        log_one(i)
+        latencies.append(time.perf_counter() - start)
+        if interval:
+            time.sleep(interval)
+    return latencies
+
+
+def report(name: str, latencies) -> None:
+    print(f"  {name:<8} mean {sum(latencies) / len(latencies) * 1e6:9.1f} µs   "
+          f"p99 {percentile(latencies, 99) * 1e6:9.1f} µs   max {max(latencies) * 1e6:9.1f} µs")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--stall-ms", type=float, default=1.0, help="sink delay per write")
+    parser.add_argument("--interval-us", type=float, default=0.0, help="gap between requests")
+    parser.add_argument("--buffer", type=int, default=10_000)
+    args = parser.parse_args()
+    stall, interval = args.stall_ms / 1000, args.interval_us / 1e6
+
+    print(f"records={args.records} stall={args.stall_ms}ms/write buffer={args.buffer}")
+
+    sink = StallingSink(stall)
+    count = min(args.records, max(100, int(2 / max(stall, 1e-6))))  # print is slow - cap at ~2s of stalls
+    report("print", timed_calls(lambda i: print(json.dumps(record(i)), file=sink), count, interval))
+
+    sink = StallingSink(stall)
+    log = RequestLog(sink=sink, buffer=args.buffer)
+    report("queued", timed_calls(lambda i: log.emit(record(i)), args.records, interval))
+    log.stop(timeout=60)
+    stats = log.stats()
+    print(f"  queued: written {stats['written']} in {sink.writes} writes, dropped {stats['dropped']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: reservation conflict checks, index vs linear scan.
+
+Fills one SystemSchedule with N back-to-back-ish reservations (random gaps)
+and times random overlap checks and "next free slot" queries against it,
+next to the O(n) scan over the same reservations a per-request check would
+do. No database needed.
+
+    python benchmarks/bench_reservations.py --reservations 1000 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.reservations import SystemSchedule
+
+
+def build(count: int):
+    schedule = SystemSchedule()
+    windows = []
+    start = datetime.now(timezone.utc) + timedelta(days=1)
+    for _ in range(count):
+        start += timedelta(minutes=random.randint(0, 120))
+        end = start + timedelta(minutes=random.randint(30, 240))
+        schedule.add(uuid.uuid4(), start, end)
+        windows.append((start, end))
+        start = end
+    return schedule, windows
+
+
+def scan(windows, start, end) -> bool:
+    return any(s < end and start < e for s, e in windows)
+
+
+def timed(operation, probes) -> float:
+    started = time.perf_counter()
+    for probe in probes:
+        operation(*probe)
+    return (time.perf_counter() - started) / len(probes) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reservations", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--probes", type=int, default=2_000)
+    args = parser.parse_args()
+
+    print(f"{'reservations':>12} {'index check':>12} {'scan check':>12} {'next free':>12}  (µs per query)")
+    for count in args.reservations:
+        schedule, windows = build(count)
+        first, last = windows[0][0], windows[-1][1]
+        probes = []
+        for _ in range(args.probes):
+            start = first + (last - first) * random.random()
+            probes.append((start, start + timedelta(minutes=random.randint(15, 180))))
+
+        index_us = timed(schedule.conflict, probes)
+        scan_us = timed(lambda start, end: scan(windows, start, end), probes[:max(1, args.probes // 20)])
+        free_us = timed(lambda start, end: schedule.next_free(start, end - start), probes)
+        print(f"{count:>12} {index_us:>12.2f} {scan_us:>12.1f} {free_us:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark: blocking acquire fairness and wake-up latency.
+
+Every system of a small pool starts out claimed, then W clients queue on
+POST /api/acquire and long-poll until granted. A releaser frees one held system every
+--interval seconds; each grant is released again after --hold seconds,
+until every waiter has been served.
+
+Reports FIFO inversions (a waiter granted before one queued earlier) and the
+wake-up latency from a release committing to the next waiter's long poll
+returning with that system. Runs the real app in-process, dispatcher and
+NOTIFY listener included.
+
+Creates its own organization, user and systems (prefixed "bench-") and
+removes them afterwards. Needs DATABASE_URL with migrations applied.
+
+    python benchmarks/bench_waitlist.py --systems 4 --waiters 500
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import delete, func, select
+
+from app.auth import get_current_active_user
+from app.claims import claim_system, release_system
+from app.db.session import AsyncSessionLocal
+from app.db.db_models import Organization, System, SystemClaim, SystemWaiter, User
+from app.db.db_models.system import SystemStatus
+from app.main import app, lifespan
+from app.principal_cache import UserSnapshot
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def setup(systems: int):
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        organization = Organization(id=uuid.uuid4(), name=f"bench-org-{tag}")
+        user = User(id=uuid.uuid4(), first_name="Bench", last_name="Waiter",
+                    email=f"bench-{tag}@example.com", organization_id=organization.id)
+        pool = [System(id=uuid.uuid4(), name=f"bench-{tag}-{i:03d}", status=SystemStatus.FREE,
+                       organization_id=organization.id) for i in range(systems)]
+        db.add(organization)
+        await db.flush()
+        db.add(user)
+        db.add_all(pool)
+        await db.commit()
+
+    # Nothing free: every waiter has to queue
+    for system in pool:
+        async with AsyncSessionLocal() as db:
+            await claim_system(db, system.id, user.id)
+
+    snapshot = UserSnapshot(
+        id=user.id, email=user.email, first_name=user.first_name, last_name=user.last_name,
+        organization_id=organization.id, is_active=True, is_admin=False, last_login=None, avatar_url=None
+    )
+    return snapshot, [system.id for system in pool]
+
+
+async def teardown(organization_id, user_id, system_ids) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(SystemWaiter).where(SystemWaiter.organization_id == organization_id))
+        await db.execute(delete(SystemClaim).where(SystemClaim.organization_id == organization_id))
+        await db.execute(delete(System).where(System.id.in_(system_ids)))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.execute(delete(Organization).where(Organization.id == organization_id))
+        await db.commit()
+
+
+async def run(systems: int, waiters: int, interval: float, hold: float, poll: float) -> None:
+    user, system_ids = await setup(systems)
+    app.dependency_overrides[get_current_active_user] = lambda: user
+
+    held = asyncio.Queue()
+    for system_id in system_ids:
+        held.put_nowait(system_id)
+    released_at = {}
+    wakeups = []
+    polls = 0
+
+    async def waiter(client):
+        nonlocal polls
+        body = {"timeout": poll}
+        while True:
+            response = await client.post("/api/acquire", json=body)
+            polls += 1
+            result = response.json()
+            if response.status_code == 200:
+                break
+            response.raise_for_status()
+            body["waiter_id"] = result["waiter_id"]
+
+        system_id = uuid.UUID(result["system_id"])
+        wakeups.append(time.perf_counter() - released_at.pop(system_id))
+        await asyncio.sleep(hold)
+        held.put_nowait(system_id)
+
+    async def releaser():
+        for _ in range(waiters):
+            system_id = await held.get()
+            await asyncio.sleep(interval)
+            async with AsyncSessionLocal() as db:
+                released_at[system_id] = time.perf_counter()
+                await release_system(db, system_id, user.id)
+
+    try:
+        async with lifespan(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                # Line everyone up before anything is released
+                tasks = [asyncio.create_task(waiter(client)) for _ in range(waiters)]
+                queued = 0
+                while queued < waiters:
+                    await asyncio.sleep(0.05)
+                    async with AsyncSessionLocal() as db:
+                        queued = await db.scalar(
+                            select(func.count()).select_from(SystemWaiter)
+                            .where(SystemWaiter.organization_id == user.organization_id)
+                        )
+
+                start = time.perf_counter()
+                await asyncio.gather(releaser(), *tasks)
+                elapsed = time.perf_counter() - start
+
+        async with AsyncSessionLocal() as db:
+            grants = (await db.execute(
+                select(SystemWaiter.position)
+                .where(SystemWaiter.organization_id == user.organization_id)
+                .order_by(SystemWaiter.granted_at)
+            )).scalars().all()
+    finally:
+        app.dependency_overrides.pop(get_current_active_user, None)
+        await teardown(user.organization_id, user.id, system_ids)
+
+    inversions = sum(1 for earlier, later in zip(grants, grants[1:]) if later < earlier)
+    print(f"systems={systems} waiters={waiters} interval={interval * 1000:.0f}ms hold={hold * 1000:.0f}ms "
+          f"poll={poll:.0f}s duration={elapsed:.1f}s")
+    print(f"  grants/sec       {len(grants) / elapsed:10.1f}")
+    print(f"  long polls       {polls:10d}")
+    print(f"  wake-up p50      {percentile(wakeups, 50) * 1000:8.2f} ms")
+    print(f"  wake-up p95      {percentile(wakeups, 95) * 1000:8.2f} ms")
+    print(f"  wake-up max      {max(wakeups) * 1000:8.2f} ms")
+    print(f"  FIFO inversions  {inversions:10d} ({'OK' if inversions == 0 else 'UNFAIR'})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--systems", type=int, default=4)
+    parser.add_argument("--waiters", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds between releases")
+    parser.add_argument("--hold", type=float, default=0.0, help="seconds a granted system is held")
+    parser.add_argument("--poll", type=float, default=10.0, help="long-poll timeout per request")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.systems, args.waiters, args.interval, args.hold, args.poll))
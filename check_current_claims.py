@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Check (and optionally repair) the current-holder pointer on systems against
+the open claims in system_claims.
+
+    python check_current_claims.py            # report only
+    python check_current_claims.py --repair   # rewrite drifted systems
+"""
+
+import argparse
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.db.session import SessionLocal
+from app.claims import check_current_claims, repair_current_claims
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Reconcile systems.current_* with open claims")
+    parser.add_argument("--repair", action="store_true", help="fix inconsistent systems")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        inconsistent = check_current_claims(db)
+        if not inconsistent:
+            print("✓ All systems are consistent with their open claims")
+            return 0
+
+        print(f"Found {len(inconsistent)} inconsistent systems:")
+        for system_id, name, pointer, open_claim, open_claims in inconsistent:
+            duplicates = f" ({open_claims} open claims)" if open_claims > 1 else ""
+            print(f" - {name}: pointer {pointer or 'none'}, open claim {open_claim or 'none'}{duplicates}")
+
+        if not args.repair:
+            print("Run with --repair to fix them.")
+            return 1
+
+        fixed = repair_current_claims(db)
+        print(f"✓ Repaired {fixed} systems")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
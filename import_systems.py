@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Bulk import systems from an inventory CSV (name,status,department,notes).
+
+Rows are validated while the file is streamed, COPY'd into a staging table
+and upserted on name in one transaction. Replaces add_systems.py for
+anything beyond a handful of systems.
+
+    python import_systems.py fleet.csv
+    python import_systems.py fleet.csv --organization <uuid>
+    python import_systems.py fleet.csv --dry-run
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select
+
+from app.db.session import engine
+from app.db.db_models import Organization
+from app.system_import import import_systems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk import systems from a CSV file")
+    parser.add_argument("csv_file", help="inventory CSV with a header row")
+    parser.add_argument("--organization", type=uuid.UUID,
+                        help="organization id (default: the first organization)")
+    parser.add_argument("--dry-run", action="store_true", help="validate and count, then roll back")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        organization_id = args.organization or connection.execute(select(Organization.id).limit(1)).scalar()
+        if organization_id is None:
+            print("Create an organization.")
+            return 1
+
+        with open(args.csv_file, newline="", encoding="utf-8-sig") as source:
+            try:
+                result = import_systems(connection, source, organization_id)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return 1
+
+        if args.dry_run:
+            connection.rollback()
+        else:
+            connection.commit()
+
+    elapsed = time.perf_counter() - start
+    print(f"{'Dry run: ' if args.dry_run else ''}"
+          f"{result.inserted} inserted, {result.updated} updated, "
+          f"{result.unchanged} unchanged, {result.rejected} rejected in {elapsed:.1f}s")
+    for error in result.errors:
+        print(f" - {error}")
+    if result.rejected > len(result.errors):
+        print(f" ... and {result.rejected - len(result.errors)} more")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
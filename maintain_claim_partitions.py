@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Maintain the monthly system_claims partitions. Run daily from cron.
+
+    python maintain_claim_partitions.py                  # create future partitions
+    python maintain_claim_partitions.py --archive        # + archive expired ones
+    python maintain_claim_partitions.py --archive --dry-run
+    python maintain_claim_partitions.py --list
+
+Archiving detaches partitions older than CLAIM_RETENTION_MONTHS, writes
+each to <archive dir>/system_claims_YYYY_MM.csv.gz and drops it.
+"""
+
+import argparse
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+
+from app.db.partitions import (
+    CLAIM_ARCHIVE_DIR,
+    CLAIM_PARTITIONS_AHEAD,
+    CLAIM_RETENTION_MONTHS,
+    archive_expired_partitions,
+    attached_partitions,
+    ensure_claim_partitions
+)
+from app.db.session import engine
+
+
+def list_partitions() -> None:
+    with engine.connect() as connection:
+        for name in sorted(attached_partitions(connection)):
+            rows = connection.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+            print(f" - {name}: {rows} claims")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Create and archive system_claims partitions")
+    parser.add_argument("--months-ahead", type=int, default=CLAIM_PARTITIONS_AHEAD)
+    parser.add_argument("--archive", action="store_true", help="archive partitions past retention")
+    parser.add_argument("--retention-months", type=int, default=CLAIM_RETENTION_MONTHS)
+    parser.add_argument("--archive-dir", default=CLAIM_ARCHIVE_DIR)
+    parser.add_argument("--dry-run", action="store_true", help="report what would be archived")
+    parser.add_argument("--list", action="store_true", help="list partitions and row counts")
+    args = parser.parse_args()
+
+    if args.list:
+        list_partitions()
+        return 0
+
+    with engine.begin() as connection:
+        created = ensure_claim_partitions(connection, months_ahead=args.months_ahead)
+    print(f"✓ Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+
+    if args.archive:
+        reports = archive_expired_partitions(
+            engine,
+            retention_months=args.retention_months,
+            archive_dir=args.archive_dir,
+            dry_run=args.dry_run
+        )
+        if not reports:
+            print(f"✓ Nothing older than {args.retention_months} months")
+        for report in reports:
+            if report["action"] == "archived":
+                print(f"✓ Archived {report['partition']}: {report['rows']} claims -> {report['path']}")
+            elif report["action"] == "skipped":
+                print(f"⚠ Kept {report['partition']}: {report['open_claims']} claims still open")
+            else:
+                print(f" - Would archive {report['partition']}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
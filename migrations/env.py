@@ -0,0 +1,54 @@
+# migrations/env.py
+
+"""
+Alembic environment.
+
+Uses the application's engine settings (DATABASE_URL from .env) and the ORM
+metadata, so autogenerate compares against app/db/db_models.
+"""
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.db.partitions import PARTITION_NAME
+from app.db.session import DATABASE_URL, Base
+import app.db.db_models  # noqa: F401 - registers every model on Base.metadata
+
+target_metadata = Base.metadata
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """ Leave the monthly system_claims partitions out of autogenerate """
+
+    return not (type_ == "table" and PARTITION_NAME.match(name or ""))
+
+
+def run_migrations_offline() -> None:
+    """ Emit SQL to stdout instead of running it (alembic upgrade --sql) """
+
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(DATABASE_URL, poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name)
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,57 @@
+"""claim and foreign key indexes
+
+Indexes every foreign key used for lookups and joins, the claimed_at DESC
+order of the activity feed, and a partial unique index that allows only one
+active (released_at IS NULL) claim per system.
+
+Indexes are built CONCURRENTLY so the tables stay writable during the
+upgrade. If the unique index fails, a system has more than one open claim;
+release the duplicates and run the upgrade again.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:37:00.114087
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns) for plain foreign key indexes
+FK_INDEXES = [
+    ('ix_department_memberships_department_id', 'department_memberships', ['department_id']),
+    ('ix_department_memberships_user_id', 'department_memberships', ['user_id']),
+    ('ix_system_claims_claimed_by_user_id', 'system_claims', ['claimed_by_user_id']),
+    ('ix_system_claims_organization_id', 'system_claims', ['organization_id']),
+    ('ix_system_claims_system_id', 'system_claims', ['system_id']),
+    ('ix_systems_department_id', 'systems', ['department_id']),
+    ('ix_systems_organization_id', 'systems', ['organization_id']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in FK_INDEXES:
+            op.create_index(name, table, columns, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+        op.create_index('ix_system_claims_claimed_at_desc', 'system_claims',
+                        [sa.literal_column('claimed_at DESC')], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('uq_system_claims_active_system', 'system_claims',
+                        ['system_id'], unique=True,
+                        postgresql_where=sa.text('released_at IS NULL'),
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_system_claims_active_system', table_name='system_claims')
+    op.drop_index('ix_system_claims_claimed_at_desc', table_name='system_claims')
+    for name, table, _ in reversed(FK_INDEXES):
+        op.drop_index(name, table_name=table)
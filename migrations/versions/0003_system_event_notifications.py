@@ -0,0 +1,70 @@
+"""system event notifications
+
+Triggers that publish claim and system status changes on the
+"system_events" channel (pg_notify), consumed by app/events.py to push
+Server-Sent Events to browsers. Payloads carry ids and state only, well
+below the 8000 byte NOTIFY limit; notifications are delivered on commit.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:05:00.000000
+"""
+
+from alembic import op
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_system_claim_event() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('system_events', json_build_object(
+                'type', 'claim',
+                'op', lower(TG_OP),
+                'claim_id', NEW.id,
+                'system_id', NEW.system_id,
+                'user_id', NEW.claimed_by_user_id,
+                'claimed_at', NEW.claimed_at,
+                'released_at', NEW.released_at
+            )::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_system_status_event() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('system_events', json_build_object(
+                'type', 'system',
+                'system_id', NEW.id,
+                'name', NEW.name,
+                'status', lower(NEW.status::text)
+            )::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER system_claims_notify
+        AFTER INSERT OR UPDATE OF released_at ON system_claims
+        FOR EACH ROW EXECUTE FUNCTION notify_system_claim_event()
+    """)
+    op.execute("""
+        CREATE TRIGGER systems_status_notify
+        AFTER UPDATE OF status ON systems
+        FOR EACH ROW
+        WHEN (OLD.status IS DISTINCT FROM NEW.status)
+        EXECUTE FUNCTION notify_system_status_event()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS systems_status_notify ON systems")
+    op.execute("DROP TRIGGER IF EXISTS system_claims_notify ON system_claims")
+    op.execute("DROP FUNCTION IF EXISTS notify_system_status_event()")
+    op.execute("DROP FUNCTION IF EXISTS notify_system_claim_event()")
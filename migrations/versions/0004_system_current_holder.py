@@ -0,0 +1,47 @@
+"""system current holder
+
+Denormalized pointer to the open claim on each system (claim id, holder,
+claimed at), so "who has it" is a column read instead of a scan of
+system_claims. Backfilled from the open claims; kept in sync by
+app/claims.py, checked/repaired with check_current_claims.py.
+
+current_claim_id deliberately has no foreign key: system_claims is
+append-only history and may be partitioned.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 11:20:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('systems', sa.Column('current_claim_id', sa.UUID(), nullable=True))
+    op.add_column('systems', sa.Column('current_holder_id', sa.UUID(), nullable=True))
+    op.add_column('systems', sa.Column('current_claimed_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_foreign_key('systems_current_holder_id_fkey', 'systems', 'users',
+                          ['current_holder_id'], ['id'])
+
+    op.execute("""
+        UPDATE systems s
+        SET current_claim_id = c.id,
+            current_holder_id = c.claimed_by_user_id,
+            current_claimed_at = c.claimed_at
+        FROM system_claims c
+        WHERE c.system_id = s.id AND c.released_at IS NULL
+    """)
+
+
+def downgrade() -> None:
+    op.drop_constraint('systems_current_holder_id_fkey', 'systems', type_='foreignkey')
+    op.drop_column('systems', 'current_claimed_at')
+    op.drop_column('systems', 'current_holder_id')
+    op.drop_column('systems', 'current_claim_id')
@@ -0,0 +1,67 @@
+"""data versions
+
+Per-domain change counters used as cache versions by the HTMX fragment
+cache (app/fragment_cache.py). Statement-level triggers on systems and
+system_claims bump a counter in the writing transaction, so a version is
+visible exactly when the change it stands for is committed. Each domain has
+DATA_VERSION_SHARDS rows and a writer bumps the one for its backend pid,
+so concurrent claims do not queue on a single hot row.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 11:40:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+SHARDS = 16
+DOMAINS = {
+    'systems': 'systems',
+    'claims': 'system_claims',
+    'departments': 'departments',
+}
+
+
+def upgrade() -> None:
+    op.create_table('data_versions',
+    sa.Column('domain', sa.String(length=50), nullable=False),
+    sa.Column('shard', sa.SmallInteger(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('domain', 'shard')
+    )
+    for domain in DOMAINS:
+        op.execute(f"""
+            INSERT INTO data_versions (domain, shard, version)
+            SELECT '{domain}', g, 0 FROM generate_series(0, {SHARDS - 1}) g
+        """)
+
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE data_versions
+            SET version = version + 1
+            WHERE domain = TG_ARGV[0] AND shard = pg_backend_pid() % {SHARDS};
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for domain, table in DOMAINS.items():
+        op.execute(f"""
+            CREATE TRIGGER {table}_bump_data_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('{domain}')
+        """)
+
+
+def downgrade() -> None:
+    for table in DOMAINS.values():
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_bump_data_version ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_data_version()")
+    op.drop_table('data_versions')
@@ -0,0 +1,141 @@
+"""partition system_claims by month
+
+Rebuilds system_claims as a RANGE (claimed_at) partitioned table with one
+partition per month, from the oldest existing claim through three months
+ahead, and copies the history across. app/db/partitions.py creates future
+months and archives expired ones from then on.
+
+The partition key must be part of every unique index, so:
+    - the primary key becomes (id, claimed_at)
+    - uq_system_claims_active_system (one open claim per system) becomes the
+      non-unique ix_system_claims_open_system. Exclusivity is still enforced
+      by the conditional UPDATE on systems in app/claims.py.
+
+Takes an ACCESS EXCLUSIVE lock on system_claims for the copy - run it in a
+maintenance window on large histories.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 12:10:00.000000
+"""
+
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+INDEXES = [
+    ('ix_system_claims_claimed_by_user_id', ['claimed_by_user_id']),
+    ('ix_system_claims_organization_id', ['organization_id']),
+    ('ix_system_claims_system_id', ['system_id']),
+]
+
+COLUMNS = "id, notes, organization_id, system_id, claimed_by_user_id, claimed_at, released_at"
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _claims_table(name: str, primary_key: sa.PrimaryKeyConstraint, **kwargs) -> None:
+    op.create_table(name,
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('organization_id', sa.UUID(), nullable=False),
+    sa.Column('system_id', sa.UUID(), nullable=False),
+    sa.Column('claimed_by_user_id', sa.UUID(), nullable=False),
+    sa.Column('claimed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('released_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['claimed_by_user_id'], ['users.id'], name=f'{name}_claimed_by_user_id_fkey'),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], name=f'{name}_organization_id_fkey'),
+    sa.ForeignKeyConstraint(['system_id'], ['systems.id'], name=f'{name}_system_id_fkey'),
+    primary_key,
+    **kwargs
+    )
+
+
+def _create_indexes(table: str) -> None:
+    for name, columns in INDEXES:
+        op.create_index(name, table, columns)
+    op.create_index('ix_system_claims_claimed_at_desc', table, [sa.text('claimed_at DESC')])
+
+
+def _create_triggers(table: str) -> None:
+    # Same triggers as migrations 0003 and 0005, on the new table
+    op.execute(f"""
+        CREATE TRIGGER system_claims_notify
+        AFTER INSERT OR UPDATE OF released_at ON {table}
+        FOR EACH ROW EXECUTE FUNCTION notify_system_claim_event()
+    """)
+    op.execute(f"""
+        CREATE TRIGGER system_claims_bump_data_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('claims')
+    """)
+
+
+def _retire_old_table() -> None:
+    """ Rename system_claims out of the way, freeing its index/constraint names """
+
+    op.execute("LOCK TABLE system_claims IN ACCESS EXCLUSIVE MODE")
+    op.execute("ALTER TABLE system_claims RENAME TO system_claims_old")
+    op.execute("DROP TRIGGER IF EXISTS system_claims_notify ON system_claims_old")
+    op.execute("DROP TRIGGER IF EXISTS system_claims_bump_data_version ON system_claims_old")
+    for name, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute("DROP INDEX IF EXISTS ix_system_claims_claimed_at_desc")
+    op.execute("DROP INDEX IF EXISTS uq_system_claims_active_system")
+    op.execute("DROP INDEX IF EXISTS ix_system_claims_open_system")
+    op.execute("ALTER TABLE system_claims_old RENAME CONSTRAINT system_claims_pkey TO system_claims_old_pkey")
+
+
+def upgrade() -> None:
+    _retire_old_table()
+
+    _claims_table('system_claims',
+        sa.PrimaryKeyConstraint('id', 'claimed_at', name='system_claims_pkey'),
+        postgresql_partition_by='RANGE (claimed_at)'
+    )
+
+    oldest = op.get_bind().execute(sa.text("SELECT min(claimed_at) FROM system_claims_old")).scalar()
+    now = datetime.now(timezone.utc)
+    month = date(*(oldest or now).astimezone(timezone.utc).timetuple()[:2], 1)
+    last = _add_months(date(now.year, now.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE system_claims_{month.year:04d}_{month.month:02d} PARTITION OF system_claims "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+            f"TO ('{_add_months(month, 1).isoformat()} 00:00:00+00')"
+        )
+        month = _add_months(month, 1)
+
+    op.execute(f"INSERT INTO system_claims ({COLUMNS}) SELECT {COLUMNS} FROM system_claims_old")
+    op.drop_table('system_claims_old')
+
+    _create_indexes('system_claims')
+    op.create_index('ix_system_claims_open_system', 'system_claims', ['system_id'],
+                    postgresql_where=sa.text('released_at IS NULL'))
+    _create_triggers('system_claims')
+
+
+def downgrade() -> None:
+    # Archived (dropped) partitions are not restored
+    _retire_old_table()
+
+    _claims_table('system_claims', sa.PrimaryKeyConstraint('id', name='system_claims_pkey'))
+    op.execute(f"INSERT INTO system_claims ({COLUMNS}) SELECT {COLUMNS} FROM system_claims_old")
+    op.drop_table('system_claims_old')
+
+    _create_indexes('system_claims')
+    op.create_index('uq_system_claims_active_system', 'system_claims', ['system_id'], unique=True,
+                    postgresql_where=sa.text('released_at IS NULL'))
+    _create_triggers('system_claims')
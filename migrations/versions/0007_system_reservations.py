@@ -0,0 +1,104 @@
+"""system reservations
+
+Future bookings of a system. Active reservations of one system may not
+overlap, enforced by an exclusion constraint:
+
+    EXCLUDE USING gist (uuidrange(system_id, system_id, '[]') WITH =,
+                        tstzrange(starts_at, ends_at) WITH &&)
+    WHERE (cancelled_at IS NULL)
+
+GiST has no uuid equality without the btree_gist extension, which is not
+available on every Postgres build, so system_id is compared as a
+single-value range of the uuidrange type created here.
+
+Changes are published on the "system_events" channel (type "reservation")
+so every worker's in-memory reservation index (app/reservations.py) stays
+current.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 13:20:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE TYPE uuidrange AS RANGE (subtype = uuid)")
+
+    op.create_table('system_reservations',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('organization_id', sa.UUID(), nullable=False),
+    sa.Column('system_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('starts_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('ends_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('cancelled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.CheckConstraint('ends_at > starts_at', name='ck_system_reservations_window'),
+    postgresql.ExcludeConstraint(
+        (sa.text("uuidrange(system_id, system_id, '[]')"), '='),
+        (sa.text('tstzrange(starts_at, ends_at)'), '&&'),
+        name='ex_system_reservations_overlap',
+        using='gist',
+        where=sa.text('cancelled_at IS NULL')
+    ),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.ForeignKeyConstraint(['system_id'], ['systems.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_system_reservations_organization_id'), 'system_reservations', ['organization_id'], unique=False)
+    op.create_index(op.f('ix_system_reservations_user_id'), 'system_reservations', ['user_id'], unique=False)
+    op.create_index('ix_system_reservations_active_ends_at', 'system_reservations', ['ends_at'], unique=False,
+                    postgresql_where=sa.text('cancelled_at IS NULL'))
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_system_reservation_event() RETURNS trigger AS $$
+        DECLARE
+            reservation system_reservations;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                reservation := OLD;
+            ELSE
+                reservation := NEW;
+            END IF;
+            PERFORM pg_notify('system_events', json_build_object(
+                'type', 'reservation',
+                'op', lower(TG_OP),
+                'reservation_id', reservation.id,
+                'system_id', reservation.system_id,
+                'user_id', reservation.user_id,
+                'starts_at', reservation.starts_at,
+                'ends_at', reservation.ends_at,
+                'cancelled_at', reservation.cancelled_at
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER system_reservations_notify
+        AFTER INSERT OR UPDATE OR DELETE ON system_reservations
+        FOR EACH ROW EXECUTE FUNCTION notify_system_reservation_event()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS system_reservations_notify ON system_reservations")
+    op.execute("DROP FUNCTION IF EXISTS notify_system_reservation_event()")
+    op.drop_index('ix_system_reservations_active_ends_at', table_name='system_reservations',
+                  postgresql_where=sa.text('cancelled_at IS NULL'))
+    op.drop_index(op.f('ix_system_reservations_user_id'), table_name='system_reservations')
+    op.drop_index(op.f('ix_system_reservations_organization_id'), table_name='system_reservations')
+    op.drop_table('system_reservations')
+    op.execute("DROP TYPE uuidrange")
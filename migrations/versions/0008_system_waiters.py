@@ -0,0 +1,82 @@
+"""system waiters
+
+Persistent FIFO waitlist behind the blocking acquire API (app/waitlist.py).
+A waiter row is the whole state of a queued request, so the queue survives
+worker restarts and a client can resume polling on any worker.
+
+Granting a waiter is published on the "system_events" channel (type
+"waiter"), which wakes the long-poll request wherever it is waiting.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 13:50:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('system_waiters',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('position', sa.BigInteger(), sa.Identity(always=True), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('organization_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('department_id', sa.UUID(), nullable=True),
+    sa.Column('system_id', sa.UUID(), nullable=True),
+    sa.Column('granted_claim_id', sa.UUID(), nullable=True),
+    sa.Column('granted_system_id', sa.UUID(), nullable=True),
+    sa.Column('granted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('cancelled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['department_id'], ['departments.id'], ),
+    sa.ForeignKeyConstraint(['granted_system_id'], ['systems.id'], ),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.ForeignKeyConstraint(['system_id'], ['systems.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('position')
+    )
+    op.create_index(op.f('ix_system_waiters_user_id'), 'system_waiters', ['user_id'], unique=False)
+    op.create_index('ix_system_waiters_waiting', 'system_waiters', ['organization_id', 'position'], unique=False,
+                    postgresql_where=sa.text('granted_at IS NULL AND cancelled_at IS NULL'))
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_system_waiter_event() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('system_events', json_build_object(
+                'type', 'waiter',
+                'waiter_id', NEW.id,
+                'user_id', NEW.user_id,
+                'system_id', NEW.granted_system_id,
+                'claim_id', NEW.granted_claim_id,
+                'granted_at', NEW.granted_at
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER system_waiters_notify
+        AFTER UPDATE OF granted_at ON system_waiters
+        FOR EACH ROW
+        WHEN (OLD.granted_at IS NULL AND NEW.granted_at IS NOT NULL)
+        EXECUTE FUNCTION notify_system_waiter_event()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS system_waiters_notify ON system_waiters")
+    op.execute("DROP FUNCTION IF EXISTS notify_system_waiter_event()")
+    op.drop_index('ix_system_waiters_waiting', table_name='system_waiters',
+                  postgresql_where=sa.text('granted_at IS NULL AND cancelled_at IS NULL'))
+    op.drop_index(op.f('ix_system_waiters_user_id'), table_name='system_waiters')
+    op.drop_table('system_waiters')
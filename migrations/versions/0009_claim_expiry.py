@@ -0,0 +1,60 @@
+"""claim expiry
+
+Adds system_claims.expires_at and its pointer copy systems.current_expires_at
+(partial index: the expiry scheduler in app/claim_expiry.py loads every
+claim with a deadline from it). Claims that are already open keep no
+expiry.
+
+The "claim" notification gains expires_at, so every worker's scheduler
+learns about new claims without querying.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 14:30:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def _notify_claim_function(*extra_fields: str) -> str:
+    fields = "".join(f",\n                '{field}', NEW.{field}" for field in extra_fields)
+    return f"""
+        CREATE OR REPLACE FUNCTION notify_system_claim_event() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('system_events', json_build_object(
+                'type', 'claim',
+                'op', lower(TG_OP),
+                'claim_id', NEW.id,
+                'system_id', NEW.system_id,
+                'user_id', NEW.claimed_by_user_id,
+                'claimed_at', NEW.claimed_at,
+                'released_at', NEW.released_at{fields}
+            )::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """
+
+
+def upgrade() -> None:
+    # On the partitioned parent, so every monthly partition gets the column
+    op.add_column('system_claims', sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('systems', sa.Column('current_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_systems_current_expires_at', 'systems', ['current_expires_at'], unique=False,
+                    postgresql_where=sa.text('current_expires_at IS NOT NULL'))
+    op.execute(_notify_claim_function('expires_at'))
+
+
+def downgrade() -> None:
+    op.execute(_notify_claim_function())
+    op.drop_index('ix_systems_current_expires_at', table_name='systems',
+                  postgresql_where=sa.text('current_expires_at IS NOT NULL'))
+    op.drop_column('systems', 'current_expires_at')
+    op.drop_column('system_claims', 'expires_at')
@@ -0,0 +1,40 @@
+"""users data version
+
+Adds a "users" domain to data_versions (migration 0005). Cached systems
+and activity fragments show holders' names, so renaming a user must
+change their key. Only the fields fragments render bump it - not the
+last_login that every login writes.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 09:00:00.000000
+"""
+
+from alembic import op
+
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+SHARDS = 16
+# User fields that cached fragments may render
+RENDERED_COLUMNS = ('first_name', 'last_name', 'email', 'avatar_url')
+
+
+def upgrade() -> None:
+    op.execute(f"""
+        INSERT INTO data_versions (domain, shard, version)
+        SELECT 'users', g, 0 FROM generate_series(0, {SHARDS - 1}) g
+    """)
+    op.execute(f"""
+        CREATE TRIGGER users_bump_data_version
+        AFTER INSERT OR UPDATE OF {', '.join(RENDERED_COLUMNS)} OR DELETE OR TRUNCATE ON users
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('users')
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS users_bump_data_version ON users")
+    op.execute("DELETE FROM data_versions WHERE domain = 'users'")
@@ -0,0 +1,105 @@
+"""event organization
+
+Adds organization_id to every "system_events" payload (claim, system,
+reservation and waiter notifications), so app/events.py can send each
+SSE client only its own organization's events.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-20 09:00:00.000000
+"""
+
+from alembic import op
+
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def _notify_functions(organization: bool) -> list:
+    def organization_field(row: str) -> str:
+        return f",\n                'organization_id', {row}.organization_id" if organization else ""
+
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION notify_system_claim_event() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('system_events', json_build_object(
+                'type', 'claim',
+                'op', lower(TG_OP),
+                'claim_id', NEW.id,
+                'system_id', NEW.system_id,
+                'user_id', NEW.claimed_by_user_id,
+                'claimed_at', NEW.claimed_at,
+                'released_at', NEW.released_at,
+                'expires_at', NEW.expires_at{organization_field('NEW')}
+            )::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION notify_system_status_event() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('system_events', json_build_object(
+                'type', 'system',
+                'system_id', NEW.id,
+                'name', NEW.name,
+                'status', lower(NEW.status::text){organization_field('NEW')}
+            )::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION notify_system_reservation_event() RETURNS trigger AS $$
+        DECLARE
+            reservation system_reservations;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                reservation := OLD;
+            ELSE
+                reservation := NEW;
+            END IF;
+            PERFORM pg_notify('system_events', json_build_object(
+                'type', 'reservation',
+                'op', lower(TG_OP),
+                'reservation_id', reservation.id,
+                'system_id', reservation.system_id,
+                'user_id', reservation.user_id,
+                'starts_at', reservation.starts_at,
+                'ends_at', reservation.ends_at,
+                'cancelled_at', reservation.cancelled_at{organization_field('reservation')}
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION notify_system_waiter_event() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('system_events', json_build_object(
+                'type', 'waiter',
+                'waiter_id', NEW.id,
+                'user_id', NEW.user_id,
+                'system_id', NEW.granted_system_id,
+                'claim_id', NEW.granted_claim_id,
+                'granted_at', NEW.granted_at{organization_field('NEW')}
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    ]
+
+
+def upgrade() -> None:
+    for function in _notify_functions(organization=True):
+        op.execute(function)
+
+
+def downgrade() -> None:
+    for function in _notify_functions(organization=False):
+        op.execute(function)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Bulk-provision users from a CSV (email,first_name,last_name,password[,is_admin]).
+
+Passwords are hashed in a process pool sized to the available cores and
+users are inserted in committed batches. Safe to rerun after a crash:
+users that already have a password are skipped, so finished hashing is
+never redone. Replaces add_users.py + add_passwords.py for real rosters.
+
+    python provision_users.py roster.csv
+    python provision_users.py roster.csv --organization <uuid> --workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select
+
+from app.db.session import engine
+from app.db.db_models import Organization
+from app.user_provisioning import PROVISION_BATCH_SIZE, available_cores, provision_users
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk-provision users with initial passwords")
+    parser.add_argument("csv_file", help="roster CSV with a header row")
+    parser.add_argument("--organization", type=uuid.UUID,
+                        help="organization id (default: the first organization)")
+    parser.add_argument("--workers", type=int, default=available_cores(),
+                        help="hashing processes (default: available cores)")
+    parser.add_argument("--batch-size", type=int, default=PROVISION_BATCH_SIZE,
+                        help="users hashed and committed per batch")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    def progress(result, pending: int) -> None:
+        done = result.created + result.passwords_set
+        rate = done / (time.perf_counter() - start)
+        print(f"  {done}/{pending} users committed ({rate:.0f}/s)", flush=True)
+
+    with engine.connect() as connection:
+        organization_id = args.organization or connection.execute(select(Organization.id).limit(1)).scalar()
+        if organization_id is None:
+            print("Create an organization.")
+            return 1
+
+        with open(args.csv_file, newline="", encoding="utf-8-sig") as source, \
+                ProcessPoolExecutor(max_workers=args.workers) as executor:
+            try:
+                result = provision_users(connection, source, organization_id, executor,
+                                         batch_size=args.batch_size, progress=progress)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return 1
+
+    elapsed = time.perf_counter() - start
+    print(f"{result.created} created, {result.passwords_set} passwords set, "
+          f"{result.skipped} already provisioned, {result.rejected} rejected "
+          f"in {elapsed:.1f}s with {args.workers} workers")
+    for error in result.errors:
+        print(f" - {error}")
+    if result.rejected > len(result.errors):
+        print(f" ... and {result.rejected - len(result.errors)} more")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
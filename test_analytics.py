@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Utilization analytics tests: the NumPy interval arithmetic in
+app/analytics.py against a plain-Python reference. No database needed.
+
+    python test_analytics.py
+"""
+
+import math
+import os
+import random
+import struct
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from app.analytics import PG_EPOCH, PG_INFINITY, SECONDS_PER_DAY, compute_utilization, parse_intervals
+
+SEED = 20261020
+TRIALS = 300
+DAY = SECONDS_PER_DAY
+
+
+# Plain-Python reference over (system, claimed, released or None)
+
+def reference_peak(intervals, start, end):
+    """ Most intervals open at once, checked at every (clipped) start """
+
+    clipped = []
+    for claimed, released in intervals:
+        low, high = max(claimed, start), min(end if released is None else released, end)
+        if high > low:
+            clipped.append((low, high))
+    return max((sum(1 for low, high in clipped if low <= t < high) for t, _ in clipped), default=0)
+
+
+def reference_metrics(claims, members, start, end):
+    """ utilization, claims/day, mean hold and peak for the claims of the systems in `members` """
+
+    window = max(end - start, 1.0)
+    intervals = [(claimed, released) for system, claimed, released in claims if system in members]
+    busy = sum(
+        max(0.0, min(end if released is None else released, end) - max(claimed, start))
+        for claimed, released in intervals
+    )
+    started = sum(1 for claimed, _ in intervals if start <= claimed < end)
+    holds = [released - claimed for claimed, released in intervals
+             if released is not None and start < released <= end]
+    return {
+        "utilization": busy / (len(members) * window) if members else 0.0,
+        "claims_per_day": started / (window / DAY),
+        "mean_hold_seconds": sum(holds) / len(holds) if holds else math.nan,
+        "peak_concurrency": reference_peak(intervals, start, end)
+    }
+
+
+def compute(claims, system_department, departments, start, end):
+    return compute_utilization(
+        np.array([system for system, _, _ in claims], dtype=np.int64),
+        np.array([claimed for _, claimed, _ in claims], dtype=np.float64),
+        np.array([math.nan if released is None else released for _, _, released in claims], dtype=np.float64),
+        np.array(system_department, dtype=np.int64),
+        departments,
+        start,
+        end
+    )
+
+
+def same(actual, expected) -> bool:
+    if isinstance(expected, float) and math.isnan(expected):
+        return math.isnan(actual)
+    return math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def check(claims, system_department, departments, start, end) -> None:
+    metrics = compute(claims, system_department, departments, start, end)
+
+    for system in range(len(system_department)):
+        expected = reference_metrics(claims, {system}, start, end)
+        for key in ("utilization", "claims_per_day", "mean_hold_seconds"):
+            actual = metrics["system"][key][system]
+            assert same(actual, expected[key]), f"system {system} {key}: {actual} vs {expected[key]}"
+
+    for department in range(departments):
+        members = {system for system, owner in enumerate(system_department) if owner == department}
+        expected = reference_metrics(claims, members, start, end)
+        for key in ("utilization", "claims_per_day", "mean_hold_seconds", "peak_concurrency"):
+            actual = metrics["department"][key][department]
+            assert same(actual, expected[key]), f"department {department} {key}: {actual} vs {expected[key]}"
+
+    expected_peak = reference_peak([(claimed, released) for _, claimed, released in claims], start, end)
+    assert metrics["peak_concurrency"] == expected_peak, \
+        f"peak: {metrics['peak_concurrency']} vs {expected_peak}"
+
+
+def test_matches_reference():
+    """Test utilization, claims/day, mean hold and peak concurrency against a linear scan."""
+    print("Testing utilization metrics against a plain-Python reference...")
+
+    rng = random.Random(SEED)
+    for _ in range(TRIALS):
+        start = 1_760_000_000.0
+        end = start + rng.randint(1, 7) * DAY
+        departments = rng.randint(1, 4)
+        system_department = [rng.randrange(departments) for _ in range(rng.randint(1, 8))]
+
+        claims = []
+        for _ in range(rng.randint(0, 60)):
+            # Whole seconds: peak_concurrency compares at millisecond resolution
+            claimed = start + rng.randint(-2 * int(DAY), int(end - start))
+            released = None if rng.random() < 0.15 else claimed + rng.randint(0, 2 * int(DAY))
+            if released is not None and released <= start:
+                continue  # INTERVALS_QUERY only returns claims overlapping the window
+            claims.append((rng.randrange(len(system_department)), claimed, released))
+
+        check(claims, system_department, departments, start, end)
+
+    print(f"✓ {TRIALS} random windows match the reference")
+
+
+def test_edge_cases():
+    """Test open claims, claims straddling the window and back-to-back claims."""
+    print("\nTesting utilization edge cases...")
+
+    start, end = 0.0, 10 * DAY
+    # System 0 in department 0; systems 1 and 2 in department 1
+    system_department = [0, 1, 1]
+
+    # Open claim: runs to the window's end, counts as started, has no hold time
+    claims = [(0, 8 * DAY, None)]
+    metrics = compute(claims, system_department, 2, start, end)
+    assert same(metrics["system"]["utilization"][0], 0.2)
+    assert same(metrics["system"]["claims_per_day"][0], 0.1)
+    assert math.isnan(metrics["system"]["mean_hold_seconds"][0])
+    check(claims, system_department, 2, start, end)
+    print("✓ Open claim held to the window's end, no hold time")
+
+    # Straddling either edge: clipped for utilization; the first finishes inside, the second starts inside
+    claims = [(0, -DAY, 2 * DAY), (0, 9 * DAY, 12 * DAY)]
+    metrics = compute(claims, system_department, 2, start, end)
+    assert same(metrics["system"]["utilization"][0], 0.3)
+    assert same(metrics["system"]["claims_per_day"][0], 0.1)
+    assert same(metrics["system"]["mean_hold_seconds"][0], 3 * DAY)
+    check(claims, system_department, 2, start, end)
+    print("✓ Claims straddling the window are clipped")
+
+    # Back to back on two systems of one department: never open at once
+    claims = [(1, DAY, 2 * DAY), (2, 2 * DAY, 3 * DAY), (1, 3 * DAY, 4 * DAY)]
+    metrics = compute(claims, system_department, 2, start, end)
+    assert metrics["department"]["peak_concurrency"][1] == 1
+    assert metrics["peak_concurrency"] == 1
+    claims.append((0, 2 * DAY - 1, 2 * DAY + 1))
+    assert compute(claims, system_department, 2, start, end)["peak_concurrency"] == 2
+    check(claims, system_department, 2, start, end)
+    print("✓ Back-to-back claims do not overlap; a straddling one does")
+
+    # No claims, and a department without systems
+    metrics = compute([], system_department, 3, start, end)
+    assert metrics["peak_concurrency"] == 0
+    assert metrics["department"]["utilization"][2] == 0.0
+    print("✓ No claims and empty departments are all zero")
+
+
+def test_parse_intervals():
+    """Test decoding the packed bytea, open claims included."""
+    print("\nTesting interval decoding...")
+
+    def pg_time(seconds: float) -> int:
+        return int(round((seconds - PG_EPOCH) * 1e6))
+
+    data = (
+        struct.pack(">iqq", 0, pg_time(1_760_000_000.5), pg_time(1_760_003_600.25))
+        + struct.pack(">iqq", 3, pg_time(1_760_000_100.0), PG_INFINITY)
+    )
+    system, claimed, released = parse_intervals(data)
+    assert system.tolist() == [0, 3]
+    assert claimed.tolist() == [1_760_000_000.5, 1_760_000_100.0]
+    assert released[0] == 1_760_003_600.25 and math.isnan(released[1])
+
+    system, claimed, released = parse_intervals(None)
+    assert len(system) == len(claimed) == len(released) == 0
+    print("✓ Packed intervals decode to epoch seconds, open claims to NaN")
+
+
+def main():
+    """Run all tests."""
+    tests = [
+        ("Utilization Reference Test", test_matches_reference),
+        ("Utilization Edge Cases Test", test_edge_cases),
+        ("Interval Decoding Test", test_parse_intervals),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n🧪 Running: {test_name}")
+        try:
+            test_func()
+            print(f"✅ {test_name} PASSED")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test_name} FAILED: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -57,6 +57,91 @@ def test_jwt_tokens():
     
     return True
 
+def test_principal_cache():
+    """Test the principal cache hit ratio, LRU bound, expiry and invalidation on commit."""
+    print("\nTesting principal cache...")
+    
+    import time
+    import uuid
+    from app.db.session import SessionLocal
+    from app.db.db_models.organization import Organization
+    from app.db.db_models.user import User
+    from app.principal_cache import PrincipalCache, UserSnapshot, principal_cache
+    
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    user_id = uuid.uuid4()
+    snapshot = UserSnapshot(
+        id=user_id, email="test@example.com", first_name="Test", last_name="User",
+        organization_id=uuid.uuid4(), is_active=True, is_admin=False,
+        last_login=None, avatar_url=None
+    )
+    claims = {"sub": "test@example.com", "exp": time.time() + 600}
+    
+    assert cache.get("token-a") is None
+    cache.put("token-a", claims, snapshot)
+    assert cache.get("token-a") == (claims, snapshot)
+    assert cache.hit_ratio == 0.5
+    print("✓ Miss then hit")
+    
+    cache.put("token-b", claims, snapshot)
+    cache.put("token-c", claims, snapshot)
+    assert cache.get("token-a") is None
+    print("✓ LRU bound")
+    
+    cache.invalidate_user(user_id)
+    assert cache.get("token-c") is None
+    print("✓ User invalidation")
+    
+    cache.put("token-d", {"sub": "test@example.com", "exp": time.time() - 1}, snapshot)
+    assert cache.get("token-d") is None
+    print("✓ Expired token rejection")
+    
+    short_lived = PrincipalCache(maxsize=2, ttl=0.05)
+    short_lived.put("token-e", claims, snapshot)
+    assert short_lived.get("token-e") is not None
+    time.sleep(0.1)
+    assert short_lived.get("token-e") is None
+    print("✓ TTL expiry")
+    
+    # Invalidation on commit goes through the session events on the shared cache
+    with SessionLocal() as db:
+        organization = Organization(name=f"test-principal-cache-{uuid.uuid4()}")
+        db.add(organization)
+        db.flush()
+        user = User(
+            first_name="Test", last_name="User", email=f"test-principal-cache-{uuid.uuid4()}@example.com",
+            organization_id=organization.id, is_active=True, is_admin=False
+        )
+        db.add(user)
+        db.commit()
+        try:
+            cached = UserSnapshot.from_user(user)
+            principal_cache.put("token-f", claims, cached)
+            
+            user.first_name = "Renamed"
+            db.commit()
+            assert principal_cache.get("token-f") is not None, "non-security change invalidated the principal"
+            
+            user.is_admin = True
+            db.flush()
+            db.rollback()
+            assert principal_cache.get("token-f") is not None, "rolled back change invalidated the principal"
+            
+            user.is_admin = True
+            db.flush()
+            assert principal_cache.get("token-f") is not None, "invalidated before commit"
+            db.commit()
+            assert principal_cache.get("token-f") is None, "committed change left the principal cached"
+            print("✓ Invalidation on commit (not on rollback)")
+        finally:
+            db.rollback()
+            db.delete(user)
+            db.flush()
+            db.delete(organization)
+            db.commit()
+    
+    return True
+
 def test_imports():
     """Test that all required modules can be imported."""
     print("Testing imports...")
@@ -93,6 +178,7 @@ def main():
         ("Import Test", test_imports),
         ("Password Hashing Test", test_password_hashing),
         ("JWT Token Test", test_jwt_tokens),
+        ("Principal Cache Test", test_principal_cache),
     ]
     
     passed = 0
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Claim expiry tests.
+
+The ClaimExpiry deadline heap is tested on its own (no database needed).
+claims.expire_claims and the re-queueing of claims that are not due yet
+are tested against the database with a throwaway organization (prefixed
+"test-expiry-"), deleted afterwards; that part needs DATABASE_URL with
+migrations applied.
+
+    python test_claim_expiry.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import delete, select
+
+from app.claim_expiry import ClaimExpiry
+from app.claims import claim_system, expire_claims, release_system
+from app.db.db_models import Organization, System, SystemClaim, User
+from app.db.db_models.system import SystemStatus
+from app.db.session import AsyncSessionLocal, get_async_engine
+
+# Enough forgotten entries to pass the compaction threshold (stale > live + 1024)
+COMPACTION_CLAIMS = 3000
+COMPACTION_FORGOTTEN = 2500
+
+
+def run(coroutine):
+    """ asyncio.run, then close the pooled asyncpg connections - they belong to that loop """
+
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await get_async_engine().dispose()
+
+    return asyncio.run(main())
+
+
+def at(seconds: float) -> datetime:
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+def test_heap_order_and_lazy_deletion():
+    """Test pop_due order and limit, and that forgotten claims are skipped."""
+    print("Testing the deadline heap...")
+
+    expiry = ClaimExpiry()
+    claims = [(uuid.uuid4(), uuid.uuid4()) for _ in range(5)]
+    for offset, (claim_id, system_id) in zip((30, 10, 40, 20, 50), claims):
+        expiry.schedule(claim_id, system_id, at(1000 + offset))
+
+    assert expiry.next_deadline() == 1010
+    assert expiry.pop_due(1005) == {}
+    assert list(expiry.pop_due(1035, limit=2)) == [claims[1][0], claims[3][0]]
+    assert list(expiry.pop_due(1035)) == [claims[0][0]]
+    print("✓ Due claims come out earliest first, at most `limit` at a time")
+
+    expiry.forget(claims[2][0])
+    assert len(expiry._heap) == 2, "forget removed the heap entry eagerly"
+    assert expiry.next_deadline() == 1050, "forgotten claim still scheduled"
+    assert expiry.pop_due(2000) == {claims[4][0]: claims[4][1]}
+    expiry.forget(uuid.uuid4())
+    assert expiry.next_deadline() is None
+    print("✓ Forgotten claims are skipped, not popped as due")
+
+    expiry = ClaimExpiry()
+    ids = [uuid.uuid4() for _ in range(COMPACTION_CLAIMS)]
+    for n, claim_id in enumerate(ids):
+        expiry.schedule(claim_id, uuid.uuid4(), at(1000 + n))
+    for claim_id in ids[:COMPACTION_FORGOTTEN]:
+        expiry.forget(claim_id)
+    live = COMPACTION_CLAIMS - COMPACTION_FORGOTTEN
+    entries = len(expiry._heap)
+    assert entries < COMPACTION_CLAIMS, "heap never compacted"
+    assert entries <= 2 * live + 1024
+    due = expiry.pop_due(float("inf"), limit=COMPACTION_CLAIMS)
+    assert list(due) == ids[COMPACTION_FORGOTTEN:]
+    print(f"✓ Heap compacted to {entries} entries after {COMPACTION_FORGOTTEN} forgets, live claims intact")
+
+
+def test_claim_events():
+    """Test that "claim" notifications schedule, reschedule and forget."""
+    print("\nTesting claim notifications...")
+
+    expiry = ClaimExpiry()
+    claim_id, system_id = uuid.uuid4(), uuid.uuid4()
+
+    def event(**fields) -> dict:
+        return {"type": "claim", "claim_id": str(claim_id), "system_id": str(system_id), **fields}
+
+    expiry.apply_event(event(expires_at=at(1100).isoformat(), released_at=None))
+    assert expiry.next_deadline() == 1100
+
+    # A later deadline for the same claim replaces the earlier one
+    expiry.apply_event(event(expires_at=at(1200).isoformat(), released_at=None))
+    assert expiry.pop_due(1150) == {}, "claim expired at its old deadline"
+    assert expiry.pop_due(1200) == {claim_id: system_id}
+    assert expiry.pop_due(2000) == {}, "claim popped twice"
+    print("✓ A new deadline reschedules the claim, popped once")
+
+    expiry.apply_event(event(expires_at=at(1300).isoformat(), released_at=None))
+    expiry.apply_event(event(expires_at=at(1300).isoformat(), released_at=at(1250).isoformat()))
+    assert expiry.next_deadline() is None
+    expiry.apply_event(event(expires_at=None, released_at=None))
+    assert expiry.next_deadline() is None and not expiry._deadlines
+    print("✓ Released and never-expiring claims are not scheduled")
+
+
+async def setup() -> dict:
+    """ One organization with a user and systems x, y and z, all FREE """
+
+    tag = uuid.uuid4().hex[:8]
+    ids = {}
+    async with AsyncSessionLocal() as db:
+        organization = Organization(id=uuid.uuid4(), name=f"test-expiry-{tag}")
+        db.add(organization)
+        await db.flush()
+        user = User(id=uuid.uuid4(), first_name="Test", last_name="Expiry",
+                    email=f"test-expiry-{tag}@example.com", organization_id=organization.id, is_active=True)
+        db.add(user)
+        for name in ("x", "y", "z"):
+            system = System(id=uuid.uuid4(), name=f"test-expiry-{tag}-{name}",
+                            status=SystemStatus.FREE, organization_id=organization.id)
+            db.add(system)
+            ids[f"system_{name}"] = system.id
+        ids["org"] = organization.id
+        ids["user"] = user.id
+        await db.commit()
+
+    return ids
+
+
+async def teardown(ids: dict) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(SystemClaim).where(SystemClaim.organization_id == ids["org"]))
+        await db.execute(delete(System).where(System.organization_id == ids["org"]))
+        await db.execute(delete(User).where(User.organization_id == ids["org"]))
+        await db.execute(delete(Organization).where(Organization.id == ids["org"]))
+        await db.commit()
+
+
+async def claim(ids: dict, system: str, duration: timedelta):
+    async with AsyncSessionLocal() as db:
+        return await claim_system(db, ids[f"system_{system}"], ids["user"], duration=duration)
+
+
+async def _expire_claims() -> None:
+    ids = await setup()
+    try:
+        due = await claim(ids, "x", timedelta(milliseconds=100))
+        released = await claim(ids, "y", timedelta(milliseconds=100))
+        later = await claim(ids, "z", timedelta(hours=1))
+        async with AsyncSessionLocal() as db:
+            await release_system(db, ids["system_y"], ids["user"])
+        await asyncio.sleep(0.2)
+
+        batch = {due.claim_id: ids["system_x"], released.claim_id: ids["system_y"], later.claim_id: ids["system_z"]}
+        async with AsyncSessionLocal() as db:
+            expired, early = await expire_claims(db, batch)
+        assert expired == [due.claim_id], f"expired {expired}"
+        assert list(early) == [later.claim_id] and early[later.claim_id][0] == ids["system_z"]
+
+        async with AsyncSessionLocal() as db:
+            system = await db.get(System, ids["system_x"])
+            assert system.status == SystemStatus.FREE and system.current_claim_id is None
+            assert system.current_expires_at is None
+            released_at = (await db.execute(
+                select(SystemClaim.released_at).where(SystemClaim.id == due.claim_id)
+            )).scalar_one()
+            assert released_at is not None
+            assert (await db.get(System, ids["system_z"])).status == SystemStatus.CLAIMED
+        print("✓ Due claim released and its system freed; released and later claims skipped")
+
+        async with AsyncSessionLocal() as db:
+            assert await expire_claims(db, {due.claim_id: ids["system_x"]}) == ([], {})
+        print("✓ Expiring an already expired claim is a no-op")
+
+        # Our clock ahead of the database's: the claim comes back, rescheduled at its deadline
+        expiry = ClaimExpiry()
+        expiry.schedule(later.claim_id, ids["system_z"], datetime.now(timezone.utc) - timedelta(seconds=1))
+        assert await expiry.expire_due(AsyncSessionLocal) == 0
+        assert expiry._deadlines[later.claim_id] == early[later.claim_id][1].timestamp()
+        assert expiry.next_deadline() > time.time() + 3000
+        print("✓ A claim not due by the database clock is re-queued at its deadline")
+    finally:
+        await teardown(ids)
+
+
+def test_expire_claims():
+    """Test expire_claims against the database, and re-queueing of early claims."""
+    print("\nTesting expire_claims...")
+    run(_expire_claims())
+
+
+def main():
+    """Run all tests."""
+    tests = [
+        ("Deadline Heap Test", test_heap_order_and_lazy_deletion),
+        ("Claim Events Test", test_claim_events),
+        ("Expire Claims Test", test_expire_claims),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n🧪 Running: {test_name}")
+        try:
+            test_func()
+            print(f"✅ {test_name} PASSED")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test_name} FAILED: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
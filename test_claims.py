@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Claim / release service tests.
+
+Creates two throwaway organizations (prefixed "test-claims-") with users
+and systems, exercises app/claims.py and the claim routes against them,
+and deletes everything afterwards. Needs DATABASE_URL with migrations
+applied.
+
+    python test_claims.py
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# pytest imports app.main once for every test file; test_routes.py needs budgets enforced
+os.environ["ENFORCE_QUERY_BUDGETS"] = "1"
+
+import httpx
+from sqlalchemy import delete, select, update
+
+from app.auth import create_access_token
+from app.claims import (
+    ClaimNotFound, SystemNotFound, SystemUnavailable, check_current_claims, claim_system,
+    release_system, repair_current_claims
+)
+from app.db.db_models import Organization, System, SystemClaim, User
+from app.db.db_models.system import SystemStatus
+from app.db.session import AsyncSessionLocal, SessionLocal, get_async_engine
+from app.main import app
+
+CONCURRENT_CLAIMERS = 8
+
+
+def run(coroutine):
+    """ asyncio.run, then close the pooled asyncpg connections - they belong to that loop """
+
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await get_async_engine().dispose()
+
+    return asyncio.run(main())
+
+
+async def setup() -> dict:
+    """ Organizations a and b, each with users 1 and 2 and one FREE system """
+
+    tag = uuid.uuid4().hex[:8]
+    ids = {}
+    async with AsyncSessionLocal() as db:
+        for org in ("a", "b"):
+            organization = Organization(id=uuid.uuid4(), name=f"test-claims-{tag}-{org}")
+            db.add(organization)
+            await db.flush()
+            for n in (1, 2):
+                user = User(id=uuid.uuid4(), first_name="Test", last_name=f"{org}{n}",
+                            email=f"test-claims-{tag}-{org}{n}@example.com",
+                            organization_id=organization.id, is_active=True)
+                db.add(user)
+                ids[f"user_{org}{n}"] = user.id
+                ids[f"email_{org}{n}"] = user.email
+            system = System(id=uuid.uuid4(), name=f"test-claims-{tag}-{org}",
+                            status=SystemStatus.FREE, organization_id=organization.id)
+            db.add(system)
+            ids[f"org_{org}"] = organization.id
+            ids[f"system_{org}"] = system.id
+        await db.commit()
+
+    return ids
+
+
+async def teardown(ids: dict) -> None:
+    organizations = [ids["org_a"], ids["org_b"]]
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(SystemClaim).where(SystemClaim.organization_id.in_(organizations)))
+        await db.execute(delete(System).where(System.organization_id.in_(organizations)))
+        await db.execute(delete(User).where(User.organization_id.in_(organizations)))
+        await db.execute(delete(Organization).where(Organization.id.in_(organizations)))
+        await db.commit()
+
+
+async def open_claims(system_id: uuid.UUID) -> list:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(SystemClaim.claimed_by_user_id)
+            .where(SystemClaim.system_id == system_id, SystemClaim.released_at.is_(None))
+        )).scalars().all()
+
+
+async def add_open_claims(system_id: uuid.UUID, organization_id: uuid.UUID, user_id: uuid.UUID, count: int) -> list:
+    """ Open claims written behind the service's back (pointer drift), oldest first """
+
+    now = datetime.now(timezone.utc)
+    claims = [
+        SystemClaim(id=uuid.uuid4(), system_id=system_id, organization_id=organization_id,
+                    claimed_by_user_id=user_id, claimed_at=now - timedelta(hours=count - n))
+        for n in range(count)
+    ]
+    async with AsyncSessionLocal() as db:
+        db.add_all(claims)
+        await db.commit()
+    return [claim.id for claim in claims]
+
+
+async def expect(error: type, coroutine) -> None:
+    try:
+        await coroutine
+    except error as e:
+        # Exactly this error - SystemNotFound is also a SystemUnavailable
+        assert type(e) is error, f"expected {error.__name__}, got {type(e).__name__}"
+        return
+    raise AssertionError(f"expected {error.__name__}")
+
+
+async def _claim_and_release() -> None:
+    ids = await setup()
+    try:
+        async with AsyncSessionLocal() as db:
+            await claim_system(db, ids["system_a"], ids["user_a1"], organization_id=ids["org_a"])
+        assert await open_claims(ids["system_a"]) == [ids["user_a1"]]
+        print("✓ Claim")
+
+        async with AsyncSessionLocal() as db:
+            await expect(SystemUnavailable, claim_system(
+                db, ids["system_a"], ids["user_a2"], organization_id=ids["org_a"]
+            ))
+        print("✓ Double claim rejected")
+
+        async with AsyncSessionLocal() as db:
+            await expect(SystemNotFound, claim_system(
+                db, ids["system_b"], ids["user_a1"], organization_id=ids["org_a"]
+            ))
+        async with AsyncSessionLocal() as db:
+            await expect(SystemNotFound, claim_system(
+                db, uuid.uuid4(), ids["user_a1"], organization_id=ids["org_a"]
+            ))
+        assert await open_claims(ids["system_b"]) == []
+        print("✓ Other organization's system and unknown system not found")
+
+        async with AsyncSessionLocal() as db:
+            await expect(ClaimNotFound, release_system(
+                db, ids["system_a"], ids["user_a2"], organization_id=ids["org_a"]
+            ))
+        async with AsyncSessionLocal() as db:
+            # Admin override (no user) from another organization
+            await expect(ClaimNotFound, release_system(db, ids["system_a"], None, organization_id=ids["org_b"]))
+        assert await open_claims(ids["system_a"]) == [ids["user_a1"]]
+        print("✓ Release by non-holder and by another organization rejected")
+
+        async with AsyncSessionLocal() as db:
+            await release_system(db, ids["system_a"], ids["user_a1"], organization_id=ids["org_a"])
+        async with AsyncSessionLocal() as db:
+            system = await db.get(System, ids["system_a"])
+            assert system.status == SystemStatus.FREE and system.current_claim_id is None
+        assert await open_claims(ids["system_a"]) == []
+        async with AsyncSessionLocal() as db:
+            await expect(ClaimNotFound, release_system(
+                db, ids["system_a"], ids["user_a1"], organization_id=ids["org_a"]
+            ))
+        print("✓ Release by holder, then nothing left to release")
+
+        async def claimer() -> bool:
+            async with AsyncSessionLocal() as db:
+                try:
+                    await claim_system(db, ids["system_a"], ids["user_a2"], organization_id=ids["org_a"])
+                    return True
+                except SystemUnavailable:
+                    return False
+
+        won = await asyncio.gather(*(claimer() for _ in range(CONCURRENT_CLAIMERS)))
+        assert sum(won) == 1, f"{sum(won)} of {CONCURRENT_CLAIMERS} concurrent claims succeeded"
+        assert len(await open_claims(ids["system_a"])) == 1
+        print(f"✓ One of {CONCURRENT_CLAIMERS} concurrent claimers wins")
+    finally:
+        await teardown(ids)
+
+
+async def _release_without_pointer() -> None:
+    ids = await setup()
+    try:
+        claims = await add_open_claims(ids["system_a"], ids["org_a"], ids["user_a1"], 2)
+        async with AsyncSessionLocal() as db:
+            await expect(ClaimNotFound, release_system(
+                db, ids["system_a"], ids["user_a2"], organization_id=ids["org_a"]
+            ))
+        async with AsyncSessionLocal() as db:
+            released = await release_system(db, ids["system_a"], ids["user_a1"], organization_id=ids["org_a"])
+        assert released == claims[-1], "release did not report the newest claim"
+        assert await open_claims(ids["system_a"]) == []
+        print("✓ Without a pointer, release closes every open claim of the holder")
+    finally:
+        await teardown(ids)
+
+
+async def _repair_duplicate_open_claims() -> None:
+    ids = await setup()
+    try:
+        # a: a current claim plus an older stray one; b: two strays, no pointer
+        async with AsyncSessionLocal() as db:
+            current = await claim_system(db, ids["system_a"], ids["user_a1"], organization_id=ids["org_a"])
+        stray_a = await add_open_claims(ids["system_a"], ids["org_a"], ids["user_a2"], 1)
+        stray_b = await add_open_claims(ids["system_b"], ids["org_b"], ids["user_b1"], 2)
+
+        with SessionLocal() as db:
+            reported = {row[0]: row for row in check_current_claims(db)}
+            assert reported[ids["system_a"]][3:] == (current.claim_id, 2), reported.get(ids["system_a"])
+            assert reported[ids["system_b"]][2:] == (None, stray_b[-1], 2), reported.get(ids["system_b"])
+            print("✓ Duplicate open claims reported, newest as the open claim")
+
+            assert repair_current_claims(db) >= 2
+            assert not {ids["system_a"], ids["system_b"]} & {row[0] for row in check_current_claims(db)}
+
+            for system_id, newest, older in (
+                (ids["system_a"], current.claim_id, stray_a[0]),
+                (ids["system_b"], stray_b[-1], stray_b[0])
+            ):
+                system = db.get(System, system_id)
+                assert system.current_claim_id == newest and system.status == SystemStatus.CLAIMED
+                closed = db.scalars(select(SystemClaim).where(SystemClaim.id == older)).one()
+                assert closed.released_at == system.current_claimed_at, "older claim not closed where the newest began"
+        assert len(await open_claims(ids["system_a"])) == 1 and len(await open_claims(ids["system_b"])) == 1
+        print("✓ Repair keeps the newest open claim and closes the older ones")
+    finally:
+        await teardown(ids)
+
+
+async def _claim_routes() -> None:
+    ids = await setup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            cookies = {"access_token": create_access_token({"sub": ids["email_a1"]})}
+
+            response = await c.post(f"/api/systems/{uuid.uuid4()}/claim", cookies=cookies)
+            assert response.status_code == 404, f"unknown system: {response.status_code}"
+            response = await c.post(f"/api/systems/{ids['system_b']}/claim", cookies=cookies)
+            assert response.status_code == 404, f"other organization's system: {response.status_code}"
+            print("✓ Claim of an unknown or foreign system is 404")
+
+            response = await c.post(f"/api/systems/{ids['system_a']}/claim", cookies=cookies)
+            assert response.status_code == 200, f"claim: {response.status_code}"
+            response = await c.post(f"/api/systems/{ids['system_a']}/claim", cookies=cookies)
+            assert response.status_code == 409, f"double claim: {response.status_code}"
+            print("✓ Claim, then 409 on a double claim")
+
+            other = {"access_token": create_access_token({"sub": ids["email_a2"]})}
+            response = await c.post(f"/api/systems/{ids['system_a']}/release", cookies=other)
+            assert response.status_code == 404, f"release by non-holder: {response.status_code}"
+            response = await c.post(f"/api/systems/{ids['system_a']}/release", cookies=cookies)
+            assert response.status_code == 200, f"release: {response.status_code}"
+            print("✓ Release by non-holder is 404, by holder 200")
+    finally:
+        await teardown(ids)
+
+
+async def _export_scoped_to_organization() -> None:
+    ids = await setup()
+    try:
+        async with AsyncSessionLocal() as db:
+            await claim_system(db, ids["system_a"], ids["user_a1"], organization_id=ids["org_a"])
+        async with AsyncSessionLocal() as db:
+            await claim_system(db, ids["system_b"], ids["user_b2"], organization_id=ids["org_b"])
+            await db.execute(update(User).where(User.id == ids["user_b1"]).values(is_admin=True))
+            await db.commit()
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            cookies = {"access_token": create_access_token({"sub": ids["email_b1"]})}
+            response = await c.get(
+                "/api/admin/claims/export",
+                params={"format": "ndjson", "organization_id": str(ids["org_a"])},
+                cookies=cookies
+            )
+            assert response.status_code == 200, f"export: {response.status_code}"
+            assert str(ids["system_b"]) in response.text, "export is missing the organization's own claim"
+            assert str(ids["system_a"]) not in response.text, "export included another organization's claims"
+            print("✓ Claim export only covers the admin's organization")
+    finally:
+        await teardown(ids)
+
+
+def test_claim_and_release():
+    """Test claim exclusivity, organization scoping and who may release."""
+    print("Testing claim / release service...")
+    run(_claim_and_release())
+
+
+def test_release_without_pointer():
+    """Test release when drift left several open claims and no pointer."""
+    print("\nTesting release without a current-holder pointer...")
+    run(_release_without_pointer())
+
+
+def test_repair_duplicate_open_claims():
+    """Test check/repair of systems with more than one open claim."""
+    print("\nTesting repair of duplicate open claims...")
+    run(_repair_duplicate_open_claims())
+
+
+def test_claim_routes():
+    """Test the claim and release routes' status codes."""
+    print("\nTesting claim / release routes...")
+    run(_claim_routes())
+
+
+def test_export_scoped_to_organization():
+    """Test that an admin's claim export never includes another organization."""
+    print("\nTesting claim export scoping...")
+    run(_export_scoped_to_organization())
+
+
+def main():
+    """Run all tests."""
+    tests = [
+        ("Claim Service Test", test_claim_and_release),
+        ("Release Without Pointer Test", test_release_without_pointer),
+        ("Duplicate Open Claims Test", test_repair_duplicate_open_claims),
+        ("Claim Routes Test", test_claim_routes),
+        ("Claim Export Scope Test", test_export_scoped_to_organization),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n🧪 Running: {test_name}")
+        try:
+            test_func()
+            print(f"✅ {test_name} PASSED")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test_name} FAILED: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Event broadcast tests.
+
+Checks that scoped subscribers only receive their organization's events,
+and that the notification triggers put organization_id in every payload
+(throwaway organization prefixed "test-events-", deleted afterwards;
+needs DATABASE_URL with migrations applied).
+
+    python test_events.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import uuid
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncpg
+from sqlalchemy import delete
+
+from app.claims import claim_system, release_system
+from app.db.db_models import Organization, System, SystemClaim, User
+from app.db.db_models.system import SystemStatus
+from app.db.session import AsyncSessionLocal, get_async_engine
+from app.events import EVENTS_CHANNEL, EventBroadcaster, Subscriber
+
+
+def run(coroutine):
+    """ asyncio.run, then close the pooled asyncpg connections - they belong to that loop """
+
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await get_async_engine().dispose()
+
+    return asyncio.run(main())
+
+
+def drain(subscriber: Subscriber) -> list:
+    return [subscriber.queue.get_nowait() for _ in range(subscriber.queue.qsize())]
+
+
+def test_publish_scoped_to_organization():
+    """Test that a subscriber with an organization only gets that organization's events."""
+    print("Testing event fan-out by organization...")
+
+    async def publish():
+        broadcaster = EventBroadcaster()
+        org_a, org_b = uuid.uuid4(), uuid.uuid4()
+        # Added directly - subscribe() would start the LISTEN task
+        internal = Subscriber()
+        a = Subscriber(organization_id=org_a)
+        b = Subscriber(organization_id=org_b)
+        broadcaster.subscribers.update((internal, a, b))
+
+        broadcaster.publish({"type": "claim", "organization_id": str(org_a)})
+        broadcaster.publish({"type": "system", "organization_id": str(org_b)})
+        broadcaster.publish({"type": "claim"})
+        broadcaster.publish({"type": "resync"})
+
+        assert len(drain(internal)) == 4, "internal subscriber missed events"
+        assert drain(a) == [{"type": "claim", "organization_id": str(org_a)}, {"type": "resync"}]
+        assert drain(b) == [{"type": "system", "organization_id": str(org_b)}, {"type": "resync"}]
+
+    asyncio.run(publish())
+    print("✓ Scoped subscribers get their organization's events and resync; internal ones get all")
+
+
+async def _payloads_carry_organization() -> None:
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        organization = Organization(id=uuid.uuid4(), name=f"test-events-{tag}")
+        db.add(organization)
+        await db.flush()
+        user = User(id=uuid.uuid4(), first_name="Test", last_name="Events",
+                    email=f"test-events-{tag}@example.com", organization_id=organization.id, is_active=True)
+        system = System(id=uuid.uuid4(), name=f"test-events-{tag}",
+                        status=SystemStatus.FREE, organization_id=organization.id)
+        db.add_all([user, system])
+        await db.commit()
+
+    payloads = []
+    listener = await asyncpg.connect(EventBroadcaster()._dsn())
+    try:
+        await listener.add_listener(EVENTS_CHANNEL, lambda *args: payloads.append(json.loads(args[3])))
+        async with AsyncSessionLocal() as db:
+            await claim_system(db, system.id, user.id)
+        async with AsyncSessionLocal() as db:
+            await release_system(db, system.id, user.id)
+        # Notifications arrive asynchronously after the commits
+        for _ in range(50):
+            if {"claim", "system"} <= {payload["type"] for payload in payloads}:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await listener.close()
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(SystemClaim).where(SystemClaim.organization_id == organization.id))
+            await db.execute(delete(System).where(System.organization_id == organization.id))
+            await db.execute(delete(User).where(User.organization_id == organization.id))
+            await db.execute(delete(Organization).where(Organization.id == organization.id))
+            await db.commit()
+
+    ours = [payload for payload in payloads if payload.get("system_id") == str(system.id)]
+    assert {"claim", "system"} <= {payload["type"] for payload in ours}, f"missing notifications: {ours}"
+    assert all(payload.get("organization_id") == str(organization.id) for payload in ours), \
+        f"payload without organization_id: {ours}"
+    print(f"✓ {len(ours)} claim and system notifications carry organization_id")
+
+
+def test_payloads_carry_organization():
+    """Test that claim and system notifications include organization_id."""
+    print("\nTesting notification payloads...")
+    run(_payloads_carry_organization())
+
+
+def main():
+    """Run all tests."""
+    tests = [
+        ("Event Scope Test", test_publish_scoped_to_organization),
+        ("Notification Payload Test", test_payloads_carry_organization),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n🧪 Running: {test_name}")
+        try:
+            test_func()
+            print(f"✅ {test_name} PASSED")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test_name} FAILED: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
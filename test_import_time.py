@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for app.main.
+
+Imports app.main in a fresh interpreter with -X importtime, fails if it
+takes longer than IMPORT_TIME_BUDGET_MS (best of 3), and prints the modules
+that cost the most. Also checks that the import stays side-effect free: no
+engine, no database driver, no passlib - DATABASE_URL is left empty.
+No database needed.
+
+    python test_import_time.py
+    IMPORT_TIME_BUDGET_MS=1500 python -m pytest -q -s test_import_time.py
+"""
+
+import os
+import subprocess
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+RUNS = 3
+TOP_MODULES = 15
+
+# What importing app.main must not do - these happen at startup or on first use
+SIDE_EFFECT_CHECK = """
+import sys
+import app.main
+from app import auth
+from app.db import session
+assert session._engine is None and session._async_engine is None, "engine created at import"
+assert auth._pwd_context is None, "crypt context created at import"
+for module in ("psycopg", "passlib.context"):
+    assert module not in sys.modules, f"{module} imported at import"
+"""
+
+
+def import_app(code: str = "import app.main"):
+    """ Run `code` in a fresh interpreter; returns the -X importtime lines """
+
+    env = {**os.environ, "DATABASE_URL": ""}
+    env.pop("ASYNC_DATABASE_URL", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise AssertionError(f"import failed:\n{result.stderr[-2000:]}")
+    return [line for line in result.stderr.splitlines() if line.startswith("import time:")]
+
+
+def parse(lines):
+    """ [(module, self µs, cumulative µs, depth)] """
+
+    modules = []
+    for line in lines[1:]:
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def app_main_imports(modules):
+    """ The entries imported under app.main, ending with app.main itself """
+
+    end = next(i for i, (name, _, _, depth) in enumerate(modules) if name == "app.main" and depth == 0)
+    start = max((i for i in range(end) if modules[i][3] == 0), default=-1) + 1
+    return modules[start:end + 1]
+
+
+def test_import_time_within_budget():
+    """Test that a cold import of app.main stays within its time budget."""
+    print("Testing app.main import time...")
+
+    runs = [app_main_imports(parse(import_app())) for _ in range(RUNS)]
+    totals = [run[-1][2] for run in runs]
+    best = runs[totals.index(min(totals))]
+    total_ms = min(totals) / 1000
+
+    print(f"  app.main: {total_ms:.0f} ms (best of {RUNS}), budget {IMPORT_TIME_BUDGET_MS:.0f} ms")
+    print(f"  {'cumulative ms':>13} {'self ms':>8}  module (imported directly by app.main or app.*)")
+    direct = [entry for entry in best if entry[3] <= 1 or (entry[0].startswith("app.") and entry[3] <= 2)]
+    for name, self_us, cumulative_us, _ in sorted(direct, key=lambda entry: -entry[2])[:TOP_MODULES]:
+        print(f"  {cumulative_us / 1000:>13.1f} {self_us / 1000:>8.1f}  {name}")
+    print(f"  {'':>13} {'self ms':>8}  slowest modules on their own")
+    for name, self_us, _, _ in sorted(best, key=lambda entry: -entry[1])[:TOP_MODULES]:
+        print(f"  {'':>13} {self_us / 1000:>8.1f}  {name}")
+
+    assert total_ms <= IMPORT_TIME_BUDGET_MS, \
+        f"importing app.main took {total_ms:.0f} ms, budget {IMPORT_TIME_BUDGET_MS:.0f} ms"
+    print("✓ Import within budget")
+
+
+def test_import_has_no_side_effects():
+    """Test that importing app.main creates no engine or crypt context and needs no DATABASE_URL."""
+    print("\nTesting app.main import side effects...")
+    import_app(SIDE_EFFECT_CHECK)
+    print("✓ No engine, driver or crypt context at import")
+
+
+def main():
+    """Run all tests."""
+    tests = [
+        ("Import Time Budget Test", test_import_time_within_budget),
+        ("Import Side Effects Test", test_import_has_no_side_effects),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n🧪 Running: {test_name}")
+        try:
+            test_func()
+            print(f"✅ {test_name} PASSED")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test_name} FAILED: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
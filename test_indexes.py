@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+EXPLAIN-based index tests.
+
+Seeds a dataset inside a transaction, runs EXPLAIN on the hot queries and
+checks that each one is answered by the expected index, and that the
+claim queries only touch the hot system_claims partitions. Everything
+(including partitions created for the seed) is rolled back afterwards.
+Needs DATABASE_URL with migrations applied (alembic upgrade head).
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+
+from app.db.partitions import ensure_claim_partitions, month_start, partition_name
+from app.db.session import engine
+
+ORGANIZATIONS = 50
+USERS = 1_000
+SYSTEMS = 2_000
+CLAIMS = 50_000
+
+SEED = [
+    """
+    INSERT INTO organizations (id, name)
+    SELECT gen_random_uuid(), 'idx-test-org-' || g FROM generate_series(1, :organizations) g
+    """,
+    """
+    CREATE TEMP TABLE idx_orgs ON COMMIT DROP AS
+    SELECT id, row_number() OVER () AS n FROM organizations WHERE name LIKE 'idx-test-org-%'
+    """,
+    """
+    INSERT INTO users (id, first_name, last_name, email, organization_id)
+    SELECT gen_random_uuid(), 'Idx', 'User' || g, 'idx-test-' || g || '@example.com',
+           (SELECT id FROM idx_orgs WHERE n = 1 + g % :organizations)
+    FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO systems (id, name, status, organization_id)
+    SELECT gen_random_uuid(), 'IDX-' || g, 'FREE',
+           (SELECT id FROM idx_orgs WHERE n = 1 + g % :organizations)
+    FROM generate_series(1, :systems) g
+    """,
+    """
+    CREATE TEMP TABLE idx_systems ON COMMIT DROP AS
+    SELECT id, organization_id, row_number() OVER () AS n FROM systems WHERE name LIKE 'IDX-%'
+    """,
+    """
+    CREATE TEMP TABLE idx_users ON COMMIT DROP AS
+    SELECT id, row_number() OVER () AS n FROM users WHERE email LIKE 'idx-test-%'
+    """,
+    # The first claim of every system is still open, the rest are released;
+    # claims span the last ~35 days, so two monthly partitions
+    """
+    INSERT INTO system_claims (id, organization_id, system_id, claimed_by_user_id, claimed_at, released_at)
+    SELECT gen_random_uuid(), s.organization_id, s.id, u.id,
+           now() - make_interval(mins => g),
+           CASE WHEN g <= :systems THEN NULL ELSE now() - make_interval(mins => g) + interval '30 minutes' END
+    FROM generate_series(1, :claims) g
+    JOIN idx_systems s ON s.n = 1 + (g - 1) % :systems
+    JOIN idx_users u ON u.n = 1 + g % :users
+    """,
+    "ANALYZE organizations",
+    "ANALYZE users",
+    "ANALYZE systems",
+    "ANALYZE system_claims",
+]
+
+# (description, query, expected index)
+HOT_QUERIES = [
+    (
+        "Recent activity",
+        """
+        SELECT * FROM system_claims
+        ORDER BY claimed_at DESC
+        LIMIT 10
+        """,
+        "ix_system_claims_claimed_at_desc",
+    ),
+    (
+        "Open claims of a system",
+        """
+        SELECT * FROM system_claims
+        WHERE system_id = (SELECT id FROM idx_systems WHERE n = 7)
+          AND released_at IS NULL
+        """,
+        "ix_system_claims_open_system",
+    ),
+    (
+        "Claims by user",
+        """
+        SELECT * FROM system_claims
+        WHERE claimed_by_user_id = (SELECT id FROM idx_users WHERE n = 7)
+        """,
+        "ix_system_claims_claimed_by_user_id",
+    ),
+    (
+        "Systems of an organization",
+        """
+        SELECT * FROM systems
+        WHERE organization_id = (SELECT id FROM idx_orgs WHERE n = 7)
+        """,
+        "ix_systems_organization_id",
+    ),
+]
+
+
+def plan_indexes(plan: dict) -> set:
+    """ Every index referenced by an (Index|Index Only|Bitmap Index) scan in a plan """
+
+    found = set()
+    if "Index Name" in plan:
+        found.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        found |= plan_indexes(child)
+    return found
+
+
+def scanned_partitions(plan: dict) -> set:
+    """ system_claims partitions up to this month that an EXPLAIN ANALYZE plan actually read """
+
+    # Future months are empty by construction, reading them costs nothing
+    current = partition_name(month_start())
+    found = set()
+    relation = plan.get("Relation Name", "")
+    if relation.startswith("system_claims_") and relation <= current and plan.get("Actual Loops", 0) > 0:
+        found.add(relation)
+    for child in plan.get("Plans", []):
+        found |= scanned_partitions(child)
+    return found
+
+
+def parent_indexes(connection) -> dict:
+    """ Partition index name -> the index it was created from on the partitioned table """
+
+    rows = connection.execute(text("""
+        SELECT child.relname, parent.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        WHERE child.relkind = 'i'
+    """))
+    return dict(rows.all())
+
+
+@contextmanager
+def seeded_connection():
+    params = {
+        "organizations": ORGANIZATIONS,
+        "users": USERS,
+        "systems": SYSTEMS,
+        "claims": CLAIMS,
+    }
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            ensure_claim_partitions(connection, start=datetime.now(timezone.utc) - timedelta(days=40))
+            for statement in SEED:
+                connection.execute(text(statement), params)
+            yield connection
+        finally:
+            transaction.rollback()
+
+
+def test_hot_queries_use_indexes():
+    """Test that the hot queries are answered by index scans."""
+    print("Testing hot query plans...")
+
+    failures = []
+    with seeded_connection() as connection:
+        parents = parent_indexes(connection)
+        for description, query, expected_index in HOT_QUERIES:
+            plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()
+            used = {parents.get(index, index) for index in plan_indexes(plan[0]["Plan"])}
+            ok = expected_index in used
+            print(f"✓ {description} uses {expected_index}: {'PASS' if ok else 'FAIL'}")
+            if not ok:
+                failures.append(f"{description}: expected {expected_index}, plan used {sorted(used) or 'no index'}")
+
+    assert not failures, "\n".join(failures)
+
+
+def test_claim_queries_prune_partitions():
+    """Test that recent activity and open-claim lookups read only hot partitions."""
+    print("Testing system_claims partition pruning...")
+
+    failures = []
+    with seeded_connection() as connection:
+        partitions = connection.execute(text(
+            "SELECT count(*) FROM pg_inherits WHERE inhparent = 'system_claims'::regclass"
+        )).scalar()
+        claim_id, claimed_at = connection.execute(text("""
+            SELECT c.id, c.claimed_at FROM system_claims c
+            JOIN idx_systems s ON s.id = c.system_id
+            WHERE s.n = 7 AND c.released_at IS NULL
+        """)).one()
+
+        queries = [
+            # Newest rows first: only the newest non-empty partition(s) are opened
+            ("Recent activity", "SELECT * FROM system_claims ORDER BY claimed_at DESC LIMIT 10", 2),
+            # A release finds the open claim by the systems pointer (id, claimed_at)
+            ("Open claim by pointer", f"""
+                SELECT * FROM system_claims
+                WHERE id = '{claim_id}' AND claimed_at = '{claimed_at.isoformat()}'
+                  AND released_at IS NULL
+            """, 1),
+        ]
+        for description, query, allowed in queries:
+            plan = connection.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}")).scalar()
+            scanned = scanned_partitions(plan[0]["Plan"])
+            ok = 0 < len(scanned) <= allowed
+            print(f"✓ {description} reads {len(scanned)} of {partitions} partitions: {'PASS' if ok else 'FAIL'}")
+            if not ok:
+                failures.append(f"{description}: read {sorted(scanned)}, expected at most {allowed}")
+
+    assert not failures, "\n".join(failures)
+
+
+def main():
+    """Run all tests."""
+    print("🔍 Index Plan Test Suite")
+    print("=" * 40)
+
+    try:
+        test_hot_queries_use_indexes()
+        test_claim_queries_prune_partitions()
+        print("✅ Index Plan Test PASSED")
+        return 0
+    except AssertionError as e:
+        print(f"❌ Index Plan Test FAILED:\n{e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Metrics tests: per-thread shards and the text exposition. No database needed.
+
+    python test_metrics.py
+"""
+
+import os
+import sys
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.metrics import Counter, Histogram, render_metrics
+
+SHORT_LIVED_THREADS = 500
+
+
+def run_in_threads(count: int, target) -> None:
+    """ `count` threads, each started after the previous one has finished """
+
+    for _ in range(count):
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+
+def test_finished_threads_are_folded():
+    """Test that shards of threads that have exited are merged, not kept."""
+    print("Testing metric shards of finished threads...")
+
+    counter = Counter("test_requests_total", "Test counter.", ("route",))
+    histogram = Histogram("test_duration_seconds", "Test histogram.", (0.1, 1.0))
+
+    def record():
+        counter.inc("/a")
+        histogram.observe(0.5)
+
+    run_in_threads(SHORT_LIVED_THREADS, record)
+    counter.inc("/a")
+
+    assert len(counter._shards) <= 2, f"{len(counter._shards)} shards kept for 2 live threads"
+    print(f"✓ {SHORT_LIVED_THREADS} short-lived threads left {len(counter._shards)} counter shard(s)")
+
+    text = render_metrics([counter, histogram])
+    assert f'test_requests_total{{route="/a"}} {SHORT_LIVED_THREADS + 1}' in text
+    assert f"test_duration_seconds_count {SHORT_LIVED_THREADS}" in text
+    assert len(histogram._shards) == 0, "finished threads' histogram shards kept after a scrape"
+    print("✓ Their observations are still counted")
+
+
+def test_live_threads_keep_their_shards():
+    """Test that a live thread's later observations still land after a scrape."""
+    print("\nTesting metric shards of live threads...")
+
+    counter = Counter("test_live_total", "Test counter.")
+    recorded = threading.Event()
+    scraped = threading.Event()
+
+    def record():
+        counter.inc()
+        recorded.set()
+        scraped.wait(5)
+        counter.inc()
+
+    thread = threading.Thread(target=record)
+    thread.start()
+    recorded.wait(5)
+    assert "test_live_total 1" in render_metrics([counter])
+    scraped.set()
+    thread.join()
+    assert "test_live_total 2" in render_metrics([counter])
+    print("✓ Live thread's shard kept across a scrape")
+
+
+def main():
+    """Run all tests."""
+    tests = [
+        ("Finished Thread Shards Test", test_finished_threads_are_folded),
+        ("Live Thread Shards Test", test_live_threads_keep_their_shards),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n🧪 Running: {test_name}")
+        try:
+            test_func()
+            print(f"✅ {test_name} PASSED")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test_name} FAILED: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Structured request log tests: buffering, sampling and the JSON lines.
+No database needed.
+
+    python test_request_log.py
+"""
+
+import io
+import json
+import os
+import sys
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from starlette.requests import Request
+
+from app.request_log import RequestLog, parse_sample_rates
+
+SAMPLED_REQUESTS = 2000
+
+
+def make_request(path: str, route: str = None) -> Request:
+    scope = {"type": "http", "method": "GET", "path": path, "headers": [], "query_string": b"", "state": {}}
+    if route is not None:
+        scope["route"] = SimpleNamespace(path=route)
+    return Request(scope)
+
+
+def lines(sink: io.StringIO) -> list:
+    return [json.loads(line) for line in sink.getvalue().splitlines()]
+
+
+def test_parse_sample_rates():
+    """Test longest-prefix ordering, clamping and malformed entries."""
+    print("Testing REQUEST_LOG_SAMPLE parsing...")
+
+    rates = parse_sample_rates(" /api=0.5, /api/dashboard=0.1 ,/static=-1,/health=7,, ")
+    assert rates == [("/api/dashboard", 0.1), ("/static", 0.0), ("/health", 1.0), ("/api", 0.5)], rates
+    assert parse_sample_rates("") == []
+    for spec in ("/api", "=0.5", "/api=fast"):
+        try:
+            parse_sample_rates(spec)
+            raise AssertionError(f"accepted {spec!r}")
+        except ValueError:
+            pass
+    print("✓ Longest prefix first, rates clamped to 0..1, malformed entries rejected")
+
+    log = RequestLog(sink=io.StringIO(), sample="/api=0.5,/api/dashboard=0.1")
+    assert log.sample_rate("/api/dashboard/fragment") == 0.1
+    assert log.sample_rate("/api/systems") == 0.5
+    assert log.sample_rate("/login") == 1.0
+    print("✓ The longest matching prefix wins")
+
+
+def test_drop_when_full():
+    """Test that emit never blocks: records past the buffer are dropped and counted."""
+    print("\nTesting the bounded buffer...")
+
+    sink = io.StringIO()
+    log = RequestLog(sink=sink, buffer=2)
+    # Stand-in for a stalled writer: emit sees one running, nothing drains the queue
+    log._thread = object()
+    results = [log.event("test", n=n) for n in range(5)]
+    assert results == [True, True, False, False, False]
+    assert log.stats()["dropped"] == 3 and log.stats()["emitted"] == 2 and log.stats()["queued"] == 2
+
+    log._thread = None
+    log._start()
+    log.stop()
+    assert [record["n"] for record in lines(sink)] == [0, 1]
+    assert log.stats()["written"] == 2
+    print("✓ 3 of 5 records dropped on a full buffer of 2; the rest written")
+
+
+def test_sampling_keeps_errors_and_slow_requests():
+    """Test sampled_out counts, sample_rate on kept records, and errors and slow requests kept."""
+    print("\nTesting request sampling...")
+
+    sink = io.StringIO()
+    log = RequestLog(sink=sink, buffer=SAMPLED_REQUESTS * 2, sample="/static=0,/api=0.5", slow_ms=100)
+    request = make_request("/api/systems/42", route="/api/systems/{system_id}")
+    for _ in range(SAMPLED_REQUESTS):
+        log.request(request, 200, 0.01)
+    assert not log.request(make_request("/static/app.css"), 200, 0.01)
+    assert log.request(make_request("/static/app.css"), 500, 0.01), "error sampled out"
+    assert log.request(make_request("/static/app.css"), 200, 0.2), "slow request sampled out"
+    log.request(make_request("/login"), 200, 0.01, sql=SimpleNamespace(statements=3, db_seconds=0.0042))
+    log.stop()
+
+    records = lines(sink)
+    kept = [record for record in records if record["route"] == "/api/systems/{system_id}"]
+    assert log.sampled_out == SAMPLED_REQUESTS - len(kept) + 1
+    assert 0.4 < len(kept) / SAMPLED_REQUESTS < 0.6, f"{len(kept)} of {SAMPLED_REQUESTS} kept at rate 0.5"
+    assert all(record["sample_rate"] == 0.5 and record["path"] == "/api/systems/42" for record in kept)
+    print(f"✓ {len(kept)} of {SAMPLED_REQUESTS} kept at rate 0.5, {log.sampled_out} sampled out")
+
+    static = [record for record in records if record["route"] == "/static/app.css"]
+    assert [(record["status"], "sample_rate" in record) for record in static] == [(500, False), (200, False)]
+    print("✓ Errors and slow requests are kept unsampled")
+
+    login = records[-1]
+    assert login["event"] == "request" and login["method"] == "GET" and login["route"] == "/login"
+    assert login["status"] == 200 and login["duration_ms"] == 10.0 and login["user_id"] is None
+    assert login["db_statements"] == 3 and login["db_ms"] == 4.2
+    assert "path" not in login and "sample_rate" not in login and isinstance(login["ts"], float)
+    print("✓ JSON line fields")
+
+
+def main():
+    """Run all tests."""
+    tests = [
+        ("Sample Rates Test", test_parse_sample_rates),
+        ("Full Buffer Test", test_drop_when_full),
+        ("Sampling Test", test_sampling_keeps_errors_and_slow_requests),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n🧪 Running: {test_name}")
+        try:
+            test_func()
+            print(f"✅ {test_name} PASSED")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test_name} FAILED: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
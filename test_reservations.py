@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Reservation tests.
+
+The SystemSchedule treap is checked against a brute-force list of the same
+reservations under random adds, removes, prunes and queries (no database
+needed). Claims vs. reservations are checked against the database with
+a throwaway organization (prefixed "test-reservations-"), deleted
+afterwards; that part needs DATABASE_URL with migrations applied.
+
+    python test_reservations.py
+"""
+
+import asyncio
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import delete
+
+from app.claims import SystemReserved, claim_any_system, claim_system, release_system
+from app.db.db_models import Organization, System, SystemClaim, SystemReservation, User
+from app.db.db_models.system import SystemStatus
+from app.db.session import AsyncSessionLocal, get_async_engine
+from app.reservations import (
+    ReservationConflict, ReservationIndex, SystemSchedule, cancel_reservation, create_reservation
+)
+
+ORACLE_SEED = 20261019
+ORACLE_ROUNDS = 20
+ORACLE_OPERATIONS = 400
+
+
+def run(coroutine):
+    """ asyncio.run, then close the pooled asyncpg connections - they belong to that loop """
+
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await get_async_engine().dispose()
+
+    return asyncio.run(main())
+
+
+# Brute force over a plain list of (id, start, end)
+
+def oracle_conflict(windows, start, end):
+    return [reservation_id for reservation_id, s, e in windows if s < end and start < e]
+
+
+def oracle_next_free(windows, after, duration):
+    candidate = after
+    for _, start, end in sorted(windows, key=lambda window: window[1]):
+        if end <= candidate:
+            continue
+        if start - candidate >= duration:
+            return candidate
+        candidate = max(candidate, end)
+    return candidate
+
+
+def check_invariants(schedule: SystemSchedule, windows) -> None:
+    """ In-order = sorted windows, heap order on priorities, and every subtree summary """
+
+    def walk(node, parent_priority):
+        if node is None:
+            return []
+        assert node.priority <= parent_priority, "heap order broken"
+        items = walk(node.left, node.priority) + [node] + walk(node.right, node.priority)
+        assert node.first_start == items[0].start and node.last_end == items[-1].end
+        gaps = [b.start - a.end for a, b in zip(items, items[1:])]
+        assert (max(gaps) if gaps else timedelta.min) == node.gap, "subtree gap out of date"
+        return items
+
+    nodes = walk(schedule.root, float("inf"))
+    assert [(node.id, node.start, node.end) for node in nodes] == sorted(windows, key=lambda window: window[1])
+    assert len(schedule) == len(windows)
+
+
+def test_schedule_matches_oracle():
+    """Test SystemSchedule insert, delete, prune, conflict and gap search against a linear scan."""
+    print("Testing SystemSchedule against a brute-force oracle...")
+
+    rng = random.Random(ORACLE_SEED)
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def minutes(value: int) -> datetime:
+        return base + timedelta(minutes=value)
+
+    checks = 0
+    for round_number in range(ORACLE_ROUNDS):
+        windows = []
+        if round_number % 2:
+            # Start from a bulk-loaded schedule every other round
+            cursor = 0
+            for _ in range(rng.randint(0, 40)):
+                cursor += rng.randint(0, 30)
+                length = rng.randint(1, 60)
+                windows.append((uuid.uuid4(), minutes(cursor), minutes(cursor + length)))
+                cursor += length
+            schedule = SystemSchedule.from_sorted(list(windows))
+        else:
+            schedule = SystemSchedule()
+
+        for _ in range(ORACLE_OPERATIONS):
+            operation = rng.random()
+            start = minutes(rng.randint(0, 3000))
+            end = start + timedelta(minutes=rng.randint(1, 120))
+
+            if operation < 0.4:
+                # Add only what the exclusion constraint would accept
+                if not oracle_conflict(windows, start, end):
+                    reservation_id = uuid.uuid4()
+                    schedule.add(reservation_id, start, end)
+                    windows.append((reservation_id, start, end))
+            elif operation < 0.6 and windows:
+                reservation_id, start, _ = windows.pop(rng.randrange(len(windows)))
+                schedule.remove(reservation_id, start)
+            elif operation < 0.65:
+                pruned = schedule.prune(start)
+                expected = [window for window in windows if window[2] <= start]
+                assert sorted(pruned) == sorted(window[0] for window in expected)
+                windows = [window for window in windows if window[2] > start]
+            elif operation < 0.85:
+                found = schedule.conflict(start, end)
+                expected = oracle_conflict(windows, start, end)
+                assert (found is None) == (not expected) and (found is None or found in expected), \
+                    f"conflict({start}, {end}): {found} vs {expected}"
+            else:
+                duration = timedelta(minutes=rng.randint(1, 90))
+                assert schedule.next_free(start, duration) == oracle_next_free(windows, start, duration), \
+                    f"next_free({start}, {duration})"
+            checks += 1
+            check_invariants(schedule, windows)
+
+    print(f"✓ {checks} operations over {ORACLE_ROUNDS} schedules match the oracle")
+
+    # Removing an unknown id is a no-op
+    schedule = SystemSchedule()
+    schedule.add(uuid.uuid4(), minutes(0), minutes(10))
+    schedule.remove(uuid.uuid4(), minutes(0))
+    assert len(schedule) == 1
+    print("✓ Removing an unknown reservation changes nothing")
+
+
+async def setup() -> dict:
+    """ One organization with users 1 and 2 and systems x and y, all FREE """
+
+    tag = uuid.uuid4().hex[:8]
+    ids = {}
+    async with AsyncSessionLocal() as db:
+        organization = Organization(id=uuid.uuid4(), name=f"test-reservations-{tag}")
+        db.add(organization)
+        await db.flush()
+        for n in (1, 2):
+            user = User(id=uuid.uuid4(), first_name="Test", last_name=f"User{n}",
+                        email=f"test-reservations-{tag}-{n}@example.com",
+                        organization_id=organization.id, is_active=True)
+            db.add(user)
+            ids[f"user_{n}"] = user.id
+        for name in ("x", "y"):
+            system = System(id=uuid.uuid4(), name=f"test-reservations-{tag}-{name}",
+                            status=SystemStatus.FREE, organization_id=organization.id)
+            db.add(system)
+            ids[f"system_{name}"] = system.id
+        ids["org"] = organization.id
+        await db.commit()
+
+    return ids
+
+
+async def teardown(ids: dict) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(SystemReservation).where(SystemReservation.organization_id == ids["org"]))
+        await db.execute(delete(SystemClaim).where(SystemClaim.organization_id == ids["org"]))
+        await db.execute(delete(System).where(System.organization_id == ids["org"]))
+        await db.execute(delete(User).where(User.organization_id == ids["org"]))
+        await db.execute(delete(Organization).where(Organization.id == ids["org"]))
+        await db.commit()
+
+
+async def _claims_respect_reservations() -> None:
+    ids = await setup()
+    index = ReservationIndex()
+    now = datetime.now(timezone.utc)
+    try:
+        async with AsyncSessionLocal() as db:
+            await create_reservation(
+                db, index, ids["system_x"], ids["user_1"], ids["org"],
+                now + timedelta(hours=1), now + timedelta(hours=2)
+            )
+
+        async with AsyncSessionLocal() as db:
+            try:
+                await claim_system(db, ids["system_x"], ids["user_2"], duration=timedelta(hours=3))
+                raise AssertionError("claim over another user's reservation succeeded")
+            except SystemReserved:
+                pass
+        async with AsyncSessionLocal() as db:
+            system = await db.get(System, ids["system_x"])
+            assert system.status == SystemStatus.FREE and system.current_claim_id is None
+        print("✓ Claim overlapping another user's reservation refused, system left FREE")
+
+        async with AsyncSessionLocal() as db:
+            await claim_system(db, ids["system_x"], ids["user_2"], duration=timedelta(minutes=30))
+        async with AsyncSessionLocal() as db:
+            await release_system(db, ids["system_x"], ids["user_2"])
+        async with AsyncSessionLocal() as db:
+            await claim_system(db, ids["system_x"], ids["user_1"], duration=timedelta(hours=3))
+        async with AsyncSessionLocal() as db:
+            await release_system(db, ids["system_x"], ids["user_1"])
+        print("✓ Claim ending before the reservation, and the holder's own, allowed")
+
+        async with AsyncSessionLocal() as db:
+            claimed = await claim_any_system(db, ids["user_2"], organization_id=ids["org"],
+                                             duration=timedelta(hours=3))
+        assert claimed.system_id == ids["system_y"], "claim-any picked the reserved system"
+        print("✓ Claim-any skips the reserved system")
+
+        async with AsyncSessionLocal() as db:
+            try:
+                await create_reservation(
+                    db, index, ids["system_y"], ids["user_1"], ids["org"],
+                    now + timedelta(hours=1), now + timedelta(hours=2)
+                )
+                raise AssertionError("reservation over another user's claim succeeded")
+            except ReservationConflict:
+                pass
+        async with AsyncSessionLocal() as db:
+            await create_reservation(
+                db, index, ids["system_y"], ids["user_1"], ids["org"],
+                now + timedelta(hours=4), now + timedelta(hours=5)
+            )
+        async with AsyncSessionLocal() as db:
+            await create_reservation(
+                db, index, ids["system_y"], ids["user_2"], ids["org"],
+                now + timedelta(hours=2), now + timedelta(hours=3)
+            )
+        print("✓ Reservation overlapping another user's claim refused; after it, or by the holder, allowed")
+    finally:
+        await teardown(ids)
+
+
+async def _stale_index_rechecked() -> None:
+    ids = await setup()
+    # Two workers' indexes; neither hears the other's notifications here
+    worker_a, worker_b = ReservationIndex(), ReservationIndex()
+    now = datetime.now(timezone.utc)
+    window = (now + timedelta(hours=1), now + timedelta(hours=2))
+    try:
+        async with AsyncSessionLocal() as db:
+            booked = await create_reservation(db, worker_a, ids["system_x"], ids["user_1"], ids["org"], *window)
+        async with AsyncSessionLocal() as db:
+            try:
+                await create_reservation(db, worker_a, ids["system_x"], ids["user_2"], ids["org"], *window)
+                raise AssertionError("overlapping reservation accepted")
+            except ReservationConflict as e:
+                assert e.reservation_id == booked.reservation_id
+        print("✓ A conflict in the index that is still active is refused")
+
+        worker_b.add(booked.reservation_id, ids["system_x"], *window)
+        async with AsyncSessionLocal() as db:
+            await cancel_reservation(db, worker_b, booked.reservation_id, ids["org"])
+        assert worker_a.conflict(ids["system_x"], *window) == booked.reservation_id
+        async with AsyncSessionLocal() as db:
+            rebooked = await create_reservation(db, worker_a, ids["system_x"], ids["user_2"], ids["org"], *window)
+        assert worker_a.conflict(ids["system_x"], *window) == rebooked.reservation_id
+        print("✓ A reservation cancelled on another worker does not block the window")
+    finally:
+        await teardown(ids)
+
+
+def test_claims_respect_reservations():
+    """Test that claims and reservations of different users never overlap."""
+    print("\nTesting claims against reservations...")
+    run(_claims_respect_reservations())
+
+
+def test_stale_index_rechecked():
+    """Test that conflicts from a stale index are confirmed in the database."""
+    print("\nTesting a stale reservation index...")
+    run(_stale_index_rechecked())
+
+
+def main():
+    """Run all tests."""
+    tests = [
+        ("Schedule Oracle Test", test_schedule_matches_oracle),
+        ("Claims vs Reservations Test", test_claims_respect_reservations),
+        ("Stale Index Test", test_stale_index_rechecked),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n🧪 Running: {test_name}")
+        try:
+            test_func()
+            print(f"✅ {test_name} PASSED")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test_name} FAILED: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Route smoke tests with SQL query budgets enforced.
+
+Logs in through the real app and requests the hot routes in-process; any
+route issuing more statements than its @query_budget fails the test.
+Needs DATABASE_URL and a user to log in as:
+
+    TEST_USER_EMAIL=admin@example.com TEST_USER_PASSWORD=... python test_routes.py
+"""
+
+import asyncio
+import html
+import os
+import re
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ["ENFORCE_QUERY_BUDGETS"] = "1"
+
+import httpx
+from sqlalchemy import text
+
+from app.main import app
+from app.db.session import SessionLocal, get_async_engine
+from app.db.query_budget import QueryBudgetExceeded, query_budget
+from app.principal_cache import principal_cache
+
+TEST_USER_EMAIL = os.getenv("TEST_USER_EMAIL", "admin@example.com")
+TEST_USER_PASSWORD = os.getenv("TEST_USER_PASSWORD", "password")
+
+HOT_ROUTES = ["/", "/api/systems", "/api/activity", "/api/dashboard"]
+
+# First cell of each systems row, and the infinite-scroll link on the last one
+ROW_NAME = re.compile(r"<tr[^>]*>\s*<td>([^<]*)</td>")
+NEXT_PAGE = re.compile(r'hx-get="([^"]*after=[^"]*)"')
+
+
+def client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def run(coroutine):
+    """ asyncio.run, then close the pooled asyncpg connections - they belong to that loop """
+
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await get_async_engine().dispose()
+
+    return asyncio.run(main())
+
+
+async def login(c: httpx.AsyncClient) -> bool:
+    response = await c.post("/api/login", data={
+        "username": TEST_USER_EMAIL,
+        "password": TEST_USER_PASSWORD
+    })
+    if response.status_code != 302:
+        print(f"✗ Login failed for {TEST_USER_EMAIL} (status {response.status_code})")
+        return False
+    return True
+
+
+async def _hot_routes_within_budget() -> bool:
+    async with client() as c:
+        if not await login(c):
+            return False
+        print("✓ Login within budget")
+
+        for path in HOT_ROUTES:
+            # Worst case - principal not cached yet
+            principal_cache.clear()
+            response = await c.get(path)
+            print(f"✓ {path} within budget: {'PASS' if response.status_code == 200 else 'FAIL'}")
+            if response.status_code != 200:
+                return False
+
+    return True
+
+
+def test_hot_routes_within_budget():
+    """Test that the hot routes stay within their declared SQL budgets."""
+    print("Testing hot route query budgets...")
+    assert run(_hot_routes_within_budget())
+
+
+async def _systems_filters_and_cursor() -> None:
+    async with client() as c:
+        assert await login(c), "login failed"
+
+        # What the filter form sends for "All statuses" / "All departments"
+        for query in ("status=&department_id=", "status=free&department_id=", "status=&organization_id="):
+            response = await c.get(f"/api/systems?{query}")
+            assert response.status_code == 200, f"?{query} returned {response.status_code}"
+        print("✓ Blank filter values mean no filter")
+
+        for query in ("status=nonsense", "department_id=not-a-uuid"):
+            response = await c.get(f"/api/systems?{query}")
+            assert response.status_code == 422, f"?{query} returned {response.status_code}"
+        response = await c.get("/api/systems?after=not-a-cursor")
+        assert response.status_code == 400, f"bad cursor returned {response.status_code}"
+        print("✓ Invalid filters and cursors rejected")
+
+        # Walk the pages the infinite scroll would fetch
+        seen = []
+        url = "/api/systems?status=&department_id=&limit=2"
+        for _ in range(3):
+            response = await c.get(url)
+            assert response.status_code == 200, f"{url} returned {response.status_code}"
+            names = ROW_NAME.findall(response.text)
+            assert len(names) <= 2, f"page of {len(names)} rows for limit=2"
+            seen.extend(names)
+            next_page = NEXT_PAGE.search(response.text)
+            if next_page is None:
+                break
+            url = html.unescape(next_page.group(1))
+            assert "after=" in url and "limit=2" in url
+        assert seen == sorted(seen) and len(seen) == len(set(seen)), f"pages overlap or are out of order: {seen}"
+        print(f"✓ Cursor pages in order: {len(seen)} rows")
+
+
+def test_systems_filters_and_cursor():
+    """Test the systems listing filters (including the blank "All" options) and cursor paging."""
+    print("\nTesting systems filters and cursor...")
+    run(_systems_filters_and_cursor())
+
+
+async def _fragment_etag_follows_user_names() -> None:
+    def set_user(column: str, value: str) -> None:
+        with SessionLocal() as db:
+            db.execute(text(f"UPDATE users SET {column} = {value} WHERE email = :email"),
+                       {"email": TEST_USER_EMAIL})
+            db.commit()
+
+    async with client() as c:
+        assert await login(c), "login failed"
+
+        async def etag() -> str:
+            response = await c.get("/api/systems")
+            assert response.status_code == 200
+            return response.headers["etag"]
+
+        before = await etag()
+        set_user("last_login", "now()")
+        assert await etag() == before, "last_login changed the systems fragment key"
+        set_user("first_name", "first_name || '~'")
+        try:
+            assert await etag() != before, "renaming a user left the systems fragment key unchanged"
+        finally:
+            set_user("first_name", "left(first_name, -1)")
+        print("✓ Fragment ETag changes with user names, not with last_login")
+
+
+def test_fragment_etag_follows_user_names():
+    """Test that renaming a user (a system holder) invalidates cached fragments."""
+    print("\nTesting fragment cache users version...")
+    run(_fragment_etag_follows_user_names())
+
+
+def test_budget_violation_detected():
+    """Test that a route going over its budget is reported."""
+    print("\nTesting budget violation detection...")
+
+    @app.get("/__test__/over-budget")
+    @query_budget(1)
+    def over_budget():
+        with SessionLocal() as db:
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+        return {}
+
+    async def request():
+        async with client() as c:
+            await c.get("/__test__/over-budget")
+
+    try:
+        run(request())
+    except QueryBudgetExceeded as e:
+        print(f"✓ Violation detected: {str(e).splitlines()[0]}")
+        return
+    finally:
+        app.router.routes.pop()
+
+    raise AssertionError("over-budget route was not detected")
+
+
+def main():
+    """Run all tests."""
+    tests = [
+        ("Query Budget Test", test_hot_routes_within_budget),
+        ("Systems Filter Test", test_systems_filters_and_cursor),
+        ("Fragment Users Version Test", test_fragment_etag_follows_user_names),
+        ("Budget Violation Test", test_budget_violation_detected),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n🧪 Running: {test_name}")
+        try:
+            test_func()
+            print(f"✅ {test_name} PASSED")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test_name} FAILED: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+SQL profiler tests.
+
+Fingerprinting, parameter shapes and percentiles are tested on their own
+(no database needed). The EXPLAIN capture runs against the database in a
+temporary table, on its own engine; that part needs DATABASE_URL.
+
+    python test_sql_profiler.py
+"""
+
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.db.session import database_url
+from app.sql_profiler import (
+    OVERFLOW_FINGERPRINT, FingerprintStats, SqlProfiler, fingerprint_id, normalize, parameter_shape
+)
+
+SECRET = "hunter2-do-not-log"
+
+
+def test_normalize():
+    """Test that literals, parameters and list lengths do not split fingerprints."""
+    print("Testing statement fingerprints...")
+
+    same = [
+        "SELECT * FROM systems WHERE id IN ($1, $2)",
+        "SELECT * FROM systems WHERE id IN ($1,$2,$3)",
+        "SELECT *\n  FROM systems\n WHERE id IN (%(id_1)s, %(id_2)s)",
+        "SELECT * FROM systems WHERE id IN (:a, :b, :c, :d)",
+        "SELECT * FROM systems WHERE id IN ('a', 'it''s', 42)",
+    ]
+    fingerprints = {fingerprint_id(normalize(statement)) for statement in same}
+    assert len(fingerprints) == 1, [normalize(statement) for statement in same]
+    assert normalize(same[0]) == "SELECT * FROM systems WHERE id IN (...)"
+    print("✓ IN lists of any length, parameters and literals share one fingerprint")
+
+    values = normalize("INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4), ($5::uuid, $6)")
+    assert values == "INSERT INTO t (a, b) VALUES (...)", values
+    assert normalize("SELECT x::text FROM t1 WHERE n > 10.5 LIMIT 3") == "SELECT x::text FROM t1 WHERE n > ? LIMIT ?"
+    assert fingerprint_id(normalize("SELECT a FROM t")) != fingerprint_id(normalize("SELECT b FROM t"))
+    print("✓ VALUES rows collapse; casts, identifiers and columns are kept")
+
+
+def test_parameter_shape():
+    """Test that parameter shapes carry types and lengths, never values."""
+    print("\nTesting parameter shapes...")
+
+    shape = parameter_shape({"email": SECRET, "ids": [1, 2, 3], "n": 7, "none": None, "blob": SECRET.encode()})
+    assert shape == {"email": "str(18)", "ids": "list[3]", "n": "int", "none": "null", "blob": "bytes(18)"}, shape
+    assert parameter_shape((SECRET, 1.5)) == ["str(18)", "float"]
+    many = parameter_shape([{"password_hash": SECRET}] * 4, executemany=True)
+    assert many == {"rows": 4, "each": {"password_hash": "str(18)"}}
+    assert parameter_shape([], executemany=True) == {"rows": 0, "each": None}
+    assert parameter_shape(None) is None
+    for value in (shape, many):
+        assert SECRET not in json.dumps(value)
+    print("✓ Types and lengths only")
+
+
+def test_percentile():
+    """Test the histogram percentile: an upper bound within 25%, capped at max."""
+    print("\nTesting fingerprint percentiles...")
+
+    stats = FingerprintStats("f", "SELECT ?")
+    assert stats.percentile(95) == 0.0
+    timings = [0.001] * 90 + [0.1] * 10
+    for elapsed in timings:
+        stats.add(elapsed, None, False)
+    # The bucket's upper bound, capped at the largest observation
+    assert stats.percentile(95) == 0.1
+    assert 0.001 <= stats.percentile(50) <= 0.001 * 1.25
+    assert stats.percentile(100) == stats.max == 0.1
+
+    stats = FingerprintStats("f", "SELECT ?")
+    for n in range(1, 1001):
+        stats.add(n / 1000, "/api/systems", False)
+    p95 = stats.percentile(95)
+    assert 0.95 <= p95 <= 0.95 * 1.25, p95
+    assert stats.routes == {"/api/systems": 1000}
+    print("✓ Percentiles bound the true value within one bucket")
+
+    profiler = SqlProfiler(slow_ms=10_000, max_fingerprints=2)
+    for statement in ("SELECT 1", "SELECT a FROM t", "SELECT b FROM t", "SELECT c FROM t"):
+        profiler.record(statement, None, False, 0.001)
+    assert [entry["fingerprint"] for entry in profiler.report(order_by="count")][0] == OVERFLOW_FINGERPRINT
+    assert profiler.stats()["fingerprints"] == 3 and profiler.statements == 4
+    print("✓ Fingerprints past the limit share the overflow entry")
+
+
+def test_explain_in_savepoint():
+    """Test that the EXPLAIN capture leaves the caller's transaction usable."""
+    print("\nTesting EXPLAIN capture...")
+
+    engine = create_engine(database_url(), poolclass=NullPool)
+    # Every statement is "slow", so every SELECT is explained
+    profiler = SqlProfiler(slow_ms=0, explain=True, explain_top=1000)
+    profiler.install(engine)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("CREATE TEMP TABLE sql_profiler_test (n int)"))
+            conn.execute(text("INSERT INTO sql_profiler_test SELECT generate_series(1, 100)"))
+            count = conn.execute(text("SELECT count(*) FROM sql_profiler_test WHERE n > :n"), {"n": 50}).scalar()
+            assert count == 50
+
+            entry = next(entry for entry in profiler.report() if "sql_profiler_test WHERE" in entry["statement"])
+            assert entry["plan"] and "sql_profiler_test" in entry["plan"] and "actual" in entry["plan"], entry["plan"]
+            assert profiler.explains >= 1
+            print("✓ Slow SELECT explained with ANALYZE")
+
+            # A failing EXPLAIN is rolled back to the savepoint, not the transaction
+            stats = FingerprintStats("broken", "SELECT * FROM sql_profiler_missing")
+            profiler._capture_plan(conn, stats, "SELECT * FROM sql_profiler_missing", None)
+            assert stats.plan.startswith("EXPLAIN failed"), stats.plan
+            assert conn.execute(text("SELECT count(*) FROM sql_profiler_test")).scalar() == 100
+            assert conn.in_transaction()
+            conn.rollback()
+        print("✓ The caller's transaction carries on, with its writes, after a failed EXPLAIN")
+    finally:
+        engine.dispose()
+
+
+def main():
+    """Run all tests."""
+    tests = [
+        ("Fingerprint Test", test_normalize),
+        ("Parameter Shape Test", test_parameter_shape),
+        ("Percentile Test", test_percentile),
+        ("EXPLAIN Savepoint Test", test_explain_in_savepoint),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n🧪 Running: {test_name}")
+        try:
+            test_func()
+            print(f"✅ {test_name} PASSED")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test_name} FAILED: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+System import tests.
+
+Runs app/system_import.py in one transaction that is rolled back at the
+end, with two throwaway organizations - nothing is left behind. Needs
+DATABASE_URL with migrations applied.
+
+    python test_system_import.py
+"""
+
+import io
+import os
+import sys
+import uuid
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select
+
+import app.system_import as system_import
+from app.db.db_models import Organization, System
+from app.db.db_models.system import SystemStatus
+from app.db.session import get_engine
+from app.system_import import import_systems
+
+# Stands in for the cross-organization check missing a system created concurrently
+NO_REJECTIONS = "SELECT NULL::integer, NULL::text WHERE false"
+
+
+def test_other_organizations_systems_untouched():
+    """Test that an import never updates another organization's system of the same name."""
+    print("Testing import against another organization's systems...")
+
+    tag = uuid.uuid4().hex[:8]
+    with get_engine().connect() as connection:
+        try:
+            org_a, org_b = uuid.uuid4(), uuid.uuid4()
+            connection.execute(Organization.__table__.insert(), [
+                {"id": org_a, "name": f"test-import-{tag}-a"},
+                {"id": org_b, "name": f"test-import-{tag}-b"}
+            ])
+            taken = f"test-import-{tag}-taken"
+            connection.execute(System.__table__.insert(), {
+                "id": uuid.uuid4(), "name": taken, "status": SystemStatus.FREE,
+                "organization_id": org_b, "notes": "B's notes"
+            })
+            csv = f"name,status,notes\n{taken},maintenance,A's notes\ntest-import-{tag}-new,,\n"
+
+            # Each import in a savepoint, rolled back - the staging table goes with it
+            savepoint = connection.begin_nested()
+            result = import_systems(connection, io.StringIO(csv), org_a)
+            savepoint.rollback()
+            assert (result.inserted, result.updated, result.rejected) == (1, 0, 1), result.as_dict()
+            assert "belongs to another organization" in result.errors[0]
+            print("✓ Rejected by the check before the upsert")
+
+            check = system_import.REJECT_OTHER_ORGANIZATION
+            system_import.REJECT_OTHER_ORGANIZATION = NO_REJECTIONS
+            savepoint = connection.begin_nested()
+            try:
+                result = import_systems(connection, io.StringIO(csv), org_a)
+                row = connection.execute(
+                    select(System.organization_id, System.status, System.notes).where(System.name == taken)
+                ).one()
+            finally:
+                savepoint.rollback()
+                system_import.REJECT_OTHER_ORGANIZATION = check
+            assert (result.inserted, result.updated, result.rejected) == (1, 0, 1), result.as_dict()
+            assert result.unchanged == 0
+            assert result.errors == [f"line 2: system {taken!r} belongs to another organization"]
+            assert tuple(row) == (org_b, SystemStatus.FREE, "B's notes"), row
+            print("✓ A name the check missed is skipped by the upsert and counted as rejected")
+        finally:
+            connection.rollback()
+
+
+def main():
+    """Run all tests."""
+    tests = [
+        ("System Import Organization Test", test_other_organizations_systems_untouched),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n🧪 Running: {test_name}")
+        try:
+            test_func()
+            print(f"✅ {test_name} PASSED")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test_name} FAILED: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
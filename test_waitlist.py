@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Waitlist tests.
+
+Creates a throwaway organization (prefixed "test-waitlist-") with users
+and two systems, queues waiters for them and releases the systems one by
+one, then deletes everything. Needs DATABASE_URL with migrations applied.
+
+    python test_waitlist.py
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import delete
+
+import app.waitlist as waitlist_module
+from app.claims import claim_system, release_system
+from app.db.db_models import Organization, System, SystemClaim, SystemWaiter, User
+from app.db.db_models.system import SystemStatus
+from app.db.session import AsyncSessionLocal, get_async_engine
+from app.waitlist import AcquireRequest, WaiterNotFound, cancel, dispatch, enqueue, resume, waiter_status
+
+USERS = 4
+# Short enough to let a waiter lapse within the test
+GRACE_SECONDS = 0.2
+
+
+def run(coroutine):
+    """ asyncio.run, then close the pooled asyncpg connections - they belong to that loop """
+
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await get_async_engine().dispose()
+
+    return asyncio.run(main())
+
+
+async def setup() -> dict:
+    """ One organization with users 0..3 and systems x and y, both claimed by user 0 """
+
+    tag = uuid.uuid4().hex[:8]
+    ids = {}
+    async with AsyncSessionLocal() as db:
+        organization = Organization(id=uuid.uuid4(), name=f"test-waitlist-{tag}")
+        db.add(organization)
+        await db.flush()
+        for n in range(USERS):
+            user = User(id=uuid.uuid4(), first_name="Test", last_name=f"User{n}",
+                        email=f"test-waitlist-{tag}-{n}@example.com",
+                        organization_id=organization.id, is_active=True)
+            db.add(user)
+            ids[f"user_{n}"] = user.id
+        for name in ("x", "y"):
+            system = System(id=uuid.uuid4(), name=f"test-waitlist-{tag}-{name}",
+                            status=SystemStatus.FREE, organization_id=organization.id)
+            db.add(system)
+            ids[f"system_{name}"] = system.id
+        ids["org"] = organization.id
+        await db.commit()
+
+    for name in ("x", "y"):
+        async with AsyncSessionLocal() as db:
+            await claim_system(db, ids[f"system_{name}"], ids["user_0"])
+    return ids
+
+
+async def teardown(ids: dict) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(SystemWaiter).where(SystemWaiter.organization_id == ids["org"]))
+        await db.execute(delete(SystemClaim).where(SystemClaim.organization_id == ids["org"]))
+        await db.execute(delete(System).where(System.organization_id == ids["org"]))
+        await db.execute(delete(User).where(User.organization_id == ids["org"]))
+        await db.execute(delete(Organization).where(Organization.id == ids["org"]))
+        await db.commit()
+
+
+async def join(ids: dict, user: int, timeout: float = 30.0) -> uuid.UUID:
+    async with AsyncSessionLocal() as db:
+        return await enqueue(db, ids[f"user_{user}"], ids["org"], AcquireRequest(timeout=timeout))
+
+
+async def release_and_dispatch(ids: dict, system: str, user: int) -> int:
+    async with AsyncSessionLocal() as db:
+        await release_system(db, ids[f"system_{system}"], ids[f"user_{user}"])
+    async with AsyncSessionLocal() as db:
+        return await dispatch(db)
+
+
+async def status(waiter_id: uuid.UUID) -> dict:
+    async with AsyncSessionLocal() as db:
+        return await waiter_status(db, waiter_id)
+
+
+async def _grants_in_order() -> None:
+    ids = await setup()
+    try:
+        waiters = [await join(ids, user) for user in (1, 2, 3)]
+        async with AsyncSessionLocal() as db:
+            assert await dispatch(db) == 0, "granted with no FREE system"
+        assert (await status(waiters[2]))["ahead"] == 2
+
+        assert await release_and_dispatch(ids, "x", 0) == 1
+        first = await status(waiters[0])
+        assert first["status"] == "claimed" and first["system_id"] == str(ids["system_x"])
+        assert (await status(waiters[1]))["ahead"] == 0 and (await status(waiters[2]))["ahead"] == 1
+
+        assert await release_and_dispatch(ids, "y", 0) == 1
+        second = await status(waiters[1])
+        assert second["status"] == "claimed" and second["system_id"] == str(ids["system_y"])
+        assert (await status(waiters[2]))["status"] == "waiting"
+        print("✓ Released systems go to waiters in queue order")
+
+        async with AsyncSessionLocal() as db:
+            await cancel(db, waiters[2], ids["user_3"])
+        async with AsyncSessionLocal() as db:
+            try:
+                await cancel(db, waiters[2], ids["user_3"])
+                raise AssertionError("cancelled twice")
+            except WaiterNotFound:
+                pass
+        async with AsyncSessionLocal() as db:
+            try:
+                await cancel(db, waiters[0], ids["user_1"])
+                raise AssertionError("cancelled a granted waiter")
+            except WaiterNotFound:
+                pass
+        assert await release_and_dispatch(ids, "x", 1) == 0, "cancelled waiter was granted"
+        async with AsyncSessionLocal() as db:
+            assert (await db.get(System, ids["system_x"])).status == SystemStatus.FREE
+        print("✓ Cancelled waiter is skipped; the system stays FREE")
+    finally:
+        await teardown(ids)
+
+
+async def _abandoned_waiters_skipped() -> None:
+    ids = await setup()
+    grace = waitlist_module.WAITLIST_GRACE_SECONDS
+    waitlist_module.WAITLIST_GRACE_SECONDS = GRACE_SECONDS
+    try:
+        abandoned = await join(ids, 1, timeout=0.1)
+        kept = await join(ids, 2, timeout=0.1)
+        async with AsyncSessionLocal() as db:
+            # The next poll: keeps its place for another timeout + grace
+            await resume(db, kept, ids["user_2"], timeout=30)
+        await asyncio.sleep(0.1 + GRACE_SECONDS * 2)
+
+        async with AsyncSessionLocal() as db:
+            try:
+                await resume(db, abandoned, ids["user_1"], timeout=30)
+                raise AssertionError("resumed a waiter past its grace period")
+            except WaiterNotFound:
+                pass
+        async with AsyncSessionLocal() as db:
+            try:
+                await resume(db, kept, ids["user_1"], timeout=30)
+                raise AssertionError("resumed another user's waiter")
+            except WaiterNotFound:
+                pass
+        print("✓ A waiter not polled within the grace period cannot be resumed")
+
+        assert await release_and_dispatch(ids, "x", 0) == 1
+        assert (await status(kept))["status"] == "claimed", "resumed waiter was not granted"
+        assert (await status(abandoned))["status"] == "waiting"
+        async with AsyncSessionLocal() as db:
+            assert (await db.get(SystemWaiter, abandoned)).granted_at is None
+        async with AsyncSessionLocal() as db:
+            # Still polls the granted waiter fine
+            await resume(db, kept, ids["user_2"], timeout=30)
+        print("✓ The abandoned waiter ahead is skipped, the resumed one granted")
+    finally:
+        waitlist_module.WAITLIST_GRACE_SECONDS = grace
+        await teardown(ids)
+
+
+def test_grants_in_order():
+    """Test FIFO grants as systems are released, and cancel."""
+    print("Testing waitlist order...")
+    run(_grants_in_order())
+
+
+def test_abandoned_waiters_skipped():
+    """Test resume after a timed-out poll and expiry of the grace period."""
+    print("\nTesting waitlist grace period...")
+    run(_abandoned_waiters_skipped())
+
+
+def main():
+    """Run all tests."""
+    tests = [
+        ("Waitlist Order Test", test_grants_in_order),
+        ("Waitlist Grace Period Test", test_abandoned_waiters_skipped),
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        print(f"\n🧪 Running: {test_name}")
+        try:
+            test_func()
+            print(f"✅ {test_name} PASSED")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test_name} FAILED: {e}")
+
+    print(f"\n📊 Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())